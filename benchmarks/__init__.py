@@ -0,0 +1 @@
+"""Benchmarks of pico-torrent hot paths."""
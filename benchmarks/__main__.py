@@ -0,0 +1,148 @@
+"""Run benchmark suite and save results as JSON.
+
+Run: `python -m benchmarks [names...] [--output FILE] [--compare FILE]`
+
+Results of every benchmark are saved with commit and platform,
+so results of two commits are compared by `--compare`.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import datetime
+import importlib
+import subprocess  # noqa: S404
+
+from typing import Dict, List, Optional
+
+# Benchmarks in order of run, every module has `run() -> dict`
+SUITE = (
+    'bencode',
+    'bencode_decoder',
+    'messages',
+    'message_framing',
+    'bitfield',
+    'piece_assembly',
+    'piece_hashes',
+    'piece_verifier',
+    'piece_picker',
+    'files_to_pieces',
+    'compact_peers',
+    'request_pipeline',
+    'outbound',
+    'endgame',
+    'storage_write',
+    'piece_cache',
+    'recheck',
+    'fast_resume',
+    'tracker_announce',
+    'udp_tracker',
+    'upload',
+    'loopback',
+)
+
+
+def _git_commit() -> Optional[str]:
+    """Return commit of working tree, None outside of git."""
+    try:
+        return subprocess.run(  # noqa: S603, S607
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(names: List[str]) -> dict:
+    """Run benchmarks by names, return report with their results."""
+    results: Dict[str, Dict[str, float]] = {}
+    durations: Dict[str, float] = {}
+
+    for name in names:
+        module = importlib.import_module(f'benchmarks.{name}')
+        print(f'Run {name}', file=sys.stderr)
+
+        started = time.perf_counter()
+        results[name] = module.run()  # type: ignore
+        durations[name] = time.perf_counter() - started
+
+    return {
+        'commit': _git_commit(),
+        'created': datetime.datetime.now(
+            datetime.timezone.utc,
+        ).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'durations': durations,
+        'results': results,
+    }
+
+
+def compare(baseline: dict, report: dict):
+    """Print changes of metrics of report relative to baseline."""
+    print(
+        f'Compare {baseline.get("commit")} '
+        f'with {report.get("commit")}',
+    )
+
+    for name, metrics in report['results'].items():
+        baseline_metrics = baseline['results'].get(name, {})
+
+        for metric, value in metrics.items():
+            old = baseline_metrics.get(metric)
+            if not old:
+                change = 'new'
+            else:
+                change = f'{value / old - 1:+.1%}'
+
+            print(f'{name}.{metric:<36} {value:14.3f} {change:>9}')
+
+
+def main(args: List[str]):
+    """Run benchmarks given by command line arguments."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument(
+        'names',
+        help='Benchmarks to run, all of them by default',
+        nargs='*',
+        metavar='name',
+    )
+    parser.add_argument(
+        '--output',
+        help='Path to JSON file with results, stdout by default',
+        default=None,
+    )
+    parser.add_argument(
+        '--compare',
+        help='Path to JSON file with results of baseline run',
+        default=None,
+    )
+    ns = parser.parse_args(args)
+
+    unknown = set(ns.names) - set(SUITE)
+    if unknown:
+        parser.error(
+            f'unknown benchmarks {", ".join(sorted(unknown))}, '
+            f'choose from {", ".join(SUITE)}',
+        )
+
+    report = run_suite(ns.names or list(SUITE))
+
+    if ns.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(ns.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if ns.compare is not None:
+        with open(ns.compare) as baseline:
+            compare(json.load(baseline), report)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""Throughput of bencode decoders and encoder on synthetic torrents.
+
+Run: `python -m benchmarks.bencode`
+"""
+
+import io
+
+from typing import Dict
+
+from benchmarks.timing import best_time
+from benchmarks.synthetic import make_torrent_bytes
+from pico_torrent.protocol.bencode import (
+    BencodeDecoder,
+    BencodeEncoder,
+    BencodeBufferDecoder,
+)
+
+TORRENT_SIZES = (10 * 2**10, 2**20, 10 * 2**20, 50 * 2**20)
+# Large torrents keep files in many directories
+FILES_PER_MEGABYTE = 1_000
+
+
+def _label(size: int) -> str:
+    """Return human readable size."""
+    if size >= 2**20:
+        return f'{size // 2**20}MB'
+
+    return f'{size // 2**10}KB'
+
+
+def run() -> Dict[str, float]:
+    """Measure decode and encode throughput in MB/s."""
+    results = {}
+
+    for size in TORRENT_SIZES:
+        files_count = max(1, size * FILES_PER_MEGABYTE // 2**20)
+        data = make_torrent_bytes(size, files_count)
+        torrent = BencodeBufferDecoder(data).decode()
+        megabytes = len(data) / 2**20
+        rounds = 3 if size > 10 * 2**20 else 5
+
+        cases = {
+            'decode_file': lambda data=data: BencodeDecoder(
+                io.BytesIO(data),
+            ).decode(),
+            'decode_buffer': lambda data=data: BencodeBufferDecoder(
+                data,
+            ).decode(),
+            'encode': lambda torrent=torrent: BencodeEncoder().encode(
+                torrent,
+            ),
+        }
+
+        for name, func in cases.items():
+            key = f'{name}[{_label(size)}]_mb_s'
+            results[key] = megabytes / best_time(func, rounds)
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, mb_per_second in run().items():
+        print(f'{name:<28} {mb_per_second:10.1f} MB/s')
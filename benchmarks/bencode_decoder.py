@@ -0,0 +1,48 @@
+"""Throughput of bencode decoders on a synthetic 10 MB torrent.
+
+Run: `python -m benchmarks.bencode_decoder`
+"""
+
+import io
+
+from typing import Dict
+
+from benchmarks.timing import best_time
+from benchmarks.synthetic import make_torrent_bytes
+from pico_torrent.protocol.bencode import (
+    BencodeDecoder,
+    BencodeBufferDecoder,
+)
+
+TORRENT_SIZE = 10 * 2**20
+FILES_COUNTS = (1, 20_000, 100_000)
+
+
+def run() -> Dict[str, float]:
+    """Measure decoders throughput in MB/s."""
+    results = {}
+
+    for files_count in FILES_COUNTS:
+        data = make_torrent_bytes(TORRENT_SIZE, files_count)
+        megabytes = len(data) / 2**20
+
+        cases = {
+            'file': lambda data=data: BencodeDecoder(
+                io.BytesIO(data),
+            ).decode(),
+            'buffer': lambda data=data: BencodeBufferDecoder(data).decode(),
+            'zero_copy': lambda data=data: BencodeBufferDecoder(
+                data, zero_copy=True,
+            ).decode(),
+        }
+
+        for name, func in cases.items():
+            key = f'{name}[files={files_count}]'
+            results[key] = megabytes / best_time(func)
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, mb_per_second in run().items():
+        print(f'{name:<28} {mb_per_second:10.1f} MB/s')
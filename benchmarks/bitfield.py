@@ -0,0 +1,63 @@
+"""Bit field message handling of torrent with 200k pieces.
+
+Run: `python -m benchmarks.bitfield`
+"""
+
+import os
+import time
+import ipaddress
+
+from typing import Dict
+
+from benchmarks.timing import best_time
+from benchmarks.synthetic import make_torrent_dict
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.raw_message import RawPeerMessage
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+PIECES_COUNT = 200_000
+PEERS_COUNT = 50
+
+
+def run() -> Dict[str, float]:
+    """Measure bit field parse and peer update time in milliseconds."""
+    encoded = messages.BitField(os.urandom(PIECES_COUNT // 8)).encode()
+    raw = RawPeerMessage.from_bytes(encoded)
+    bitfield = messages.BitField.decode_from_raw(raw)
+
+    torrent = TorrentFile.from_torrent_file(
+        BencodeEncoder().encode(make_torrent_dict(PIECES_COUNT)),
+    )
+    peers = [
+        TorrentPeer(ip=ipaddress.IPv4Address(index + 1), port=6881)
+        for index in range(PEERS_COUNT)
+    ]
+
+    def update_peers() -> float:
+        manager = PiecesManager(torrent)
+        started = time.perf_counter()
+        for peer in peers:
+            manager.update_peer_with_bitfield(peer, bitfield)
+        return time.perf_counter() - started
+
+    return {
+        'decode_ms': best_time(
+            lambda: messages.BitField.decode_from_raw(
+                RawPeerMessage.from_bytes(encoded),
+            ),
+        ) * 1e3,
+        'encode_ms': best_time(bitfield.encode) * 1e3,
+        'count_ms': best_time(bitfield.bitfield.count) * 1e3,
+        'update_peer_ms': min(
+            update_peers() for _ in range(3)
+        ) * 1e3 / PEERS_COUNT,
+    }
+
+
+if __name__ == '__main__':
+    print(f'Bit field of {PIECES_COUNT} pieces')
+    for name, milliseconds in run().items():
+        print(f'{name:<16} {milliseconds:10.3f} ms')
@@ -0,0 +1,34 @@
+"""Parsing of compact peers returned by trackers.
+
+Run: `python -m benchmarks.compact_peers`
+"""
+
+import os
+
+from typing import Dict
+
+from benchmarks.timing import best_time
+from pico_torrent.protocol.trackers.tracker import parse_compact_peers
+
+PEERS_COUNT = 10_000
+
+
+def run() -> Dict[str, float]:
+    """Measure parse time per peer in microseconds."""
+    ipv4_peers = os.urandom(PEERS_COUNT * 6)
+    ipv6_peers = os.urandom(PEERS_COUNT * 18)
+
+    return {
+        'ipv4_us': best_time(
+            lambda: parse_compact_peers(ipv4_peers),
+        ) * 1e6 / PEERS_COUNT,
+        'ipv6_us': best_time(
+            lambda: parse_compact_peers(ipv6_peers, address_length=16),
+        ) * 1e6 / PEERS_COUNT,
+    }
+
+
+if __name__ == '__main__':
+    print(f'{PEERS_COUNT} peers')
+    for name, microseconds in run().items():
+        print(f'{name:<16} {microseconds:10.3f} us per peer')
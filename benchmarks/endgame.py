@@ -0,0 +1,157 @@
+"""Completion time of download with one slow peer, with and without endgame.
+
+Peers are simulated in virtual time: every peer serves its requests
+one by one, each block takes fixed time of that peer. Cancelled
+requests which peer has not started to serve yet are dropped.
+
+Run: `python -m benchmarks.endgame`
+"""
+
+import heapq
+import ipaddress
+import collections
+
+from typing import Deque, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.pieces.piece import PieceBlock
+from pico_torrent.protocol.pieces.manager import PiecesManager
+
+LENGTH = 2**23
+PIECE_LENGTH = 2**18
+# Time to serve one block by peer in milliseconds
+FAST_BLOCK_TIME = 1.0
+SLOW_BLOCK_TIME = 100.0
+FAST_PEERS = 3
+PIPELINE_DEPTH = 8
+
+
+class NoEndgamePiecesManager(PiecesManager):
+    """Pieces manager which never enters endgame mode."""
+
+    def _is_endgame(self) -> bool:
+        return False
+
+
+class SimulatedPeer:
+    """Remote peer serving requested blocks in order."""
+
+    def __init__(self, index: int, block_time: float):
+        """Initialize peer serving one block in `block_time` seconds."""
+        self.peer = TorrentPeer(
+            ip=ipaddress.IPv4Address(f'10.0.0.{index + 1}'),
+            port=6881,
+        )
+        self.block_time = block_time
+        self.queue: Deque[PieceBlock] = collections.deque()
+        self.serving: Optional[PieceBlock] = None
+
+    def in_flight(self) -> int:
+        """Return count of blocks requested from peer."""
+        return len(self.queue) + (self.serving is not None)
+
+    def cancel(self, block: PieceBlock) -> bool:
+        """Cancel queued request of block, return whether it was queued."""
+        for queued in self.queue:
+            if (
+                queued.piece_index == block.piece_index
+                and queued.offset == block.offset
+            ):
+                self.queue.remove(queued)
+                return True
+
+        return False
+
+
+def simulate(manager: PiecesManager, data: bytes) -> Dict[str, float]:
+    """Download all pieces from simulated peers, return virtual times."""
+    peers = [
+        SimulatedPeer(index, FAST_BLOCK_TIME) for index in range(FAST_PEERS)
+    ]
+    peers.append(SimulatedPeer(FAST_PEERS, SLOW_BLOCK_TIME))
+    bitfield = messages.BitField(
+        bytes([0xff]) * ((manager.pieces_count + 7) // 8),
+    )
+
+    for peer in peers:
+        manager.update_peer_with_bitfield(peer.peer, bitfield)
+        manager.cancel_handlers[peer.peer] = peer.cancel
+
+    events: List[Tuple[float, int, SimulatedPeer]] = []
+    sequence = 0
+    now = 0.0
+    tail_started = None
+
+    def schedule():
+        nonlocal sequence
+
+        for peer in peers:
+            while peer.in_flight() < PIPELINE_DEPTH:
+                block = manager.next_request(peer.peer)
+                if block is None:
+                    break
+                peer.queue.append(block)
+
+            if peer.serving is None and peer.queue:
+                peer.serving = peer.queue.popleft()
+                sequence += 1
+                heapq.heappush(
+                    events,
+                    (now + peer.block_time, sequence, peer),
+                )
+
+    schedule()
+    while not manager.is_complete():
+        now, _, peer = heapq.heappop(events)
+        block, peer.serving = peer.serving, None
+
+        offset = block.piece_index * PIECE_LENGTH + block.offset
+        manager.add_piece(
+            messages.Piece(
+                block.piece_index,
+                block.offset,
+                data[offset:offset + block.length],
+            ),
+            peer.peer,
+        )
+
+        if tail_started is None and (
+            manager.have_count >= manager.pieces_count * 0.9
+        ):
+            tail_started = now
+
+        schedule()
+
+    return {
+        'completion_ms': now,
+        'last_10%_ms': now - (tail_started or now),
+        'duplicate_requests': manager.duplicate_requests,
+        'cancelled_requests': manager.cancelled_requests,
+        'wasted_kib': manager.wasted_bytes / 2**10,
+    }
+
+
+def run() -> Dict[str, float]:
+    """Measure virtual completion time with and without endgame."""
+    torrent, data = make_torrent_with_data(LENGTH, PIECE_LENGTH)
+    results = {}
+
+    for name, manager_class in (
+        ('no_endgame', NoEndgamePiecesManager),
+        ('endgame', PiecesManager),
+    ):
+        for key, value in simulate(manager_class(torrent), data).items():
+            results[f'{name}_{key}'] = value
+
+    return results
+
+
+if __name__ == '__main__':
+    print(
+        f'{LENGTH // 2**20} MiB, {FAST_PEERS} peers with '
+        f'{FAST_BLOCK_TIME} ms per block and one with {SLOW_BLOCK_TIME} ms',
+    )
+    for name, value in run().items():
+        print(f'{name:<32} {value:10.1f}')
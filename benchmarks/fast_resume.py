@@ -0,0 +1,80 @@
+"""Startup time of completed torrent with and without resume file.
+
+Files of 100 GB torrent are sparse, full recheck time is extrapolated
+from hashing of a sample of pieces.
+
+Run: `python -m benchmarks.fast_resume`
+"""
+
+import time
+import tempfile
+
+from typing import Dict
+from pathlib import Path
+
+from benchmarks.synthetic import make_torrent_dict
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.recheck import check_pieces
+from pico_torrent.protocol.pieces.resume import (
+    collect_resume_data,
+    load_resume_data,
+    restore_download,
+    save_resume_data,
+)
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+TORRENT_LENGTH = 100 * 2**30
+PIECE_LENGTH = 2**18
+FILES_COUNT = 100
+RECHECK_SAMPLE = 256
+
+
+def run() -> Dict[str, float]:
+    """Measure restore from resume file and estimate full recheck."""
+    pieces_count = TORRENT_LENGTH // PIECE_LENGTH
+    torrent = TorrentFile.from_torrent_file(BencodeEncoder().encode(
+        make_torrent_dict(pieces_count, FILES_COUNT, PIECE_LENGTH),
+    ))
+
+    with tempfile.TemporaryDirectory() as directory:
+        resume_file = Path(directory) / 'resume'
+
+        with TorrentStorage(torrent, Path(directory)) as storage:
+            manager = PiecesManager(torrent, storage=storage)
+            manager.restore_have(Bitfield.full(pieces_count))
+            save_resume_data(resume_file, collect_resume_data(manager))
+
+            started = time.perf_counter()
+            list(check_pieces(
+                storage,
+                torrent.info.pieces,
+                range(RECHECK_SAMPLE),
+            ))
+            recheck = (time.perf_counter() - started) / RECHECK_SAMPLE
+
+        storage = TorrentStorage(torrent, Path(directory))
+        manager = PiecesManager(torrent, storage=storage)
+
+        started = time.perf_counter()
+        restore_download(manager, load_resume_data(resume_file, torrent))
+        resume = time.perf_counter() - started
+        storage.close()
+
+        assert manager.is_complete()  # noqa: S101
+
+    return {
+        'resume_ms': resume * 1e3,
+        'full_recheck_estimate_s': recheck * pieces_count,
+    }
+
+
+if __name__ == '__main__':
+    print(
+        f'{TORRENT_LENGTH // 2**30} GiB torrent, {FILES_COUNT} files, '
+        f'{PIECE_LENGTH // 2**10} KiB pieces',
+    )
+    for name, value in run().items():
+        print(f'{name:<24} {value:10.1f}')
@@ -0,0 +1,49 @@
+"""Mapping of 100k files of torrent to pieces.
+
+Run: `python -m benchmarks.files_to_pieces`
+"""
+
+import random
+
+from typing import Dict
+from pathlib import Path
+
+from benchmarks.timing import best_time
+from pico_torrent.protocol.metainfo.torrent import TorrentInfoFile
+from pico_torrent.protocol.metainfo.files_to_pieces import (
+    map_files_to_pieces,
+)
+
+FILES_COUNT = 100_000
+PIECE_LENGTH = 2**18
+# Files are from empty up to four pieces long
+MAX_FILE_LENGTH = 4 * PIECE_LENGTH
+
+
+def run() -> Dict[str, float]:
+    """Measure mapping time in milliseconds and per file."""
+    rng = random.Random(0)
+    files = [
+        TorrentInfoFile(
+            path=Path(f'dir{index % 100}', f'file{index}.bin'),
+            length=rng.randrange(MAX_FILE_LENGTH),
+        )
+        for index in range(FILES_COUNT)
+    ]
+    pieces_count = -(-sum(file.length for file in files) // PIECE_LENGTH)
+
+    elapsed = best_time(
+        lambda: map_files_to_pieces(files, pieces_count, PIECE_LENGTH),
+        3,
+    )
+
+    return {
+        'map_ms': elapsed * 1e3,
+        'per_file_us': elapsed * 1e6 / FILES_COUNT,
+    }
+
+
+if __name__ == '__main__':
+    print(f'{FILES_COUNT} files, piece length {PIECE_LENGTH}')
+    for name, value in run().items():
+        print(f'{name:<16} {value:10.3f}')
@@ -0,0 +1,439 @@
+"""End-to-end download from local seeders over loopback.
+
+Stand-in seeders speak peer wire protocol on 127.0.0.1 and are given
+to the client by a stand-in HTTP tracker. The real client downloads
+a synthetic torrent from them until it is complete. Seeders run
+in their own thread and event loop, so CPU time of client thread
+is measured apart from them.
+
+Every seeder might add latency to its answers, cap its bandwidth and
+misbehave: choke the client from time to time or corrupt blocks.
+
+Run: `python -m benchmarks.loopback`
+"""
+
+import os
+import time
+import logging
+import socket
+import asyncio
+import tempfile
+import threading
+import http.server
+import dataclasses
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.cmd.client import CmdOptions, download
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.choker import UPLOAD_SLOTS
+from pico_torrent.protocol.peers.raw_message import (
+    PeerMessageId,
+    RawPeerMessage,
+)
+from pico_torrent.protocol.peers.connection import decode_peer_message
+from pico_torrent.protocol.pieces.cache import PIECE_CACHE_SIZE
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.pieces.recheck import recheck
+from pico_torrent.protocol.pieces.verifier import VERIFY_WORKERS
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+HONEST = 'honest'
+# Seeder chokes client after every `choke_every` blocks for a while
+CHOKING = 'choking'
+# Seeder sends garbage instead of every `corrupt_every` block
+CORRUPT = 'corrupt'
+
+CLIENT_PEER_ID = '-PC0100-000000000000'
+DOWNLOAD_TIMEOUT = 120.0
+
+LENGTH = 64 * 2**20
+PIECE_LENGTH = 2**18
+
+
+@dataclasses.dataclass
+class SeederConfig:
+    """Behaviour of stand-in seeder."""
+
+    # Delay of every answer to request in seconds
+    latency: float = 0.0
+    # Upload rate cap in bytes per second, None is unlimited
+    bandwidth: Optional[float] = None
+    behaviour: str = HONEST
+    choke_every: int = 64
+    choke_pause: float = 0.05
+    corrupt_every: int = 4
+
+
+@dataclasses.dataclass
+class LoopbackResult:
+    """Result of download from stand-in seeders."""
+
+    length: int
+    elapsed: float
+    # Time from start of client to the first block sent by seeders
+    time_to_first_byte: Optional[float]
+    # CPU time of client event loop thread and of the whole process
+    cpu_time: float
+    process_cpu_time: float
+    # Downloaded files match the torrent
+    complete: bool
+    seeders: List['Seeder']
+
+    @property
+    def mb_per_second(self) -> float:
+        """Return download throughput in MB/s."""
+        return self.length / 2**20 / self.elapsed
+
+
+class Seeder:
+    """Stand-in remote peer which has all pieces of torrent."""
+
+    def __init__(
+        self,
+        index: int,
+        torrent: TorrentFile,
+        data: bytes,
+        config: SeederConfig,
+    ):
+        """Initialize seeder, it listens after `start`."""
+        self.torrent = torrent
+        self.data = data
+        self.config = config
+        self.peer_id = f'-LB0100-{index:012d}'.encode()
+        self.port = 0
+
+        self.first_block_at: Optional[float] = None
+        self.sent_blocks = 0
+        self.corrupt_blocks = 0
+        self.chokes = 0
+
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening on free port of loopback interface."""
+        self._server = await asyncio.start_server(
+            self._serve,
+            '127.0.0.1',
+            0,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_message(self, reader: asyncio.StreamReader):
+        """Read one message of peer wire protocol."""
+        header = await reader.readexactly(4)
+        body = await reader.readexactly(int.from_bytes(header, 'big'))
+        return decode_peer_message(RawPeerMessage.from_bytes(header + body))
+
+    async def _serve(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ):
+        """Answer requests of one connected client."""
+        # Requests by their keys in order of arrival with time to answer
+        requests: Dict[Tuple[int, int, int], float] = {}
+        requested = asyncio.Event()
+        sender = None
+
+        try:
+            handshake = messages.Handshake.decode_from_raw(
+                RawPeerMessage.from_bytes(await reader.readexactly(68)),
+            )
+            if handshake.info_hash != self.torrent.info_hash:
+                return
+
+            writer.write(messages.Handshake(
+                info_hash=self.torrent.info_hash,
+                peer_id=self.peer_id,
+            ).encode())
+            writer.write(messages.BitField(
+                Bitfield.full(len(self.torrent.info.pieces)),
+            ).encode())
+
+            sender = asyncio.create_task(
+                self._send(writer, requests, requested),
+            )
+
+            while True:
+                message = await self._read_message(reader)
+
+                if message.message_id == PeerMessageId.Interested:
+                    writer.write(messages.Unchoke().encode())
+                elif message.message_id == PeerMessageId.Request:
+                    key = (message.index, message.begin, message.length)
+                    requests[key] = time.monotonic() + self.config.latency
+                    requested.set()
+                elif message.message_id == PeerMessageId.Cancel:
+                    requests.pop(
+                        (message.index, message.begin, message.length),
+                        None,
+                    )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if sender is not None:
+                sender.cancel()
+            writer.close()
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        requests: Dict[Tuple[int, int, int], float],
+        requested: asyncio.Event,
+    ):
+        """Send requested blocks in order with latency and rate cap."""
+        config = self.config
+
+        while True:
+            if not requests:
+                requested.clear()
+                await requested.wait()
+                continue
+
+            key, ready_at = next(iter(requests.items()))
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                # Request might be cancelled meanwhile
+                continue
+
+            del requests[key]
+            index, begin, length = key
+            offset = index * self.torrent.info.piece_length + begin
+            block = self.data[offset:offset + length]
+            self.sent_blocks += 1
+
+            if (
+                config.behaviour == CORRUPT
+                and self.sent_blocks % config.corrupt_every == 0
+            ):
+                block = os.urandom(length)
+                self.corrupt_blocks += 1
+
+            writer.write(messages.Piece(index, begin, block).encode())
+            await writer.drain()
+
+            if self.first_block_at is None:
+                self.first_block_at = time.perf_counter()
+
+            if config.bandwidth is not None:
+                await asyncio.sleep(length / config.bandwidth)
+
+            if (
+                config.behaviour == CHOKING
+                and self.sent_blocks % config.choke_every == 0
+            ):
+                # Requests of choked client are dropped
+                self.chokes += 1
+                requests.clear()
+                writer.write(messages.Choke().encode())
+                await asyncio.sleep(config.choke_pause)
+                writer.write(messages.Unchoke().encode())
+
+
+class _TrackerHandler(http.server.BaseHTTPRequestHandler):
+    """Stand-in tracker giving compact peers of server."""
+
+    def do_GET(self):
+        body = BencodeEncoder().encode({
+            b'interval': 1800,
+            b'peers': self.server.compact_peers,  # type: ignore
+        }).getvalue()
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LoopbackSwarm:
+    """Stand-in tracker and seeders served from background thread."""
+
+    def __init__(self, configs: List[SeederConfig]):
+        """Initialize swarm, it is started by `start`."""
+        self.configs = configs
+        self.seeders: List[Seeder] = []
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever)
+        self._tracker = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            _TrackerHandler,
+        )
+        self._tracker_thread = threading.Thread(
+            target=self._tracker.serve_forever,
+        )
+
+    @property
+    def announce_url(self) -> str:
+        """Return announce url of stand-in tracker."""
+        return f'http://127.0.0.1:{self._tracker.server_port}/announce'
+
+    def _call(self, coroutine) -> object:
+        """Run coroutine in loop of seeders and wait for it."""
+        return asyncio.run_coroutine_threadsafe(
+            coroutine,
+            self._loop,
+        ).result()
+
+    def start(self, torrent: TorrentFile, data: bytes):
+        """Start seeders of torrent and tracker announcing them."""
+        self._thread.start()
+        self.seeders = [
+            Seeder(index, torrent, data, config)
+            for index, config in enumerate(self.configs)
+        ]
+
+        for seeder in self.seeders:
+            self._call(seeder.start())
+
+        self._tracker.compact_peers = b''.join(  # type: ignore
+            socket.inet_aton('127.0.0.1') + seeder.port.to_bytes(2, 'big')
+            for seeder in self.seeders
+        )
+        self._tracker_thread.start()
+
+    def close(self):
+        """Stop tracker and seeders."""
+        self._tracker.shutdown()
+        self._tracker.server_close()
+
+        for seeder in self.seeders:
+            self._call(seeder.close())
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def run_download(
+    configs: List[SeederConfig],
+    length: int = LENGTH,
+    piece_length: int = PIECE_LENGTH,
+    files_count: int = 1,
+    hash_workers: int = VERIFY_WORKERS,
+    directory: Optional[Path] = None,
+    timeout: float = DOWNLOAD_TIMEOUT,
+) -> LoopbackResult:
+    """Download synthetic torrent by client from stand-in seeders."""
+    swarm = LoopbackSwarm(configs)
+    torrent, data = make_torrent_with_data(
+        length,
+        piece_length,
+        files_count,
+        announce=swarm.announce_url.encode(),
+    )
+
+    with tempfile.TemporaryDirectory() as temporary:
+        download_dir = Path(directory or temporary)
+        options = CmdOptions(
+            mode='download',
+            torrent_file=download_dir / 'synthetic.torrent',
+            download_dir=download_dir,
+            max_peers=len(configs),
+            upload_slots=UPLOAD_SLOTS,
+            listen_port=0,
+            hash_workers=hash_workers,
+            resume_file=None,
+            cache_size=PIECE_CACHE_SIZE // 2**20,
+            exit_on_complete=True,
+        )
+        trackers = TrackersManager.from_torrent(
+            torrent,
+            peer_id=CLIENT_PEER_ID,
+            listen_port=0,
+        )
+
+        swarm.start(torrent, data)
+        try:
+            started = time.perf_counter()
+            cpu_started = time.thread_time()
+            process_cpu_started = time.process_time()
+
+            asyncio.run(asyncio.wait_for(
+                download(torrent, CLIENT_PEER_ID, trackers, options),
+                timeout,
+            ))
+
+            elapsed = time.perf_counter() - started
+            cpu_time = time.thread_time() - cpu_started
+            process_cpu_time = time.process_time() - process_cpu_started
+        finally:
+            trackers.close()
+            swarm.close()
+
+        storage = TorrentStorage(torrent, download_dir)
+        try:
+            have = recheck(storage, torrent.info.pieces).have
+        finally:
+            storage.close()
+
+    first_blocks = [
+        seeder.first_block_at - started
+        for seeder in swarm.seeders
+        if seeder.first_block_at is not None
+    ]
+
+    return LoopbackResult(
+        length=length,
+        elapsed=elapsed,
+        time_to_first_byte=min(first_blocks) if first_blocks else None,
+        cpu_time=cpu_time,
+        process_cpu_time=process_cpu_time,
+        complete=have.count() == len(torrent.info.pieces),
+        seeders=swarm.seeders,
+    )
+
+
+SCENARIOS: Dict[str, List[SeederConfig]] = {
+    'honest': [SeederConfig() for _ in range(4)],
+    'latency_20ms': [SeederConfig(latency=0.02) for _ in range(4)],
+    'bandwidth_8MiB': [SeederConfig(bandwidth=8 * 2**20) for _ in range(4)],
+    'misbehaving': [
+        SeederConfig(),
+        SeederConfig(),
+        SeederConfig(bandwidth=2**20),
+        SeederConfig(behaviour=CHOKING),
+        SeederConfig(behaviour=CORRUPT),
+    ],
+}
+
+
+def run() -> Dict[str, float]:
+    """Measure download throughput, time to first byte and CPU time."""
+    results = {}
+    # Hash mismatches of blocks of corrupt seeder are expected
+    logging.getLogger('pico_torrent').setLevel(logging.ERROR)
+
+    for name, configs in SCENARIOS.items():
+        result = run_download(configs)
+        if not result.complete:
+            raise RuntimeError(f'download of scenario {name} is broken')
+
+        results[f'{name}_mb_s'] = result.mb_per_second
+        results[f'{name}_ttfb_ms'] = (result.time_to_first_byte or 0) * 1e3
+        results[f'{name}_cpu_s'] = result.cpu_time
+        results[f'{name}_process_cpu_s'] = result.process_cpu_time
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{LENGTH // 2**20} MiB torrent, piece length {PIECE_LENGTH}')
+    for name, value in run().items():
+        print(f'{name:<32} {value:10.2f}')
@@ -0,0 +1,103 @@
+"""Receive throughput of piece messages by framer and by legacy path.
+
+Legacy path reads length prefix and body by separate `recv` calls,
+concatenates them and copies block out by `struct.unpack`.
+Framer receives straight into its buffer and block is copied once,
+when it is stored into piece.
+
+Run: `python -m benchmarks.message_framing`
+"""
+
+import os
+import time
+import socket
+import struct
+import threading
+
+from typing import Callable, Dict
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.connection import decode_peer_message
+
+MESSAGES_COUNT = 20_000
+BLOCK = os.urandom(messages.REQUEST_SIZE)
+
+
+def legacy_receive(conn: socket.socket) -> bytes:
+    """Receive piece block as it was done before framer."""
+    length_bytes = conn.recv(4)
+    length, = struct.unpack('>I', length_bytes)
+
+    body = b''
+    while len(body) < length:
+        body += conn.recv(length - len(body))
+
+    raw = length_bytes + body
+    try:
+        struct.unpack('>B19s8x20s20s', raw)
+    except struct.error:
+        pass
+
+    payload = raw[5:5 + length]
+    block, = struct.unpack(f'>{length - 9}s', payload[8:])
+
+    return block
+
+
+def framed_receiver(conn: socket.socket) -> Callable[[], bytes]:
+    """Return receiver of piece blocks by framer."""
+    framer = MessageFramer()
+
+    def receive() -> bytes:
+        framer.release()
+        raw_message = framer.next_message()
+
+        while raw_message is None:
+            framer.buffer_updated(conn.recv_into(framer.get_buffer()))
+            raw_message = framer.next_message()
+
+        piece = decode_peer_message(raw_message)
+        # The only copy, from receive buffer into piece
+        return bytes(piece.block)  # type: ignore
+
+    return receive
+
+
+def measure(make_receiver: Callable[[socket.socket], Callable]) -> float:
+    """Receive piece messages from socket, return throughput in MiB/s."""
+    sender, receiver = socket.socketpair()
+    encoded = messages.Piece(index=0, begin=0, block=BLOCK).encode()
+
+    def send():
+        for _ in range(MESSAGES_COUNT):
+            sender.sendall(encoded)
+
+    thread = threading.Thread(target=send)
+    receive = make_receiver(receiver)
+
+    started = time.perf_counter()
+    thread.start()
+    for _ in range(MESSAGES_COUNT):
+        receive()
+    elapsed = time.perf_counter() - started
+
+    thread.join()
+    sender.close()
+    receiver.close()
+
+    return MESSAGES_COUNT * len(BLOCK) / 2**20 / elapsed
+
+
+def run() -> Dict[str, float]:
+    """Compare receive throughput of legacy path and framer."""
+    return {
+        'legacy_mib_s': measure(lambda conn: lambda: legacy_receive(conn)),
+        'framer_mib_s': measure(framed_receiver),
+    }
+
+
+if __name__ == '__main__':
+    print(f'{MESSAGES_COUNT} piece messages of {len(BLOCK)} bytes')
+    for name, value in run().items():
+        print(f'{name:<14} {value:10.1f}')
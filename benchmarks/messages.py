@@ -0,0 +1,65 @@
+"""Encode and decode time of every peer message type.
+
+Decode includes parsing of raw message from wire bytes.
+
+Run: `python -m benchmarks.messages`
+"""
+
+import os
+
+from typing import Dict
+
+from benchmarks.timing import time_per_call
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.abstract import BasePeerMessage
+from pico_torrent.protocol.peers.raw_message import RawPeerMessage
+from pico_torrent.protocol.peers.connection import decode_peer_message
+
+CALLS = 20_000
+# Bit field of torrent with 2000 pieces
+BITFIELD = os.urandom(250)
+BLOCK = os.urandom(messages.REQUEST_SIZE)
+
+MESSAGES: Dict[str, BasePeerMessage] = {
+    'handshake': messages.Handshake(
+        info_hash=os.urandom(20),
+        peer_id=b'-PC0100-000000000000',
+    ),
+    'keep_alive': messages.KeepAlive(),
+    'choke': messages.Choke(),
+    'unchoke': messages.Unchoke(),
+    'interested': messages.Interested(),
+    'not_interested': messages.NotInterested(),
+    'have': messages.Have(1234),
+    'bitfield': messages.BitField(BITFIELD),
+    'request': messages.Request(1234, 2**14),
+    'piece': messages.Piece(1234, 2**14, BLOCK),
+    'cancel': messages.Cancel(1234, 2**14),
+    'port': messages.Port(6881),
+}
+
+
+def run() -> Dict[str, float]:
+    """Measure encode and decode time of messages in microseconds."""
+    results = {}
+
+    for name, message in MESSAGES.items():
+        encoded = message.encode()
+
+        results[f'encode[{name}]_us'] = time_per_call(
+            message.encode,
+            CALLS,
+        ) * 1e6
+        results[f'decode[{name}]_us'] = time_per_call(
+            lambda encoded=encoded: decode_peer_message(
+                RawPeerMessage.from_bytes(encoded),
+            ),
+            CALLS,
+        ) * 1e6
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, microseconds in run().items():
+        print(f'{name:<28} {microseconds:10.2f} us')
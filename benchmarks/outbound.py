@@ -0,0 +1,147 @@
+"""Send time of request bursts and piece uploads over loopback TCP.
+
+Messages sent one by one with `sendall` of encoded bytes are compared
+with outbound queue of `P2PConnection`, which coalesces requests and
+sends blocks without copying.
+
+Run: `python -m benchmarks.outbound`
+"""
+
+import socket
+import ipaddress
+import threading
+
+from typing import Callable, Dict, List
+
+from benchmarks.timing import best_time
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.abstract import BasePeerMessage
+from pico_torrent.protocol.peers.connection import P2PConnection
+
+BURSTS = 200
+BURST_SIZE = 64
+# Uploaded data is 64 MiB in blocks of one 4 MiB buffer
+UPLOAD_ROUNDS = 16
+UPLOAD_DATA = bytearray(4 * 2**20)
+
+REQUESTS = [
+    messages.Request(index, begin * messages.REQUEST_SIZE)
+    for index in range(2)
+    for begin in range(BURST_SIZE // 2)
+]
+PIECES = [
+    messages.Piece(
+        0,
+        begin,
+        memoryview(UPLOAD_DATA)[begin:begin + messages.REQUEST_SIZE],
+    )
+    for begin in range(0, len(UPLOAD_DATA), messages.REQUEST_SIZE)
+]
+
+
+class CountingSocket:
+    """Socket which counts its send syscalls."""
+
+    def __init__(self, sock: socket.socket):
+        """Wrap connected socket."""
+        self.sock = sock
+        self.calls = 0
+
+    def sendall(self, data):
+        """Send data, it is one syscall for loopback with free buffer."""
+        self.calls += 1
+        self.sock.sendall(data)
+
+    def sendmsg(self, buffers):
+        """Send buffers by one syscall."""
+        self.calls += 1
+        return self.sock.sendmsg(buffers)
+
+
+def _sink(server: socket.socket):
+    """Read and drop everything sent to accepted connection."""
+    with server:
+        conn, _ = server.accept()
+    buffer = bytearray(2**20)
+
+    with conn:
+        while conn.recv_into(buffer):
+            pass
+
+
+def _connected_socket() -> socket.socket:
+    """Return socket connected to draining loopback server."""
+    server = socket.create_server(('127.0.0.1', 0))
+    threading.Thread(target=_sink, args=(server,), daemon=True).start()
+
+    return socket.create_connection(server.getsockname())
+
+
+def _naive(sock: CountingSocket) -> Callable[[List[BasePeerMessage]], None]:
+    """Return sender of messages one by one."""
+    def send(batch: List[BasePeerMessage]):
+        for message in batch:
+            sock.sendall(message.encode())
+
+    return send
+
+
+def _queued(sock: CountingSocket) -> Callable[[List[BasePeerMessage]], None]:
+    """Return sender of messages through outbound queue."""
+    conn = P2PConnection(TorrentPeer(ipaddress.IPv4Address('127.0.0.1'), 1))
+    conn.conn.close()
+    conn.conn = sock  # type: ignore
+
+    def send(batch: List[BasePeerMessage]):
+        for message in batch:
+            conn.send(message)
+        conn.flush()
+
+    return send
+
+
+def _measure(
+    name: str,
+    make_sender: Callable[[CountingSocket], Callable],
+) -> Dict[str, float]:
+    """Measure one way of sending on fresh connection."""
+    sock = CountingSocket(_connected_socket())
+    send = make_sender(sock)
+
+    def bursts():
+        for _ in range(BURSTS):
+            send(REQUESTS)
+
+    def uploads():
+        for _ in range(UPLOAD_ROUNDS):
+            send(PIECES)
+
+    burst_time = best_time(bursts) / BURSTS
+    sock.calls = 0
+    bursts()
+    burst_calls = sock.calls / BURSTS
+
+    upload_time = best_time(uploads)
+    sock.sock.close()
+
+    return {
+        f'request_burst[{name}]_us': burst_time * 1e6,
+        f'request_burst_syscalls[{name}]': burst_calls,
+        f'piece_upload[{name}]_mb_per_second': (
+            UPLOAD_ROUNDS * len(UPLOAD_DATA) / upload_time / 2**20
+        ),
+    }
+
+
+def run() -> Dict[str, float]:
+    """Measure sending of bursts and uploads with and without queue."""
+    return {
+        **_measure('sendall', _naive),
+        **_measure('queue', _queued),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<44} {value:12.2f}')
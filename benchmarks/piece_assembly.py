@@ -0,0 +1,131 @@
+"""Assembly and verification time of piece from blocks.
+
+Blocks are views of receive buffer as they are given by framer.
+Legacy assembly copies every block to bytes, joins sorted blocks
+and hashes piece when the last block arrives. Piece writes blocks
+into pooled buffer and hashes received prefix incrementally.
+
+Run: `python -m benchmarks.piece_assembly`
+"""
+
+import os
+import time
+import random
+import hashlib
+
+from typing import Dict, List
+
+from pico_torrent.protocol.peers.messages import REQUEST_SIZE
+from pico_torrent.protocol.pieces.piece import (
+    Piece,
+    PieceBlock,
+    PieceBufferPool,
+)
+
+PIECE_LENGTH = 4 * 2**20
+PIECES_COUNT = 50
+
+
+def _make_blocks() -> List[PieceBlock]:
+    """Return blocks of piece."""
+    return [
+        PieceBlock(piece_index=0, offset=offset, length=REQUEST_SIZE)
+        for offset in range(0, PIECE_LENGTH, REQUEST_SIZE)
+    ]
+
+
+def legacy_assembly(
+    blocks: Dict[int, memoryview],
+    piece_hash: bytes,
+) -> float:
+    """Assemble piece as it was done before, return last block time."""
+    _make_blocks()
+    received: Dict[int, bytes] = {}
+
+    for offset, data in blocks.items():
+        started = time.perf_counter()
+        received[offset] = bytes(data)
+
+        if len(received) == len(blocks):
+            content = b''.join(
+                received[offset] for offset in sorted(received)
+            )
+            assert hashlib.sha1(content).digest() == piece_hash  # noqa
+
+    return time.perf_counter() - started
+
+
+def pooled_assembly(
+    blocks: Dict[int, memoryview],
+    piece_hash: bytes,
+    pool: PieceBufferPool,
+) -> float:
+    """Assemble piece into pooled buffer, return last block time."""
+    piece = Piece(
+        index=0,
+        piece_hash=piece_hash,
+        blocks=_make_blocks(),
+        pool=pool,
+    )
+
+    for offset, data in blocks.items():
+        started = time.perf_counter()
+        piece.add_block(offset, data)
+
+        if piece.is_complete():
+            assert piece.is_hash_matching()  # noqa: S101
+
+    elapsed = time.perf_counter() - started
+    piece.release()
+
+    return elapsed
+
+
+def measure(shuffled: bool) -> Dict[str, float]:
+    """Measure total and last block time of both assemblies."""
+    data = os.urandom(PIECE_LENGTH)
+    piece_hash = hashlib.sha1(data).digest()  # noqa: S303
+    offsets: List[int] = list(range(0, PIECE_LENGTH, REQUEST_SIZE))
+    if shuffled:
+        random.Random(0).shuffle(offsets)
+    view = memoryview(data)
+    blocks = {
+        offset: view[offset:offset + REQUEST_SIZE]
+        for offset in offsets
+    }
+    pool = PieceBufferPool()
+    results: Dict[str, float] = {}
+
+    for name, assemble in (
+        ('legacy', lambda: legacy_assembly(blocks, piece_hash)),
+        ('pooled', lambda: pooled_assembly(blocks, piece_hash, pool)),
+    ):
+        last_block = 0.0
+        started = time.perf_counter()
+        for _ in range(PIECES_COUNT):
+            last_block += assemble()
+        total = time.perf_counter() - started
+
+        results[f'{name}_piece_ms'] = total / PIECES_COUNT * 1e3
+        results[f'{name}_last_block_ms'] = last_block / PIECES_COUNT * 1e3
+
+    return results
+
+
+def run() -> Dict[str, float]:
+    """Measure assembly of blocks received in order and shuffled."""
+    results = {}
+    for shuffled in (False, True):
+        order = 'shuffled' if shuffled else 'ordered'
+        results.update({
+            f'{order}_{name}': value
+            for name, value in measure(shuffled).items()
+        })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{PIECE_LENGTH // 2**20} MiB pieces of {REQUEST_SIZE} byte blocks')
+    for name, value in run().items():
+        print(f'{name:<32} {value:8.2f}')
@@ -0,0 +1,75 @@
+"""Serving of block requests from storage with and without piece cache.
+
+Peers request 16 KiB blocks of a few popular pieces in random order,
+as rarest pieces of seeder are requested by many leechers at once.
+
+Run: `python -m benchmarks.piece_cache`
+"""
+
+import random
+import time
+import tempfile
+
+from typing import Dict
+from pathlib import Path
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.pieces.cache import PieceCache
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+
+TORRENT_LENGTH = 2**27
+PIECE_LENGTH = 2**20
+POPULAR_PIECES = 32
+PEERS = 20
+CACHE_SIZE = 2**26
+
+
+def run() -> Dict[str, float]:
+    """Measure blocks served per second by cache and by storage reads."""
+    torrent, data = make_torrent_with_data(TORRENT_LENGTH, PIECE_LENGTH)
+    rng = random.Random(42)
+
+    popular = rng.sample(range(TORRENT_LENGTH // PIECE_LENGTH), POPULAR_PIECES)
+    requests = [
+        (piece_index, offset)
+        for piece_index in popular
+        for offset in range(0, PIECE_LENGTH, messages.REQUEST_SIZE)
+        for _ in range(PEERS)
+    ]
+    rng.shuffle(requests)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with TorrentStorage(torrent, Path(directory)) as storage:
+            for piece_index in range(storage.pieces_count):
+                offset = piece_index * PIECE_LENGTH
+                storage.write_piece(
+                    piece_index,
+                    data[offset:offset + PIECE_LENGTH],
+                )
+
+            started = time.perf_counter()
+            for piece_index, offset in requests:
+                storage.read(piece_index, offset, messages.REQUEST_SIZE)
+            uncached = time.perf_counter() - started
+
+            cache = PieceCache(storage, CACHE_SIZE)
+            started = time.perf_counter()
+            for piece_index, offset in requests:
+                cache.read_block(piece_index, offset, messages.REQUEST_SIZE)
+            cached = time.perf_counter() - started
+
+    return {
+        'storage_blocks_per_s': len(requests) / uncached,
+        'cache_blocks_per_s': len(requests) / cached,
+        'cache_hit_ratio': cache.hit_ratio(),
+    }
+
+
+if __name__ == '__main__':
+    print(
+        f'{POPULAR_PIECES} popular pieces of {PIECE_LENGTH // 2**10} KiB, '
+        f'{PEERS} peers request every block',
+    )
+    for name, value in run().items():
+        print(f'{name:<24} {value:12.2f}')
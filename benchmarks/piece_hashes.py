@@ -0,0 +1,101 @@
+"""Memory and time of piece hashes table against list of bytes.
+
+Run: `python -m benchmarks.piece_hashes`
+"""
+
+import os
+import time
+import tracemalloc
+
+from typing import Callable, Dict, List, Tuple
+
+from pico_torrent.protocol.metainfo.piece_hashes import (
+    HASH_LENGTH,
+    PieceHashes,
+)
+
+# 100 GB torrent with 16 KiB pieces
+PIECES_COUNT = 100 * 2**30 // 2**14
+# Per-byte splitting is too slow to run on the full table
+PER_BYTE_PIECES_COUNT = 50_000
+
+
+def split_per_byte(blob: bytes) -> List[bytes]:
+    """Split hashes as it was done by list of one-byte slices."""
+    pieces = []
+    pieces_bytes = [blob[index:index+1] for index in range(len(blob))]
+
+    piece = b''
+    for index, symbol in enumerate(pieces_bytes):
+        piece += symbol
+
+        if index != 0 and index % 20 == 0:
+            pieces.append(piece)
+            piece = b''
+
+    if piece:
+        pieces.append(piece)
+
+    return pieces
+
+
+def split_to_list(blob: bytes) -> List[bytes]:
+    """Split hashes into list of bytes."""
+    return [
+        blob[index:index+HASH_LENGTH]
+        for index in range(0, len(blob), HASH_LENGTH)
+    ]
+
+
+def _measure(func: Callable[[], object]) -> Tuple[float, int, object]:
+    """Return build time, allocated memory and built object."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    built = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak, built
+
+
+def _lookup_time(table, count: int) -> float:
+    """Return time of looking up every hash of table."""
+    started = time.perf_counter()
+    for index in range(count):
+        table[index]
+    return time.perf_counter() - started
+
+
+def run() -> Dict[str, float]:
+    """Measure build time, memory and lookup time of tables."""
+    results: Dict[str, float] = {}
+
+    for count, cases in (
+        (PER_BYTE_PIECES_COUNT, {
+            'per_byte': split_per_byte,
+            'list': split_to_list,
+            'table': PieceHashes,
+        }),
+        (PIECES_COUNT, {
+            'list': split_to_list,
+            'table': PieceHashes,
+        }),
+    ):
+        blob = os.urandom(count * HASH_LENGTH)
+
+        for name, build in cases.items():
+            key = f'{name}[pieces={count}]'
+            elapsed, peak, table = _measure(
+                lambda build=build, blob=blob: build(blob),
+            )
+            results[f'{key}.build_seconds'] = elapsed
+            results[f'{key}.memory_mb'] = peak / 2**20
+            results[f'{key}.lookup_seconds'] = _lookup_time(table, count)
+
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f'{name:<44} {value:12.4f}')
@@ -0,0 +1,104 @@
+"""Piece picker selection time on large swarm.
+
+Picks are measured with partial pieces, which are returned before
+buckets are scanned, without them, so rarest-first scan of buckets
+is timed, and for sparse peers having few pieces, so scan has to
+skip most pieces of buckets.
+
+Run: `python -m benchmarks.piece_picker`
+"""
+
+import time
+import random
+
+from typing import Callable, Dict, List, Sequence, Set
+
+from pico_torrent.protocol.pieces.picker import PiecePicker
+
+PIECES_COUNT = 100_000
+PEERS_COUNT = 1_000
+# Share of pieces every peer has
+PEER_PIECES_SHARE = 0.05
+# Share of pieces of sparse peer, e.g. peer which just joined swarm
+SPARSE_PEER_PIECES_SHARE = 0.001
+PICKS = 2_000
+PARTIAL_COUNT = 50
+
+
+def _pick_time(
+    picker: PiecePicker,
+    peer_pieces: Callable[[], Set[int]],
+    partial: Sequence[int] = (),
+) -> float:
+    """Return mean time of pick for peers given by `peer_pieces`."""
+    started = time.perf_counter()
+    for _ in range(PICKS):
+        pieces = peer_pieces()
+        picker.pick(pieces.__contains__, partial=partial, skip=partial)
+
+    return (time.perf_counter() - started) / PICKS
+
+
+def run() -> Dict[str, float]:
+    """Measure update and pick time of picker in microseconds."""
+    rng = random.Random(0)
+    picker = PiecePicker(PIECES_COUNT, rng=rng)
+    peers_pieces = [
+        set(rng.sample(
+            range(PIECES_COUNT),
+            int(PIECES_COUNT * PEER_PIECES_SHARE),
+        ))
+        for _ in range(PEERS_COUNT)
+    ]
+
+    updates = 0
+    started = time.perf_counter()
+    for pieces in peers_pieces:
+        picker.add_peer_pieces(pieces)
+        updates += len(pieces)
+    update_time = (time.perf_counter() - started) / updates
+
+    sparse_pieces: List[Set[int]] = [
+        set(rng.sample(
+            range(PIECES_COUNT),
+            int(PIECES_COUNT * SPARSE_PEER_PIECES_SHARE),
+        ))
+        for _ in range(PEERS_COUNT)
+    ]
+
+    def random_peer() -> Set[int]:
+        return peers_pieces[rng.randrange(PEERS_COUNT)]
+
+    def sparse_peer() -> Set[int]:
+        return sparse_pieces[rng.randrange(PEERS_COUNT)]
+
+    partial_time = _pick_time(
+        picker,
+        random_peer,
+        partial=rng.sample(range(PIECES_COUNT), PARTIAL_COUNT),
+    )
+    no_partial_time = _pick_time(picker, random_peer)
+    sparse_time = _pick_time(picker, sparse_peer)
+
+    downloaded = rng.sample(range(PIECES_COUNT), PIECES_COUNT // 2)
+    started = time.perf_counter()
+    for piece_index in downloaded:
+        picker.remove(piece_index)
+    remove_time = (time.perf_counter() - started) / len(downloaded)
+
+    return {
+        'update_us': update_time * 1e6,
+        'pick_partial_us': partial_time * 1e6,
+        'pick_no_partial_us': no_partial_time * 1e6,
+        'pick_sparse_peer_us': sparse_time * 1e6,
+        'remove_us': remove_time * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    print(
+        f'{PIECES_COUNT} pieces, {PEERS_COUNT} peers '
+        f'with {PEER_PIECES_SHARE:.0%} of pieces each',
+    )
+    for name, value in run().items():
+        print(f'{name:<20} {value:10.2f}')
@@ -0,0 +1,84 @@
+"""Event loop stalls while completed pieces are verified.
+
+Run: `python -m benchmarks.piece_verifier`
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+
+from typing import Dict, Optional
+
+from pico_torrent.protocol.pieces.verifier import PieceVerifier
+
+PIECE_LENGTH = 4 * 2**20
+PIECES_COUNT = 64
+# Interval of event loop ticks in seconds
+TICK = 0.001
+
+
+async def measure(verifier: Optional[PieceVerifier]) -> Dict[str, float]:
+    """Verify pieces while measuring the longest event loop tick."""
+    data = os.urandom(PIECE_LENGTH)
+    expected = hashlib.sha1(data).digest()  # noqa: S303
+    done = asyncio.Event()
+    verified = 0
+    max_lag = 0.0
+
+    def on_verified(piece_index, piece_data, matching):
+        nonlocal verified
+        verified += 1
+        if verified == PIECES_COUNT:
+            done.set()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            max_lag = max(max_lag, time.perf_counter() - started - TICK)
+
+    started = time.perf_counter()
+    ticks = asyncio.create_task(ticker())
+
+    for piece_index in range(PIECES_COUNT):
+        if verifier is None:
+            on_verified(
+                piece_index,
+                data,
+                hashlib.sha1(data).digest() == expected,  # noqa: S303
+            )
+        else:
+            verifier.submit(piece_index, data, expected, on_verified)
+        # Pieces arrive from network between verifications
+        await asyncio.sleep(0)
+
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await ticks
+
+    return {
+        'mib_s': PIECES_COUNT * PIECE_LENGTH / 2**20 / elapsed,
+        'max_lag_ms': max_lag * 1e3,
+    }
+
+
+def run() -> Dict[str, float]:
+    """Compare verification in event loop with thread pool."""
+    results = {}
+
+    inline = asyncio.run(measure(None))
+    results.update({f'inline_{k}': v for k, v in inline.items()})
+
+    with PieceVerifier() as verifier:
+        pooled = asyncio.run(measure(verifier))
+    results.update({f'pool_{k}': v for k, v in pooled.items()})
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{PIECES_COUNT} pieces of {PIECE_LENGTH // 2**20} MiB')
+    for name, value in run().items():
+        print(f'{name:<18} {value:10.1f}')
@@ -0,0 +1,76 @@
+"""Throughput of on-disk recheck by count of workers.
+
+Data is written to temporary files first, so it is mostly read
+from page cache and hashing dominates.
+
+Run: `python -m benchmarks.recheck`
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+
+from typing import Dict
+from pathlib import Path
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.pieces.recheck import recheck
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+
+TORRENT_LENGTH = 2**28
+PIECE_LENGTH = 2**20
+FILES_COUNT = 16
+
+
+def run() -> Dict[str, float]:
+    """Measure recheck of stored torrent in MiB/s."""
+    torrent, data = make_torrent_with_data(
+        TORRENT_LENGTH,
+        PIECE_LENGTH,
+        FILES_COUNT,
+    )
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        with TorrentStorage(torrent, Path(directory)) as storage:
+            for piece_index in range(storage.pieces_count):
+                offset = piece_index * PIECE_LENGTH
+                storage.write_piece(
+                    piece_index,
+                    data[offset:offset + PIECE_LENGTH],
+                )
+
+            # Piece by piece through storage, as pieces were checked before
+            started = time.perf_counter()
+            for piece_index in range(storage.pieces_count):
+                digest = hashlib.sha1(  # noqa: S303
+                    storage.read(piece_index),
+                ).digest()
+                assert digest == torrent.info.pieces[piece_index]  # noqa: S101
+            elapsed = time.perf_counter() - started
+            results['sequential_mib_s'] = TORRENT_LENGTH / 2**20 / elapsed
+
+        workers_counts = sorted({1, 2, os.cpu_count() or 1})
+        for workers in workers_counts:
+            storage = TorrentStorage(torrent, Path(directory))
+
+            started = time.perf_counter()
+            result = recheck(storage, torrent.info.pieces, workers=workers)
+            elapsed = time.perf_counter() - started
+
+            assert result.have.is_full()  # noqa: S101
+            results[f'workers_{workers}_mib_s'] = (
+                TORRENT_LENGTH / 2**20 / elapsed
+            )
+
+    return results
+
+
+if __name__ == '__main__':
+    print(
+        f'{TORRENT_LENGTH // 2**20} MiB torrent, {FILES_COUNT} files, '
+        f'{PIECE_LENGTH // 2**10} KiB pieces, {os.cpu_count()} cores',
+    )
+    for name, value in run().items():
+        print(f'{name:<24} {value:10.1f}')
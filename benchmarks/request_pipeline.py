@@ -0,0 +1,123 @@
+"""Loopback download throughput against request queue depth.
+
+Stand-in seeder answers every request after injected latency,
+so throughput of one peer is limited by count of outstanding requests.
+
+Run: `python -m benchmarks.request_pipeline`
+"""
+
+import time
+import asyncio
+import ipaddress
+
+from typing import Dict, Optional
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.pipeline import RequestPipeline
+from pico_torrent.protocol.peers.async_connection import (
+    AsyncTorrentPeerConnection,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+
+TORRENT_LENGTH = 16 * 2**20
+# Round trip time injected by seeder in seconds
+LATENCY = 0.01
+DEPTHS = (1, 2, 4, 8, 16, 32, 64)
+PEER_ID = '-PC0100-000000000000'
+
+
+async def serve_requests(reader, writer, data: bytes, latency: float):
+    """Answer block requests of one leecher after latency."""
+    loop = asyncio.get_running_loop()
+
+    writer.write(await reader.readexactly(68))
+    pieces_count = -(-len(data) // 2**18)
+    writer.write(messages.BitField(
+        b'\xff' * (-(-pieces_count // 8)),
+    ).encode())
+    writer.write(messages.Unchoke().encode())
+
+    def answer(request: messages.Request):
+        if writer.is_closing():
+            return
+
+        begin = request.index * 2**18 + request.begin
+        writer.write(messages.Piece(
+            index=request.index,
+            begin=request.begin,
+            block=data[begin:begin+request.length],
+        ).encode())
+
+    try:
+        while True:
+            header = await reader.readexactly(5)
+            body = await reader.readexactly(
+                int.from_bytes(header[:4], 'big') - 1,
+            )
+
+            if header[4] == messages.Request.message_id:
+                loop.call_later(latency, answer, messages.Request(
+                    *(int.from_bytes(body[i:i+4], 'big') for i in (0, 4, 8)),
+                ))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+async def download(depth: Optional[int]) -> float:
+    """Download torrent from seeder, return throughput in MB/s."""
+    torrent, data = make_torrent_with_data(TORRENT_LENGTH)
+    server = await asyncio.start_server(
+        lambda r, w: serve_requests(r, w, data, LATENCY),
+        '127.0.0.1',
+        0,
+    )
+    peer = TorrentPeer(
+        ip=ipaddress.IPv4Address('127.0.0.1'),
+        port=server.sockets[0].getsockname()[1],
+    )
+    manager = PiecesManager(torrent)
+    connection = AsyncTorrentPeerConnection(
+        remote_peer=peer,
+        torrent=torrent,
+        peer_id=PEER_ID,
+        pieces_manager=manager,
+    )
+    if depth is not None:
+        connection.pipeline = RequestPipeline(
+            min_depth=depth,
+            max_depth=depth,
+            initial_depth=depth,
+        )
+
+    started = time.perf_counter()
+    task = asyncio.create_task(connection.communicate())
+
+    while not manager.is_complete():
+        await asyncio.sleep(0.005)
+
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    server.close()
+    await server.wait_closed()
+
+    return TORRENT_LENGTH / 2**20 / elapsed
+
+
+def run() -> Dict[str, float]:
+    """Measure throughput for fixed and adaptive queue depths."""
+    results = {}
+
+    for depth in (*DEPTHS, None):
+        name = f'depth={depth}' if depth is not None else 'depth=adaptive'
+        results[name] = asyncio.run(download(depth))
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'Injected round trip time {LATENCY * 1000:.0f} ms')
+    for name, mb_per_second in run().items():
+        print(f'{name:<16} {mb_per_second:8.2f} MB/s')
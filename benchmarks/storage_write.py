@@ -0,0 +1,57 @@
+"""Write throughput of torrent storage.
+
+Run: `python -m benchmarks.storage_write`
+"""
+
+import time
+import tempfile
+
+from typing import Dict
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+
+LENGTH = 128 * 2**20
+PIECE_LENGTH = 2**18
+FILES_COUNTS = (1, 10_000)
+
+
+def measure_write(files_count: int) -> float:
+    """Write all pieces of torrent, return throughput in MiB/s."""
+    torrent, data = make_torrent_with_data(
+        LENGTH,
+        piece_length=PIECE_LENGTH,
+        files_count=files_count,
+    )
+    view = memoryview(data)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with TorrentStorage(torrent, directory) as storage:
+            started = time.perf_counter()
+
+            for piece_index in range(storage.pieces_count):
+                offset = piece_index * PIECE_LENGTH
+                storage.write_piece(
+                    piece_index,
+                    view[offset:offset + storage.piece_size(piece_index)],
+                )
+
+            elapsed = time.perf_counter() - started
+
+            assert storage.read(0, 0, 16) == data[:16]  # noqa: S101
+
+    return LENGTH / 2**20 / elapsed
+
+
+def run() -> Dict[str, float]:
+    """Measure write throughput for single-file and many-files torrents."""
+    return {
+        f'files_{files_count}_mib_s': measure_write(files_count)
+        for files_count in FILES_COUNTS
+    }
+
+
+if __name__ == '__main__':
+    print(f'{LENGTH // 2**20} MiB torrent, {PIECE_LENGTH // 2**10} KiB pieces')
+    for name, value in run().items():
+        print(f'{name:<20} {value:10.1f}')
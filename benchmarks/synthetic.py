@@ -0,0 +1,93 @@
+"""Synthetic torrent generation for benchmarks."""
+
+import os
+import hashlib
+import collections
+
+from typing import Tuple
+
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+HASH_LENGTH = 20
+
+
+def make_torrent_dict(
+    pieces_count: int,
+    files_count: int = 1,
+    piece_length: int = 2**18,
+) -> collections.OrderedDict:
+    """Build metainfo dictionary with random piece hashes."""
+    total_length = pieces_count * piece_length
+    info: collections.OrderedDict = collections.OrderedDict()
+
+    if files_count > 1:
+        file_length, rest = divmod(total_length, files_count)
+        info[b'files'] = [
+            collections.OrderedDict([
+                (b'length', file_length + (rest if index == 0 else 0)),
+                (b'path', [b'dir%d' % (index % 100), b'file%d.bin' % index]),
+            ])
+            for index in range(files_count)
+        ]
+    else:
+        info[b'length'] = total_length
+
+    info[b'name'] = b'synthetic'
+    info[b'piece length'] = piece_length
+    info[b'pieces'] = os.urandom(pieces_count * HASH_LENGTH)
+
+    torrent: collections.OrderedDict = collections.OrderedDict()
+    torrent[b'announce'] = b'http://127.0.0.1:6969/announce'
+    torrent[b'comment'] = b'synthetic torrent'
+    torrent[b'creation date'] = 1600000000
+    torrent[b'info'] = info
+
+    return torrent
+
+
+def make_torrent_bytes(size: int, files_count: int = 1) -> bytes:
+    """Build bencoded metainfo file of approximately given size."""
+    # Every file entry takes ~50 bytes, rest of size goes to piece hashes
+    pieces_count = max(1, (size - files_count * 50) // HASH_LENGTH)
+    torrent = make_torrent_dict(pieces_count, files_count)
+    return BencodeEncoder().encode(torrent).getvalue()
+
+
+def make_torrent_with_data(
+    length: int,
+    piece_length: int = 2**18,
+    files_count: int = 1,
+    announce: bytes = b'http://127.0.0.1:6969/announce',
+) -> Tuple[TorrentFile, bytes]:
+    """Build torrent with random content split into files."""
+    data = os.urandom(length)
+    pieces = b''.join(
+        hashlib.sha1(data[offset:offset+piece_length]).digest()  # noqa: S303
+        for offset in range(0, length, piece_length)
+    )
+
+    info: collections.OrderedDict = collections.OrderedDict()
+
+    if files_count > 1:
+        file_length, rest = divmod(length, files_count)
+        info[b'files'] = [
+            collections.OrderedDict([
+                (b'length', file_length + (rest if index == 0 else 0)),
+                (b'path', [b'dir%d' % (index % 100), b'file%d.bin' % index]),
+            ])
+            for index in range(files_count)
+        ]
+    else:
+        info[b'length'] = length
+
+    info[b'name'] = b'synthetic.bin'
+    info[b'piece length'] = piece_length
+    info[b'pieces'] = pieces
+
+    torrent: collections.OrderedDict = collections.OrderedDict()
+    torrent[b'announce'] = announce
+    torrent[b'info'] = info
+
+    encoded = BencodeEncoder().encode(torrent)
+    return TorrentFile.from_torrent_file(encoded), data
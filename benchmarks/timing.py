@@ -0,0 +1,32 @@
+"""Timing helpers of benchmarks."""
+
+import time
+
+from typing import Callable
+
+ROUNDS = 5
+
+
+def best_time(func: Callable[[], object], rounds: int = ROUNDS) -> float:
+    """Return best wall time of function over several rounds."""
+    best = float('inf')
+
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    return best
+
+
+def time_per_call(
+    func: Callable[[], object],
+    calls: int,
+    rounds: int = ROUNDS,
+) -> float:
+    """Return best time of one call of function, calls are batched."""
+    def batch():
+        for _ in range(calls):
+            func()
+
+    return best_time(batch, rounds) / calls
@@ -0,0 +1,131 @@
+"""Time to first peer of multi-tracker announce, and pooled connections.
+
+Local stand-in trackers answer after a delay, one tier has a slow
+tracker. Announces one by one are compared with concurrent
+announce of tiers. Repeated announces are measured with new
+connection per request and with pooled kept-alive connections.
+
+Run: `python -m benchmarks.tracker_announce`
+"""
+
+import io
+import time
+import socket
+import asyncio
+import threading
+import http.server
+
+from typing import Dict
+
+import requests
+
+from benchmarks.synthetic import make_torrent_dict
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.trackers.tracker import create_session
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+TIERS = 4
+TRACKER_DELAY = 0.05
+SLOW_TRACKER_DELAY = 1.0
+REPEATED_ANNOUNCES = 200
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, Nagle algorithm would
+    # delay body until ACK of kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        tier = int(self.path.split('?')[0].strip('/'))
+        if tier >= 0:
+            time.sleep(SLOW_TRACKER_DELAY if tier == 0 else TRACKER_DELAY)
+
+        port = max(tier, 0) + 1
+        body = BencodeEncoder().encode({
+            b'interval': 0,
+            b'peers': socket.inet_aton('10.0.0.1') + port.to_bytes(2, 'big'),
+        }).getvalue()
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run() -> Dict[str, float]:
+    """Measure time to first peer and repeated announce latency."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    torrent_dict = make_torrent_dict(16, 1, 2**18)
+    torrent_dict[b'announce-list'] = [
+        [f'{url}/{tier}'.encode()] for tier in range(TIERS)
+    ]
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(
+        BencodeEncoder().encode(torrent_dict).getvalue(),
+    ))
+    results = {}
+
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+    started = time.perf_counter()
+    for tier in trackers.tiers:
+        trackers._announce_tier(tier)
+        if 'sequential_first_peer_s' not in results:
+            results['sequential_first_peer_s'] = (
+                time.perf_counter() - started
+            )
+    results['sequential_all_peers_s'] = time.perf_counter() - started
+
+    async def announce():
+        started = time.perf_counter()
+        first = []
+
+        def on_peers(peers):
+            if not first:
+                first.append(time.perf_counter() - started)
+
+        await trackers.announce(on_peers)
+        return first[0], time.perf_counter() - started
+
+    for tier in trackers.tiers:
+        tier.next_announce = 0.0
+
+    first, total = asyncio.run(announce())
+    results['concurrent_first_peer_s'] = first
+    results['concurrent_all_peers_s'] = total
+    trackers.close()
+
+    fast_url = f'{url}/-1'
+    started = time.perf_counter()
+    for _ in range(REPEATED_ANNOUNCES):
+        requests.get(fast_url, timeout=5)
+    results['new_connection_ms'] = (
+        (time.perf_counter() - started) / REPEATED_ANNOUNCES * 1e3
+    )
+
+    session = create_session()
+    started = time.perf_counter()
+    for _ in range(REPEATED_ANNOUNCES):
+        session.get(fast_url, timeout=5)
+    results['pooled_connection_ms'] = (
+        (time.perf_counter() - started) / REPEATED_ANNOUNCES * 1e3
+    )
+
+    server.shutdown()
+
+    return results
+
+
+if __name__ == '__main__':
+    print(
+        f'{TIERS} tiers, trackers answer in {TRACKER_DELAY * 1e3:.0f} ms, '
+        f'slow one in {SLOW_TRACKER_DELAY * 1e3:.0f} ms',
+    )
+    for name, value in run().items():
+        print(f'{name:<26} {value:10.3f}')
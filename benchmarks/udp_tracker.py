@@ -0,0 +1,103 @@
+"""Announce latency of UDP tracker compared to HTTP tracker.
+
+Both stand-in trackers run locally, so the difference is the cost
+of protocol. HTTP tracker is reached by pooled kept-alive connection.
+
+Run: `python -m benchmarks.udp_tracker`
+"""
+
+import time
+import socket
+import struct
+import threading
+import http.server
+
+from typing import Dict
+
+from benchmarks.tracker_announce import _Handler
+from pico_torrent.protocol.trackers import udp_tracker
+from pico_torrent.protocol.trackers.tracker import (
+    TorrentTracker,
+    create_session,
+)
+from pico_torrent.protocol.trackers.udp_tracker import UdpTorrentTracker
+
+ANNOUNCES = 1000
+PEERS = b''.join(
+    socket.inet_aton('10.0.0.1') + port.to_bytes(2, 'big')
+    for port in range(1, 51)
+)
+
+
+def _serve_udp(sock: socket.socket):
+    """Answer connect and announce requests of UDP tracker protocol."""
+    while True:
+        try:
+            data, address = sock.recvfrom(2048)
+        except OSError:
+            return
+
+        _, action, transaction_id = struct.unpack_from('>QII', data)
+
+        if action == udp_tracker.ACTION_CONNECT:
+            response = struct.pack('>IIQ', 0, transaction_id, 1)
+        else:
+            response = struct.pack(
+                '>IIIII', 1, transaction_id, 900, 0, 50,
+            ) + PEERS
+
+        sock.sendto(response, address)
+
+
+def run() -> Dict[str, float]:
+    """Measure mean announce latency of both protocols."""
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.bind(('127.0.0.1', 0))
+    threading.Thread(
+        target=_serve_udp,
+        args=(udp_socket,),
+        daemon=True,
+    ).start()
+
+    http_server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    options = {
+        'torrent_info_hash': b'i' * 20,
+        'full_torrent_bytes': 2**30,
+        'this_peer_listen_port': 6889,
+        'this_peer_id': 'x' * 20,
+    }
+    udp = UdpTorrentTracker(
+        torrent_announce_url=(
+            f'udp://127.0.0.1:{udp_socket.getsockname()[1]}/announce'
+        ),
+        **options,
+    )
+    http_tracker = TorrentTracker(
+        torrent_announce_url=(
+            f'http://127.0.0.1:{http_server.server_address[1]}/-1'
+        ),
+        session=create_session(),
+        **options,
+    )
+    results = {}
+
+    for name, tracker in (('udp', udp), ('http', http_tracker)):
+        started = time.perf_counter()
+        for _ in range(ANNOUNCES):
+            tracker.get_available_peers()
+        elapsed = time.perf_counter() - started
+        results[f'{name}_announce_us'] = elapsed / ANNOUNCES * 1e6
+
+    udp.close()
+    udp_socket.close()
+    http_server.shutdown()
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{ANNOUNCES} announces to local stand-in trackers')
+    for name, value in run().items():
+        print(f'{name:<24} {value:10.1f}')
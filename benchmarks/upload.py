@@ -0,0 +1,221 @@
+"""Upload of seeding client to stand-in leecher over loopback.
+
+The client seeds synthetic torrent of several files from disk, the
+leecher requests every block of it once in its own thread, so CPU
+time of client thread is measured apart from it. Blocks read through
+piece cache and sent from memory are compared with blocks sent
+straight from files by sendfile.
+
+Run: `python -m benchmarks.upload`
+"""
+
+import os
+import time
+import socket
+import struct
+import asyncio
+import logging
+import tempfile
+import threading
+import ipaddress
+
+from typing import Dict, Tuple
+from pathlib import Path
+
+from benchmarks.synthetic import make_torrent_with_data
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.raw_message import PeerMessageId
+from pico_torrent.protocol.peers.async_connection import (
+    AsyncTorrentPeerConnection,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+CLIENT_PEER_ID = '-PC0100-000000000000'
+LEECHER_PEER_ID = b'-PC0100-111111111111'
+# Files of uneven length, so some blocks span two files, length
+# of torrent is multiple of piece length
+LENGTH = 128 * 2**20
+FILES_COUNT = 3
+PIECE_LENGTH = 2**18
+# Requests kept in flight by leecher
+QUEUE_DEPTH = 64
+UPLOAD_TIMEOUT = 120.0
+
+
+def _receive_exactly(sock: socket.socket, view: memoryview):
+    """Fill view with data of socket."""
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionResetError('seeder closed connection')
+        view = view[received:]
+
+
+class Leecher:
+    """Stand-in peer downloading every block of torrent once."""
+
+    def __init__(self, torrent: TorrentFile):
+        """Listen on loopback for seeding client."""
+        self.torrent = torrent
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.received = 0
+        self.thread = threading.Thread(target=self._leech, daemon=True)
+
+    @property
+    def peer(self) -> TorrentPeer:
+        """Return peer of leecher for client to connect to."""
+        return TorrentPeer(
+            ip=ipaddress.IPv4Address('127.0.0.1'),
+            port=self.server.getsockname()[1],
+        )
+
+    def _requests(self):
+        """Return requests of all blocks of torrent in order."""
+        for index in range(len(self.torrent.info.pieces)):
+            for begin in range(0, PIECE_LENGTH, messages.REQUEST_SIZE):
+                yield messages.Request(index, begin)
+
+    def _leech(self):
+        """Download all blocks from accepted client and disconnect."""
+        with self.server:
+            sock, _ = self.server.accept()
+
+        with sock:
+            handshake = bytearray(68)
+            _receive_exactly(sock, memoryview(handshake))
+            sock.sendall(messages.Handshake(
+                self.torrent.info_hash,
+                LEECHER_PEER_ID,
+            ).encode())
+            sock.sendall(messages.Interested().encode())
+
+            header = memoryview(bytearray(13))
+            block = memoryview(bytearray(messages.MAX_REQUEST_SIZE))
+            requests = self._requests()
+            in_flight = 0
+            unchoked = False
+
+            while True:
+                if unchoked:
+                    batch = b''.join(
+                        request.encode()
+                        for _, request in zip(
+                            range(QUEUE_DEPTH - in_flight),
+                            requests,
+                        )
+                    )
+                    in_flight += len(batch) // 17
+                    sock.sendall(batch)
+
+                    if not in_flight:
+                        return
+
+                _receive_exactly(sock, header[:4])
+                length, = struct.unpack('>I', header[:4])
+                if not length:
+                    continue
+
+                _receive_exactly(sock, header[4:5])
+                message_id = header[4]
+                payload = length - 1
+
+                if message_id == PeerMessageId.Piece:
+                    _receive_exactly(sock, header[5:13])
+                    payload -= 8
+                    self.received += payload
+                    in_flight -= 1
+                elif message_id == PeerMessageId.Unchoke:
+                    unchoked = True
+
+                while payload:
+                    chunk = block[:min(payload, len(block))]
+                    _receive_exactly(sock, chunk)
+                    payload -= len(chunk)
+
+
+def _seeding_manager(
+    torrent: TorrentFile,
+    data: bytes,
+    directory: Path,
+) -> PiecesManager:
+    """Return manager of torrent stored in directory with all pieces."""
+    storage = TorrentStorage(torrent, directory)
+    storage.create_files()
+
+    for index in range(len(torrent.info.pieces)):
+        offset = index * PIECE_LENGTH
+        storage.write_piece(index, data[offset:offset + PIECE_LENGTH])
+
+    manager = PiecesManager(torrent, storage=storage)
+    manager.restore_have(Bitfield.full(len(torrent.info.pieces)))
+
+    return manager
+
+
+def run_upload(
+    manager: PiecesManager,
+    sends_files: bool,
+) -> Tuple[float, float, int]:
+    """Seed to leecher, return wall time, CPU time and uploaded bytes."""
+    leecher = Leecher(manager.torrent)
+    leecher.thread.start()
+
+    conn = AsyncTorrentPeerConnection(
+        remote_peer=leecher.peer,
+        torrent=manager.torrent,
+        peer_id=CLIENT_PEER_ID,
+        pieces_manager=manager,
+    )
+    conn.sends_files = sends_files
+
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+
+    asyncio.run(asyncio.wait_for(conn.communicate(), UPLOAD_TIMEOUT))
+
+    elapsed = time.perf_counter() - started
+    cpu_time = time.thread_time() - cpu_started
+    leecher.thread.join()
+
+    return elapsed, cpu_time, leecher.received
+
+
+def run() -> Dict[str, float]:
+    """Measure upload throughput and CPU time per GiB of both paths."""
+    results = {}
+    # Leecher disconnects when it has everything
+    logging.getLogger('pico_torrent').setLevel(logging.CRITICAL)
+    torrent, data = make_torrent_with_data(
+        LENGTH,
+        PIECE_LENGTH,
+        FILES_COUNT,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        manager = _seeding_manager(torrent, data, Path(directory))
+
+        try:
+            for name, sends_files in (
+                ('memory', False),
+                ('sendfile', hasattr(os, 'sendfile')),
+            ):
+                elapsed, cpu_time, received = run_upload(manager, sends_files)
+                if received != LENGTH:
+                    raise RuntimeError(f'upload by {name} is broken')
+
+                results[f'{name}_mb_s'] = LENGTH / elapsed / 2**20
+                results[f'{name}_cpu_s_per_gb'] = cpu_time * 2**30 / LENGTH
+        finally:
+            manager.storage.close()  # type: ignore
+
+    return results
+
+
+if __name__ == '__main__':
+    print(f'{LENGTH // 2**20} MiB torrent of {FILES_COUNT} files')
+    for name, value in run().items():
+        print(f'{name:<24} {value:10.2f}')
@@ -1,16 +1,40 @@
 """Console application of pico-torrent."""
 
 import sys
+import asyncio
+import contextlib
 import logging
 import argparse
 import dataclasses
 
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 
 from pico_torrent.protocol.metainfo.torrent import TorrentFile
-from pico_torrent.protocol.trackers.tracker import TorrentTracker
-from pico_torrent.protocol.peers import connection
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.swarm import MAX_PEERS, Swarm
+from pico_torrent.protocol.peers.choker import UPLOAD_SLOTS
+from pico_torrent.protocol.peers.listener import LISTEN_PORT, PeerListener
+from pico_torrent.protocol.pieces.cache import PIECE_CACHE_SIZE, PieceCache
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.recheck import (
+    RECHECK_WORKERS,
+    RecheckProgress,
+    recheck,
+)
+from pico_torrent.protocol.pieces.resume import (
+    collect_resume_data,
+    load_resume_data,
+    restore_download,
+    save_periodically,
+    save_resume_data,
+)
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.pieces.verifier import (
+    VERIFY_WORKERS,
+    PieceVerifier,
+)
 from pico_torrent.protocol.utils import peers as peer_utils
 
 
@@ -18,13 +42,33 @@ from pico_torrent.protocol.utils import peers as peer_utils
 class CmdOptions:
     """Command line options."""
 
+    mode: str
     torrent_file: Path
+    download_dir: Path
+    max_peers: int
+    upload_slots: int
+    listen_port: int
+    hash_workers: int
+    resume_file: Optional[Path]
+    cache_size: int
+    exit_on_complete: bool
 
 
 def parse_cmd_args(args: List[str]) -> CmdOptions:
     """Parse command line arguments into CmdOptions object."""
     parser = argparse.ArgumentParser()
 
+    parser.add_argument(
+        'mode',
+        help=(
+            'Download torrent or check pieces stored in download dir, '
+            'downloads by default'
+        ),
+        nargs='?',
+        choices=('download', 'check'),
+        default='download',
+    )
+
     parser.add_argument(
         '--torrent-file',
         help='Path to torrent file',
@@ -33,10 +77,92 @@ def parse_cmd_args(args: List[str]) -> CmdOptions:
         required=True,
     )
 
+    parser.add_argument(
+        '--download-dir',
+        help='Directory for downloaded files',
+        action='store',
+        type=Path,
+        default=Path('.'),
+    )
+
+    parser.add_argument(
+        '--max-peers',
+        help='Count of concurrently connected peers',
+        action='store',
+        type=int,
+        default=MAX_PEERS,
+    )
+
+    parser.add_argument(
+        '--upload-slots',
+        help='Count of peers unchoked by their rate, besides optimistic one',
+        action='store',
+        type=int,
+        default=UPLOAD_SLOTS,
+    )
+
+    parser.add_argument(
+        '--listen-port',
+        help='Port for connections of remote peers',
+        action='store',
+        type=int,
+        default=LISTEN_PORT,
+    )
+
+    parser.add_argument(
+        '--hash-workers',
+        help=(
+            'Count of threads verifying piece hashes, '
+            '0 to hash pieces incrementally in event loop, '
+            f'default is {VERIFY_WORKERS} for download '
+            f'and {RECHECK_WORKERS} for check'
+        ),
+        action='store',
+        type=int,
+        default=None,
+    )
+
+    parser.add_argument(
+        '--resume-file',
+        help='Path to resume file, it is kept in download dir by default',
+        action='store',
+        type=Path,
+        default=None,
+    )
+
+    parser.add_argument(
+        '--cache-size',
+        help='Size of cache of pieces uploaded to peers in MiB',
+        action='store',
+        type=int,
+        default=PIECE_CACHE_SIZE // 2**20,
+    )
+
+    parser.add_argument(
+        '--exit-on-complete',
+        help='Exit when download is complete instead of seeding',
+        action='store_true',
+    )
+
     ns = parser.parse_args(args)
 
+    hash_workers = ns.hash_workers
+    if hash_workers is None:
+        hash_workers = (
+            RECHECK_WORKERS if ns.mode == 'check' else VERIFY_WORKERS
+        )
+
     return CmdOptions(
+        mode=ns.mode,
         torrent_file=ns.torrent_file,
+        download_dir=ns.download_dir,
+        max_peers=ns.max_peers,
+        upload_slots=ns.upload_slots,
+        listen_port=ns.listen_port,
+        hash_workers=hash_workers,
+        resume_file=ns.resume_file,
+        cache_size=ns.cache_size,
+        exit_on_complete=ns.exit_on_complete,
     )
 
 
@@ -68,29 +194,123 @@ def run():
         torrent = TorrentFile.from_torrent_file(f)
         logger.info('Metainfo file successfully parsed')
 
+        if options.mode == 'check':
+            check(torrent, options)
+            return
+
         peer_id = peer_utils.generate_peer_id()
         logger.info(f'Generated peer id is {peer_id!r}')
 
-        tracker = TorrentTracker(
-            torrent_announce_url=torrent.announce,
-            torrent_info_hash=torrent.info_hash,
-            full_torrent_bytes=(
-                len(torrent.info.pieces)*torrent.info.piece_length
-            ),
-            this_peer_id=peer_id,
-            this_peer_listen_port=6889,
+        trackers = TrackersManager.from_torrent(
+            torrent,
+            peer_id=peer_id,
+            listen_port=options.listen_port,
         )
 
-        peers = tracker.get_available_peers()
-        first_peer = peers[0]
+        try:
+            asyncio.run(download(torrent, peer_id, trackers, options))
+        finally:
+            trackers.close()
+
 
-        pieces_manager = connection.PiecesManager(torrent)
+async def download(
+    torrent: TorrentFile,
+    peer_id: str,
+    trackers: TrackersManager,
+    options: CmdOptions,
+):
+    """Download torrent from swarm of peers given by trackers."""
+    async def fetch_peers() -> List[TorrentPeer]:
+        stats = swarm.stats.snapshot()
+        trackers.update_transfer(
+            uploaded=stats.uploaded,
+            downloaded=stats.downloaded,
+            left=stats.left,
+        )
+        # Peers of fast trackers are connected before slow ones answer
+        return await trackers.announce(swarm.add_peers)
+
+    resume_file = options.resume_file or (
+        options.download_dir / f'.{torrent.info_hash.hex()}.resume'
+    )
 
-        conn = connection.TorrentPeerConnection(
-            remote_peer=first_peer,
+    with contextlib.ExitStack() as stack:
+        storage = TorrentStorage(torrent, options.download_dir)
+        stack.callback(storage.close)
+        # Without workers pieces are hashed incrementally in event loop
+        verifier = stack.enter_context(
+            PieceVerifier(options.hash_workers),
+        ) if options.hash_workers > 0 else None
+
+        pieces_manager = PiecesManager(
+            torrent,
+            storage=storage,
+            verifier=verifier,
+            cache=PieceCache(storage, options.cache_size * 2**20),
+        )
+        # Files are checked before missing files are created
+        restore_download(
+            pieces_manager,
+            load_resume_data(resume_file, torrent),
+        )
+        storage.create_files()
+
+        swarm = Swarm(
             torrent=torrent,
             peer_id=peer_id,
             pieces_manager=pieces_manager,
+            peers_source=fetch_peers,
+            max_peers=options.max_peers,
+            upload_slots=options.upload_slots,
+            stop_on_complete=options.exit_on_complete,
+        )
+        listener = PeerListener(port=options.listen_port)
+        listener.add_swarm(swarm)
+        try:
+            await listener.start()
+        except OSError as err:
+            # Remote peers are still connected by us
+            logging.getLogger('pico_torrent.cmd.client').warning(
+                f'Cannot listen on port {options.listen_port}, '
+                f'inbound connections are disabled: {err!r}',
+            )
+        saver = asyncio.create_task(
+            save_periodically(pieces_manager, resume_file),
+        )
+
+        try:
+            await swarm.run()
+        finally:
+            saver.cancel()
+            await listener.close()
+            save_resume_data(
+                resume_file,
+                collect_resume_data(pieces_manager),
+            )
+
+
+def check(torrent: TorrentFile, options: CmdOptions):
+    """Check stored pieces of torrent and report completion of files."""
+    logger = logging.getLogger('pico_torrent.cmd.client')
+
+    def report(progress: RecheckProgress):
+        logger.info(
+            f'Checked {progress.checked_pieces}/{progress.pieces_count} '
+            f'pieces, {progress.have_count} valid, '
+            f'{progress.rate / 2**20:.1f} MiB/s',
         )
 
-        conn.communicate()
+    storage = TorrentStorage(torrent, options.download_dir)
+    result = recheck(
+        storage,
+        torrent.info.pieces,
+        workers=max(1, options.hash_workers),
+        progress=report,
+    )
+
+    for file, completion in zip(storage.files, result.files_completion):
+        logger.info(f'{completion:7.2%} {file.path}')
+
+    logger.info(
+        f'Have {result.have.count()} of {storage.pieces_count} pieces',
+    )
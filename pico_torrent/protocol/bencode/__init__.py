@@ -1,6 +1,10 @@
 """Bencode encoding."""
 
-from .decoder import BencodeDecodeError, BencodeDecoder
+from .decoder import (
+    BencodeDecodeError,
+    BencodeDecoder,
+    BencodeBufferDecoder,
+)
 from .encoder import BencodeEncodeError, BencodeEncoder
 
 
@@ -8,5 +12,6 @@ __all__ = (
     'BencodeEncoder',
     'BencodeEncodeError',
     'BencodeDecoder',
+    'BencodeBufferDecoder',
     'BencodeDecodeError',
 )
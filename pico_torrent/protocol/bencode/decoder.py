@@ -1,97 +1,225 @@
 """Bencode decoder."""
 
-import collections
+from typing import Union, BinaryIO, Dict, List, Optional, Tuple
 
-from typing import Union, BinaryIO
+BencodeValue = Union[list, dict, int, bytes, bytearray, memoryview]
 
-BencodeValue = Union[list, dict, int, bytes]
+# Any object supporting buffer protocol: bytes, bytearray, memoryview, mmap
+BencodeBuffer = Union[bytes, bytearray, memoryview]
+
+# Window size used to search separators inside of memoryview,
+# which does not support `find` method
+_FIND_WINDOW = 32
+
+_INT = ord('i')
+_LIST = ord('l')
+_DICT = ord('d')
+_END = ord('e')
+_ZERO = ord('0')
+_NINE = ord('9')
+_COLON = ord(':')
 
 
 class BencodeDecodeError(Exception):
     """Exception when cannot parse bencode file."""
 
 
-class BencodeDecoder:
-    """Decoder for BENCODE format."""
+class _MemoryViewScanner:
+    """Adapter giving `find` and bytes slicing to a memoryview."""
 
-    def __init__(self, bencode_file: BinaryIO):
+    def __init__(self, view: memoryview):
+        """Initialize scanner over memoryview."""
+        self._view = view
+
+    def __len__(self) -> int:
+        """Return length of view."""
+        return len(self._view)
+
+    def __getitem__(self, item):
+        """Return byte by index or bytes by slice."""
+        if isinstance(item, slice):
+            return self._view[item].tobytes()
+
+        return self._view[item]
+
+    def find(self, sep: bytes, start: int) -> int:
+        """Find separator by scanning small windows of view."""
+        window_start = start
+
+        while window_start < len(self._view):
+            window = self._view[window_start:window_start+_FIND_WINDOW]
+            index = window.tobytes().find(sep)
+
+            if index != -1:
+                return window_start + index
+
+            window_start += _FIND_WINDOW
+
+        return -1
+
+
+class BencodeBufferDecoder:
+    """Decoder for BENCODE format from in-memory buffer.
+
+    Buffer is walked by index and separators are found with `find`,
+    so decoding costs a few C calls per token instead of a call per byte.
+
+    If `zero_copy` is set byte strings are returned as memoryview slices
+    of the buffer, otherwise as slices of buffer type (`bytes` for
+    `bytes` and `mmap` buffers). Dictionary keys are always `bytes`.
+
+    Offsets of values of top-level dictionary are recorded in `spans`,
+    so raw bytes of a value (e.g. `info` of torrent file) can be taken
+    from the buffer without encoding it back.
+    """
+
+    def __init__(self, buffer: BencodeBuffer, zero_copy: bool = False):
         """Initialize bencode decoder."""
-        self._bencode_file = bencode_file
+        self._length = len(buffer)
+        self.position = 0
+        self.spans: Dict[bytes, Tuple[int, int]] = {}
 
-        self._decode_func = {
-            b'i': self._decode_int,
-            b'l': self._decode_list,
-            b'd': self._decode_dict,
-            # Bytes read hack
-            b'0': self._decode_bytes,
-            b'1': self._decode_bytes,
-            b'2': self._decode_bytes,
-            b'3': self._decode_bytes,
-            b'4': self._decode_bytes,
-            b'5': self._decode_bytes,
-            b'6': self._decode_bytes,
-            b'7': self._decode_bytes,
-            b'8': self._decode_bytes,
-            b'9': self._decode_bytes,
-        }
+        # Tokens are scanned by index and `find`, content gives byte strings
+        self._tokens: Union[_MemoryViewScanner, bytes, bytearray]
+        self._content: Union[
+            _MemoryViewScanner, bytes, bytearray, memoryview,
+        ]
 
-    def decode(self) -> BencodeValue:
-        """Decode bencoded sequence into python object."""
-        dtype = self._bencode_file.read(1)
+        if isinstance(buffer, memoryview):
+            self._tokens = _MemoryViewScanner(buffer)
+        else:
+            self._tokens = buffer
 
+        self._content = memoryview(buffer) if zero_copy else self._tokens
+
+    def decode(self) -> BencodeValue:
+        """Decode bencoded value starting at current position."""
         try:
-            return self._decode_func[dtype](dtype)
-        except (KeyError, ValueError, TypeError):
+            value, self.position = self._decode(self.position, self.spans)
+        except (ValueError, TypeError, IndexError):
             raise BencodeDecodeError("not a valid bencoded file")
 
-    def _read_until(self, sep: bytes) -> bytes:
-        """Read bytes from file while not reached separator."""
-        if len(sep) != 1:
-            raise ValueError("length of separator must be 1")
+        return value
 
-        readed_byte = self._bencode_file.read(1)
-        readed_bytes = b''
+    def _decode(
+        self,
+        position: int,
+        spans: Optional[Dict[bytes, Tuple[int, int]]] = None,
+    ) -> Tuple[BencodeValue, int]:
+        """Decode value at position, return it and position after it.
 
-        while readed_byte != sep:
-            readed_bytes += readed_byte
-            readed_byte = self._bencode_file.read(1)
+        Byte strings and integers inside of containers are decoded inline,
+        recursion is used only for nested containers. If value is dictionary
+        and `spans` is given, offsets of dictionary values are put there.
+        """
+        tokens = self._tokens
+        token = tokens[position]
 
-        return readed_bytes
+        if token == _LIST:
+            lst: List[BencodeValue] = []
+            append = lst.append
+            position += 1
+            token = tokens[position]
 
-    def _decode_int(self, dtype: bytes):
-        """Decode integer value."""
-        int_bytes = self._read_until(b'e')
-        return int(int_bytes, base=10)
+            while token != _END:
+                if _ZERO <= token <= _NINE:
+                    start, position = self._bytes_bounds(position)
+                    append(self._content[start:position])
+                elif token == _INT:
+                    number, position = self._decode_int(position)
+                    append(number)
+                else:
+                    item, position = self._decode(position)
+                    append(item)
 
-    def _decode_bytes(self, dtype: bytes) -> bytes:
-        """Decode bytes value."""
-        length = int(dtype + self._read_until(b':'))
-        content = self._bencode_file.read(length)
+                token = tokens[position]
 
-        return content
+            return lst, position + 1
 
-    def _decode_list(self, dtype: bytes) -> list:
-        """Decode list of items."""
-        lst = []
-        dtype = self._bencode_file.read(1)
+        if token == _DICT:
+            dct: Dict[bytes, BencodeValue] = {}
+            position += 1
+            token = tokens[position]
 
-        while dtype != b'e':
-            lst.append(self._decode_func[dtype](dtype))
-            dtype = self._bencode_file.read(1)
+            while token != _END:
+                start, position = self._bytes_bounds(position)
+                key = bytes(tokens[start:position])
+                value_start = position
+                token = tokens[position]
 
-        return lst
+                if _ZERO <= token <= _NINE:
+                    start, position = self._bytes_bounds(position)
+                    dct[key] = self._content[start:position]
+                elif token == _INT:
+                    dct[key], position = self._decode_int(position)
+                else:
+                    dct[key], position = self._decode(position)
+
+                if spans is not None:
+                    spans[key] = (value_start, position)
+
+                token = tokens[position]
+
+            return dct, position + 1
+
+        if _ZERO <= token <= _NINE:
+            start, position = self._bytes_bounds(position)
+            return self._content[start:position], position
+
+        if token == _INT:
+            return self._decode_int(position)
+
+        raise ValueError(f"unknown type marker {token!r}")
+
+    def _bytes_bounds(self, position: int) -> Tuple[int, int]:
+        """Return start and end of byte string at given position."""
+        tokens = self._tokens
+
+        # Fast path for one digit length, common for dictionary keys
+        if tokens[position+1] == _COLON:
+            start = position + 2
+            end = start + tokens[position] - _ZERO
+            colon = position + 1
+        else:
+            colon = tokens.find(b':', position)
+            start = colon + 1
+            end = start + int(tokens[position:colon])
+
+        if colon == -1 or end > self._length:
+            raise ValueError("byte string is out of buffer")
+
+        return start, end
+
+    def _decode_int(self, position: int) -> Tuple[int, int]:
+        """Decode integer at position, return it and position after it."""
+        end = self._tokens.find(b'e', position)
+
+        if end == -1:
+            raise ValueError("integer end is out of buffer")
+
+        return int(self._tokens[position+1:end]), end + 1
+
+
+class BencodeDecoder:
+    """Decoder for BENCODE format."""
+
+    def __init__(self, bencode_file: BinaryIO):
+        """Initialize bencode decoder."""
+        self._bencode_file = bencode_file
+
+    def decode(self) -> BencodeValue:
+        """Decode bencoded sequence into python object.
 
-    def _decode_dict(self, dtype: bytes) -> dict:
-        """Decode dictionary."""
-        dct = collections.OrderedDict()
-        dtype = self._bencode_file.read(1)
+        Whole file is read at once and decoded by `BencodeBufferDecoder`,
+        for seekable files position is moved right after decoded value.
+        """
+        seekable = self._bencode_file.seekable()
+        start = self._bencode_file.tell() if seekable else 0
 
-        while dtype != b'e':
-            key = self._decode_func[dtype](dtype)
-            dtype = self._bencode_file.read(1)
-            value = self._decode_func[dtype](dtype)
-            dct[key] = value
+        decoder = BencodeBufferDecoder(self._bencode_file.read())
+        value = decoder.decode()
 
-            dtype = self._bencode_file.read(1)
+        if seekable:
+            self._bencode_file.seek(start + decoder.position)
 
-        return dct
+        return value
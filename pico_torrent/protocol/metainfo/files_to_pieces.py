@@ -31,16 +31,19 @@ def map_files_to_pieces(
     pieces_count: int,
     piece_length: int,
 ) -> List[MappedToPiecesFile]:
-    """Map pieces to torrent files."""
-    _files = [file.length for file in files]
+    """Map pieces to torrent files.
+
+    Slices of every file go in file order, `offset` and `length`
+    of slice are position and size of file data inside of piece.
+    """
     pieces_to_files_mapping: List[List[PieceSlice]] = []
 
     current_piece_index = 0
     current_piece_offset = 0
 
-    while _files:
+    for file in files:
         pieces_to_files_mapping.append([])
-        current_file_size, _files = _files[0], _files[1:]
+        current_file_size = file.length
 
         while current_file_size > 0:
             current_piece_length = piece_length - current_piece_offset
@@ -49,7 +52,7 @@ def map_files_to_pieces(
                 pieces_to_files_mapping[-1].append(PieceSlice(
                     piece_index=current_piece_index,
                     offset=current_piece_offset,
-                    length=current_piece_offset+current_file_size,
+                    length=current_file_size,
                 ))
                 current_piece_offset += current_file_size
                 current_file_size = 0
@@ -58,7 +61,7 @@ def map_files_to_pieces(
                 pieces_to_files_mapping[-1].append(PieceSlice(
                     piece_index=current_piece_index,
                     offset=current_piece_offset,
-                    length=piece_length,
+                    length=current_piece_length,
                 ))
                 current_piece_index += 1
                 current_piece_offset = 0
@@ -0,0 +1,91 @@
+"""Piece hashes table."""
+
+from typing import Iterator, List, Sequence, Union, overload
+
+# Length of SHA1 digest of piece
+HASH_LENGTH = 20
+
+
+class PieceHashes(Sequence[bytes]):
+    """Table of SHA1 piece hashes backed by one contiguous buffer.
+
+    Table does not split hashes into separate objects, hash of piece
+    is sliced from the buffer on lookup. It behaves as read-only
+    `List[bytes]`, use `as_list` if a real list is required.
+    """
+
+    def __init__(self, buffer: Union[bytes, memoryview]):
+        """Initialize table with concatenated piece hashes."""
+        if len(buffer) % HASH_LENGTH != 0:
+            raise ValueError(
+                f'length of pieces must be multiple of {HASH_LENGTH}',
+            )
+
+        self._buffer = buffer
+        self._count = len(buffer) // HASH_LENGTH
+
+    @property
+    def view(self) -> memoryview:
+        """Read-only view of concatenated piece hashes."""
+        return memoryview(self._buffer).toreadonly()
+
+    def hash_for(self, index: int) -> bytes:
+        """Return hash of piece by piece index."""
+        if not 0 <= index < self._count:
+            raise IndexError(f'piece index {index} out of range')
+
+        start = index * HASH_LENGTH
+        return bytes(self._buffer[start:start+HASH_LENGTH])
+
+    def as_list(self) -> List[bytes]:
+        """Return piece hashes as list."""
+        return list(self)
+
+    def __len__(self) -> int:
+        """Return count of pieces."""
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> bytes:
+        """Return hash of piece by index."""
+
+    @overload
+    def __getitem__(self, index: slice) -> List[bytes]:
+        """Return list of hashes by slice."""
+
+    def __getitem__(self, index):
+        """Return hash by index or list of hashes by slice."""
+        if isinstance(index, slice):
+            return [
+                self.hash_for(piece_index)
+                for piece_index in range(*index.indices(self._count))
+            ]
+
+        if index < 0:
+            index += self._count
+
+        return self.hash_for(index)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Iterate over piece hashes."""
+        buffer = self._buffer
+
+        for start in range(0, self._count * HASH_LENGTH, HASH_LENGTH):
+            yield bytes(buffer[start:start+HASH_LENGTH])
+
+    def __eq__(self, other: object) -> bool:
+        """Compare with other table or sequence of hashes."""
+        if isinstance(other, PieceHashes):
+            return self.view == other.view
+
+        if isinstance(other, (list, tuple)):
+            return len(other) == self._count and all(
+                piece_hash == other_hash
+                for piece_hash, other_hash in zip(self, other)
+            )
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        """Return representation of table."""
+        return f'{type(self).__name__}(count={self._count})'
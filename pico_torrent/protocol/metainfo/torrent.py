@@ -5,15 +5,21 @@ import datetime
 import dataclasses
 
 from pathlib import Path
-from typing import Optional, BinaryIO, List
+from typing import Optional, BinaryIO, List, Union
 
 from pico_torrent.protocol import bencode
+from pico_torrent.protocol.metainfo.piece_hashes import PieceHashes
 
 
 class BadTorrentFile(Exception):
     """Exception when cannot parse given file into TorrentFile."""
 
 
+def _to_str(value: Union[bytes, memoryview]) -> str:
+    """Decode utf-8 string from bytes or memoryview."""
+    return str(value, 'utf-8')
+
+
 @dataclasses.dataclass
 class TorrentInfoFile:
     """Torrent file info."""
@@ -27,9 +33,11 @@ class TorrentInfo:
     """Torrent information."""
 
     name: str
-    pieces: List[bytes]
+    pieces: PieceHashes
     piece_length: int
     files: List[TorrentInfoFile]
+    # Files of multi-file torrent are located in directory `name`
+    multi_file: bool = False
 
 
 @dataclasses.dataclass
@@ -38,7 +46,8 @@ class TorrentFile:
 
     announce: str
 
-    announce_list: Optional[List[str]]
+    # Tiers of tracker urls by BEP 12
+    announce_list: Optional[List[List[str]]]
 
     comment: Optional[str]
     created_by: Optional[str]
@@ -49,19 +58,26 @@ class TorrentFile:
 
     @staticmethod
     def from_torrent_file(bencode_file: BinaryIO) -> 'TorrentFile':
-        """Convert given file-like object to TorrentFile object."""
+        """Convert given file-like object to TorrentFile object.
+
+        Info hash is taken over original bytes of `info` dictionary,
+        byte strings are decoded as views of file content without copies.
+        """
+        raw = bencode_file.read()
+
         try:
-            decoder = bencode.BencodeDecoder(bencode_file)
+            decoder = bencode.BencodeBufferDecoder(raw, zero_copy=True)
             data = decoder.decode()
         except bencode.BencodeDecodeError:
             raise BadTorrentFile("It's not a torrent file")
 
-        if not isinstance(data, dict):
+        if not isinstance(data, dict) or b'info' not in decoder.spans:
             raise BadTorrentFile("It's not a torrent file")
 
-        info = data[b'info']
-        info_bytes = bencode.BencodeEncoder().encode(info).getvalue()
-        info_hash = hashlib.sha1(info_bytes).digest()  # noqa: S303
+        info_start, info_end = decoder.spans[b'info']
+        info_hash = hashlib.sha1(  # noqa: S303
+            memoryview(raw)[info_start:info_end],
+        ).digest()
 
         torrent_files = []
 
@@ -69,45 +85,36 @@ class TorrentFile:
             for f_dict in data[b'info'][b'files']:
                 torrent_files.append(TorrentInfoFile(
                     path=Path(
-                        '/'.join(item.decode() for item in f_dict[b'path']),
+                        '/'.join(_to_str(item) for item in f_dict[b'path']),
                     ),
                     length=f_dict[b'length'],
                 ))
 
         else:
             torrent_files.append(TorrentInfoFile(
-                path=Path(data[b'info'][b'name'].decode()),
+                path=Path(_to_str(data[b'info'][b'name'])),
                 length=data[b'info'][b'length'],
             ))
 
-        pieces = []
-        pieces_bytes = [
-            data[b'info'][b'pieces'][index:index+1]
-            for index in range(len(data[b'info'][b'pieces']))
-        ]
-
-        piece = b''
-        for index, symbol in enumerate(pieces_bytes):
-            piece += symbol
-
-            if index != 0 and index % 20 == 0:
-                pieces.append(piece)
-                piece = b''
-
-        if piece:
-            pieces.append(piece)
+        try:
+            pieces = PieceHashes(data[b'info'][b'pieces'])
+        except ValueError as err:
+            raise BadTorrentFile(str(err)) from err
 
         info = TorrentInfo(
-            name=data[b'info'][b'name'].decode(),
+            name=_to_str(data[b'info'][b'name']),
             pieces=pieces,
             piece_length=data[b'info'][b'piece length'],
             files=torrent_files,
+            multi_file=b'files' in data[b'info'],
         )
 
         announce_list = []
         if b'announce-list' in data:
-            for item in data[b'announce-list']:
-                announce_list.append(item[0].decode())
+            for tier in data[b'announce-list']:
+                urls = [_to_str(url) for url in tier]
+                if urls:
+                    announce_list.append(urls)
 
         comment = data.get(b'comment', b'')
         created_by = data.get(b'created by', b'')
@@ -117,10 +124,10 @@ class TorrentFile:
             creation_date = datetime.datetime.fromtimestamp(creation_date)
 
         definition = TorrentFile(
-            announce=data[b'announce'].decode(),
+            announce=_to_str(data[b'announce']),
             announce_list=announce_list or None,
-            comment=comment.decode() or None,
-            created_by=created_by.decode() or None,
+            comment=_to_str(comment) or None,
+            created_by=_to_str(created_by) or None,
             creation_date=creation_date or None,
             info=info,
             info_hash=info_hash,
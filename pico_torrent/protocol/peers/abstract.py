@@ -2,6 +2,8 @@
 
 import abc
 
+from typing import List, Union
+
 from pico_torrent.protocol.peers.raw_message import (
     RawPeerMessage,
     PeerMessageId,
@@ -27,6 +29,14 @@ class BasePeerMessage(abc.ABC):
     def encode(self) -> bytes:
         """Encode message to bytes."""
 
+    def encode_parts(self) -> List[Union[bytes, memoryview]]:
+        """Encode message to buffers which are sent one after another.
+
+        Messages with large payload return payload as separate buffer,
+        so it is sent without copying.
+        """
+        return [self.encode()]
+
     @classmethod
     def _check_message_type(cls, raw: RawPeerMessage):
         if cls.message_id != raw.message_id:
@@ -0,0 +1,494 @@
+"""Peer-to-Peer connection protocol over asyncio streams."""
+
+import os
+import asyncio
+import struct
+import logging
+
+from typing import Iterable, Optional
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.stats import TorrentStats
+from pico_torrent.protocol.peers.choker import Choker
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.outbound import (
+    HIGH_WATERMARK,
+    LOW_WATERMARK,
+    Buffer,
+    OutboundQueue,
+    send_file_ranges,
+)
+from pico_torrent.protocol.peers.abstract import BasePeerMessage
+from pico_torrent.protocol.peers.connection import (
+    ProtocolError,
+    BaseTorrentPeerConnection,
+    decode_peer_message,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.storage import FileRange
+
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+logger = logging.getLogger('pico_torrent.protocol.peers.async_connection')
+
+
+# Default timeouts in seconds
+CONNECT_TIMEOUT = 10.0
+# Peers send keep-alive message every two minutes
+READ_TIMEOUT = 150.0
+
+
+class PeerStreamProtocol(asyncio.BufferedProtocol):
+    """Asyncio protocol receiving peer stream straight into framer.
+
+    Reading is paused while framer holds more than its capacity
+    of not parsed data, writing is paused by transport watermarks.
+    """
+
+    def __init__(self, framer: MessageFramer):
+        """Initialize protocol."""
+        self.framer = framer
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed = False
+        self.reading_paused = False
+        self.writing_paused = False
+        # Count of received bytes
+        self.received = 0
+        self._error: Optional[Exception] = None
+        self._data_waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport):
+        """Save transport of connection, set its watermarks."""
+        self.transport = transport
+        transport.set_write_buffer_limits(
+            high=HIGH_WATERMARK,
+            low=LOW_WATERMARK,
+        )
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Return free space of framer buffer."""
+        return self.framer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        """Wake up receiver waiting for data."""
+        self.framer.buffer_updated(nbytes)
+        self.received += nbytes
+
+        if self.framer.buffered >= self.framer.capacity:
+            self.transport.pause_reading()  # type: ignore
+            self.reading_paused = True
+
+        self._wake_up(self._data_waiter)
+
+    def resume_reading(self):
+        """Resume reading when framer buffer is parsed enough."""
+        if self.reading_paused and not self.closed:
+            self.reading_paused = False
+            self.transport.resume_reading()  # type: ignore
+
+    def eof_received(self) -> bool:
+        """Close connection on end of stream."""
+        self.closed = True
+        self._wake_up(self._data_waiter)
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]):
+        """Wake up all waiters of closed connection."""
+        self.closed = True
+        self._error = exc
+        self._wake_up(self._data_waiter)
+        self._wake_up(self._drain_waiter)
+
+    def pause_writing(self):
+        """Stop writing when send buffer is over high watermark."""
+        self.writing_paused = True
+
+    def resume_writing(self):
+        """Resume writing when send buffer is under low watermark."""
+        self.writing_paused = False
+        self._wake_up(self._drain_waiter)
+
+    async def wait_for_data(self, received: int):
+        """Wait until more than `received` bytes are received."""
+        if self.received != received:
+            return
+
+        if self.closed:
+            raise ConnectionResetError(
+                'remote peer closed connection',
+            ) from self._error
+
+        self._data_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._data_waiter
+        finally:
+            self._data_waiter = None
+
+    async def drain(self):
+        """Wait until send buffer is under low watermark."""
+        if self.closed:
+            raise ConnectionResetError('connection is closed')
+
+        if not self.writing_paused:
+            return
+
+        self._drain_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._drain_waiter
+        finally:
+            self._drain_waiter = None
+
+        if self.closed:
+            raise ConnectionResetError('connection is closed')
+
+    @staticmethod
+    def _wake_up(waiter: Optional[asyncio.Future]):
+        """Complete waiter if somebody waits for it."""
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
+class AsyncP2PConnection:
+    """Peer-to-Peer connection on asyncio.
+
+    Data is received by buffered protocol into framer, payloads of
+    received messages are views of framer buffer valid until
+    the next `receive` call.
+    """
+
+    def __init__(
+        self,
+        peer: TorrentPeer,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+    ):
+        """Initialize peer-to-peer connection."""
+        self.peer = peer
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.framer = MessageFramer()
+        self.outbound = OutboundQueue()
+        self.protocol: Optional[PeerStreamProtocol] = None
+        self.handshaked = False
+        self._flush_handle: Optional[asyncio.Handle] = None
+        # Handshake of remote peer which connected to us
+        self.remote_handshake: Optional[messages.Handshake] = None
+
+    async def connect(self):
+        """Connect to remote peer."""
+        loop = asyncio.get_running_loop()
+        _, self.protocol = await asyncio.wait_for(
+            loop.create_connection(
+                lambda: PeerStreamProtocol(self.framer),
+                str(self.peer.ip),
+                self.peer.port,
+            ),
+            timeout=self.connect_timeout,
+        )
+
+    def attach(self, protocol: PeerStreamProtocol):
+        """Use connection accepted by server, e.g. from remote peer."""
+        self.protocol = protocol
+        self.framer = protocol.framer
+
+    def disconnect(self):
+        """Disconnect from remote peer, queued messages are flushed."""
+        self.flush()
+        if self.protocol is not None and self.protocol.transport is not None:
+            self.protocol.transport.close()
+
+        self.protocol = None
+
+    def _connected_protocol(self) -> PeerStreamProtocol:
+        """Return protocol of established connection."""
+        if self.protocol is None:
+            raise ProtocolError('connection is not established')
+
+        return self.protocol
+
+    async def _wait_for_data(self):
+        """Wait for new data in read timeout."""
+        protocol = self._connected_protocol()
+        protocol.resume_reading()
+
+        await asyncio.wait_for(
+            protocol.wait_for_data(protocol.received),
+            timeout=self.read_timeout,
+        )
+
+    async def receive_handshake(self) -> messages.Handshake:
+        """Receive handshake which remote peer sends first.
+
+        Connecting peer sends handshake first, so info hash of it tells
+        accepting side which torrent is requested.
+        """
+        try:
+            raw_message = self.framer.next_handshake()
+            while raw_message is None:
+                await self._wait_for_data()
+                raw_message = self.framer.next_handshake()
+
+            self.remote_handshake = messages.Handshake.decode_from_raw(
+                raw_message,
+            )
+        except (ValueError, struct.error) as err:
+            raise ProtocolError('malformed handshake') from err
+
+        return self.remote_handshake
+
+    async def handshake(
+        self,
+        handshake: messages.Handshake,
+    ) -> messages.Handshake:
+        """Make handshake with remote peer and return handshake from remote.
+
+        Handshake of inbound connection is already received
+        by `receive_handshake`, then it is only answered.
+        """
+        if self.handshaked:
+            raise ProtocolError(
+                'handshake must be called only once '
+                'before any other messages are send to remote peer',
+            )
+
+        self.send(handshake)
+        await self.drain()
+
+        peer_handshake = self.remote_handshake
+        if peer_handshake is None:
+            peer_handshake = await self.receive_handshake()
+
+        if peer_handshake.info_hash != handshake.info_hash:
+            raise ProtocolError('Remote peer report other info hash')
+
+        self.handshaked = True
+
+        return peer_handshake
+
+    async def receive(self) -> BasePeerMessage:
+        """Receive message from remote peer.
+
+        Messages already received by the same read are returned
+        without waiting for the socket.
+        """
+        if not self.handshaked:
+            raise ProtocolError(
+                'handshake must be called before send or'
+                ' receive any other messages from remote peer',
+            )
+
+        self.framer.release()
+
+        try:
+            raw_message = self.framer.next_message()
+            while raw_message is None:
+                await self._wait_for_data()
+                raw_message = self.framer.next_message()
+
+            return decode_peer_message(raw_message)
+        except (ValueError, KeyError, struct.error) as err:
+            raise ProtocolError('malformed message from remote peer') from err
+
+    def send(self, message: BasePeerMessage):
+        """Put message into send queue of connection.
+
+        Messages sent in one iteration of event loop are written to
+        transport together, `drain` waits until buffer of connection
+        is flushed enough.
+        """
+        self._connected_protocol()
+        self.outbound.push(message)
+        self._schedule_flush()
+
+    def send_buffer(self, data: Buffer):
+        """Put raw data into send queue, e.g. rest of block."""
+        self._connected_protocol()
+        self.outbound.push_buffer(data)
+        self._schedule_flush()
+
+    def send_file_block(
+        self,
+        header: bytes,
+        ranges: Iterable[FileRange],
+    ) -> int:
+        """Send header of block after queued messages, block from files.
+
+        Block is sent by sendfile straight to socket while buffer of
+        transport is empty, so order of data is kept. Return count of
+        bytes sent from files, the rest of block has to be sent
+        by `send_buffer`.
+        """
+        protocol = self._connected_protocol()
+        self.outbound.push_buffer(header)
+        self.flush()
+
+        transport = protocol.transport
+        sock = transport.get_extra_info('socket')  # type: ignore
+        if sock is None or transport.get_write_buffer_size():  # type: ignore
+            return 0
+
+        return send_file_ranges(sock.fileno(), ranges)
+
+    def _schedule_flush(self):
+        """Flush send queue on the next iteration of event loop."""
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(
+                self.flush,
+            )
+
+    def flush(self):
+        """Write queued messages to transport."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        protocol = self.protocol
+        if protocol is None or protocol.closed:
+            return
+
+        self.outbound.write_to(protocol.transport)  # type: ignore
+
+    async def drain(self):
+        """Wait until send buffer is flushed to remote peer.
+
+        Drain of buffer under high watermark returns at once, so it
+        costs nothing after every sent block.
+        """
+        self.flush()
+
+        protocol = self._connected_protocol()
+        if not protocol.closed and not protocol.writing_paused:
+            return
+
+        await asyncio.wait_for(protocol.drain(), timeout=self.read_timeout)
+
+    async def __aenter__(self) -> 'AsyncP2PConnection':
+        """Context manager for peer to peer connection."""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, err_type, err_value, traceback):
+        """Exit from context closes any connections."""
+        self.disconnect()
+
+
+class AsyncTorrentPeerConnection(BaseTorrentPeerConnection):
+    """Peer to peer connection by BitTorrent protocol on asyncio.
+
+    Many connections are served concurrently by one event loop,
+    cancellation of `communicate` task removes peer from pieces manager.
+    """
+
+    sends_files = hasattr(os, 'sendfile')
+
+    def __init__(
+        self,
+        remote_peer: TorrentPeer,
+        torrent: TorrentFile,
+        peer_id: str,
+        pieces_manager: PiecesManager,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        connection: Optional[AsyncP2PConnection] = None,
+        choker: Optional[Choker] = None,
+        torrent_stats: Optional[TorrentStats] = None,
+    ):
+        """Initialize connection.
+
+        Connection accepted from remote peer might be given,
+        otherwise remote peer is connected by `communicate`.
+        """
+        super().__init__(
+            remote_peer,
+            torrent,
+            peer_id,
+            pieces_manager,
+            choker=choker,
+            torrent_stats=torrent_stats,
+        )
+        self.connection = connection or AsyncP2PConnection(
+            self.remote_peer,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+        self._uploads_ready = asyncio.Event()
+
+    def _uploads_queued(self):
+        """Wake up uploader, requests are answered in background."""
+        self._uploads_ready.set()
+
+    async def _upload(self):
+        """Answer queued requests of remote peer one by one.
+
+        Send buffer is drained after every block, so requests
+        cancelled meanwhile are not answered.
+        """
+        try:
+            while True:
+                await self._uploads_ready.wait()
+
+                request = self.uploads.pop()
+                if request is None:
+                    self._uploads_ready.clear()
+                    continue
+
+                if self._serve_request(request):
+                    await self.connection.drain()
+        except (asyncio.TimeoutError, OSError, ProtocolError) as err:
+            logger.error(
+                f'Cannot upload to peer {self.remote_peer.ip}: {err!r}',
+            )
+            self.connection.disconnect()
+
+    def cancel(self):
+        """Cancel working with that peer."""
+        logger.info(f'Disconnect from peer {self.remote_peer.ip}')
+        if self.choker is not None:
+            self.choker.remove(self)
+        if self.torrent_stats is not None:
+            self.torrent_stats.remove_connection(self)
+        self._release_requests()
+        self.pieces_manager.remove_peer(self.remote_peer)
+        self.connection.disconnect()
+
+    async def communicate(self):
+        """Communicate with remote peer by BitTorrent protocol."""
+        try:
+            await self._communicate()
+        except ProtocolError as err:
+            logger.error(f'Protocol error with peer {self.remote_peer.ip}')
+            logger.exception(err)
+        except asyncio.TimeoutError:
+            logger.error(
+                f'Timeout was reached with peer {self.remote_peer.ip}',
+            )
+        except OSError as err:
+            logger.error(
+                f'Connection to peer {self.remote_peer.ip} '
+                f'failed: {err!r}',
+            )
+        finally:
+            self.cancel()
+
+    async def _communicate(self):
+        """Communicate with remote peer by BitTorrent protocol."""
+        if self.connection.protocol is None:
+            logger.info(f'Try to connect with peer {self.remote_peer.ip}')
+            await self.connection.connect()
+            logger.info(f'Connected to peer {self.remote_peer.ip}')
+
+        logger.info(f'Handshake with peer {self.remote_peer.ip}')
+        await self.connection.handshake(self._handshake_message())
+        self._handshaked()
+        await self.connection.drain()
+
+        uploader = asyncio.create_task(self._upload())
+        try:
+            while True:
+                message = await self.connection.receive()
+                self._handle_message(message)
+                await self.connection.drain()
+        finally:
+            uploader.cancel()
@@ -0,0 +1,176 @@
+"""Choking algorithm deciding which remote peers may download from us."""
+
+import time
+import random
+import asyncio
+import logging
+
+from typing import Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+from pico_torrent.protocol.peers.peer import PeerState, TorrentPeer
+
+logger = logging.getLogger('pico_torrent.protocol.peers.choker')
+
+
+# Interval between choke rounds in seconds
+CHOKE_INTERVAL = 10.0
+# Count of peers unchoked by their transfer rate
+UPLOAD_SLOTS = 4
+# Optimistic unchoke moves to other peer every that count of rounds
+OPTIMISTIC_ROUNDS = 3
+# Peer which sends nothing for that time while we wait for blocks
+# is snubbed, in seconds
+SNUB_TIMEOUT = 60.0
+
+
+class ChokedPeer(Protocol):
+    """Connection with remote peer which choker is able to choke."""
+
+    remote_peer: TorrentPeer
+    remote_peer_state: PeerState
+    downloaded_bytes: int
+    uploaded_bytes: int
+
+    def is_snubbed(self, now: float, timeout: float) -> bool:
+        """Check that remote peer does not answer our requests."""
+
+    def choke_remote_peer(self):
+        """Forbid remote peer to request pieces."""
+
+    def unchoke_remote_peer(self) -> bool:
+        """Allow remote peer to request pieces, return whether it may."""
+
+
+class Choker:
+    """Tit-for-tat choker of remote peers of one swarm.
+
+    Every round interested peers are ranked by rate of bytes they
+    sent us during the round, or by rate we uploaded to them when we
+    are seeding, and the best `upload_slots` peers are unchoked.
+    One more random interested peer is unchoked optimistically and
+    rotated every `optimistic_rounds` rounds, so new peers get a chance
+    to show their rate. Peers which snubbed us are unchoked only
+    optimistically.
+    """
+
+    def __init__(
+        self,
+        is_seeding: Callable[[], bool],
+        upload_slots: int = UPLOAD_SLOTS,
+        interval: float = CHOKE_INTERVAL,
+        optimistic_rounds: int = OPTIMISTIC_ROUNDS,
+        snub_timeout: float = SNUB_TIMEOUT,
+        rng: Optional[random.Random] = None,
+    ):
+        """Initialize choker without peers."""
+        self.is_seeding = is_seeding
+        self.upload_slots = upload_slots
+        self.interval = interval
+        self.optimistic_rounds = optimistic_rounds
+        self.snub_timeout = snub_timeout
+
+        self.peers: Set[ChokedPeer] = set()
+        self.unchoked: Set[ChokedPeer] = set()
+        self.optimistic: Optional[ChokedPeer] = None
+        self.rounds = 0
+
+        self._rng = rng or random.Random()  # noqa: S311
+        # Transfer counters of peers at the start of round
+        self._counters: Dict[ChokedPeer, Tuple[int, int]] = {}
+        self._round_started = time.monotonic()
+
+    def add(self, peer: ChokedPeer):
+        """Start choking of handshaked peer."""
+        self.peers.add(peer)
+        self._counters[peer] = (peer.downloaded_bytes, peer.uploaded_bytes)
+
+    def remove(self, peer: ChokedPeer):
+        """Stop choking of disconnected peer, its slot becomes free."""
+        self.peers.discard(peer)
+        self.unchoked.discard(peer)
+        self._counters.pop(peer, None)
+
+        if self.optimistic is peer:
+            self.optimistic = None
+
+    def peer_interested(self, peer: ChokedPeer):
+        """Unchoke interested peer at once while regular slots are free."""
+        if peer not in self.peers or peer in self.unchoked:
+            return
+
+        regular = self.unchoked - {self.optimistic}
+        # Peer stays choked while we have nothing to give, so it does
+        # not take the slot
+        if (
+            len(regular) < self.upload_slots
+            and peer.unchoke_remote_peer()
+        ):
+            self.unchoked.add(peer)
+
+    def _rate(self, peer: ChokedPeer, seeding: bool, elapsed: float) -> float:
+        """Return transfer rate of peer during the round."""
+        downloaded, uploaded = self._counters.get(peer, (0, 0))
+
+        if seeding:
+            return (peer.uploaded_bytes - uploaded) / elapsed
+
+        return (peer.downloaded_bytes - downloaded) / elapsed
+
+    def run_round(self, now: Optional[float] = None):
+        """Choke and unchoke peers by rates of the finished round."""
+        now = time.monotonic() if now is None else now
+        elapsed = max(now - self._round_started, 1e-6)
+        seeding = self.is_seeding()
+
+        interested = [
+            peer for peer in self.peers if peer.remote_peer_state.interested
+        ]
+        # Snubbed peers do not give us anything, rate does not matter
+        # when we are seeding
+        ranked: List[ChokedPeer] = sorted(
+            (
+                peer for peer in interested
+                if seeding or not peer.is_snubbed(now, self.snub_timeout)
+            ),
+            key=lambda peer: self._rate(peer, seeding, elapsed),
+            reverse=True,
+        )
+        regular = set(ranked[:self.upload_slots])
+
+        if (
+            self.rounds % self.optimistic_rounds == 0
+            or self.optimistic not in interested
+            or self.optimistic in regular
+        ):
+            candidates = [peer for peer in interested if peer not in regular]
+            self.optimistic = self._rng.choice(
+                candidates,
+            ) if candidates else None
+
+        self.unchoked = regular
+        if self.optimistic is not None:
+            self.unchoked.add(self.optimistic)
+
+        for peer in self.peers:
+            if peer in self.unchoked:
+                peer.unchoke_remote_peer()
+            else:
+                peer.choke_remote_peer()
+
+            self._counters[peer] = (peer.downloaded_bytes, peer.uploaded_bytes)
+
+        self.rounds += 1
+        self._round_started = now
+
+        logger.debug(
+            f'Choke round {self.rounds}: unchoked {len(self.unchoked)} '
+            f'of {len(interested)} interested peers',
+        )
+
+    async def run(self):
+        """Run choke rounds until cancelled."""
+        self._round_started = time.monotonic()
+
+        while True:
+            await asyncio.sleep(self.interval)
+            self.run_round()
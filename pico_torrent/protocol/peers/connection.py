@@ -1,22 +1,37 @@
 """Peer-to-Peer connection protocol."""
 
+import os
+import time
 import socket
 import struct
 import logging
 
-from typing import Type, Dict, List
+from typing import Type, Dict, Iterable, Optional, Protocol, cast
 
 
 from pico_torrent.protocol.peers import messages
-from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.peer import PeerState, TorrentPeer
+from pico_torrent.protocol.peers.stats import PeerStats, TorrentStats
+from pico_torrent.protocol.peers.choker import Choker
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.outbound import (
+    Buffer,
+    OutboundQueue,
+    send_file_ranges,
+)
+from pico_torrent.protocol.peers.pipeline import RequestPipeline
+from pico_torrent.protocol.peers.uploads import UploadQueue
 from pico_torrent.protocol.peers.abstract import BasePeerMessage
 from pico_torrent.protocol.peers.raw_message import (
     PeerMessageId,
     RawPeerMessage,
 )
+from pico_torrent.protocol.pieces.piece import PieceBlock
+from pico_torrent.protocol.pieces.storage import FileRange, StorageError
 from pico_torrent.protocol.pieces.manager import PiecesManager
 
 from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
 
 logger = logging.getLogger('pico_torrent.protocol.peers.connection')
 
@@ -41,13 +56,27 @@ class ProtocolError(Exception):
     """P2P connection protocol error."""
 
 
+def decode_peer_message(raw_message: RawPeerMessage) -> BasePeerMessage:
+    """Decode raw message into peer message by MESSAGES table."""
+    return MESSAGES[raw_message.message_id].decode_from_raw(
+        # NOTE: mypy misunderstood this call of a classmethod
+        raw_message,  # type: ignore
+    )
+
+
 class P2PConnection:
-    """Peer-to-Peer connection."""
+    """Peer-to-Peer connection.
+
+    Sent messages are queued and flushed before waiting for data
+    of remote peer or when queue is over its high watermark.
+    """
 
     def __init__(self, peer: TorrentPeer):
         """Initialize peer-to-peer connection."""
         self.peer = peer
         self.conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.framer = MessageFramer()
+        self.outbound = OutboundQueue()
         self.handshaked = False
 
     def handshake(self, handshake: messages.Handshake) -> messages.Handshake:
@@ -60,20 +89,15 @@ class P2PConnection:
 
         self.send(handshake)
 
-        tries = 0
-        handshake_message = b''
-
-        while (
-            len(handshake_message) < messages.Handshake.message_length
-            and tries < 10
-        ):
-            handshake_message = self.conn.recv(
-                messages.Handshake.message_length,
-            )
-            tries += 1
+        try:
+            raw_message = self.framer.next_handshake()
+            while raw_message is None:
+                self._receive_into_framer()
+                raw_message = self.framer.next_handshake()
 
-        raw_message = RawPeerMessage.from_bytes(handshake_message)
-        peer_handshake = messages.Handshake.decode_from_raw(raw_message)
+            peer_handshake = messages.Handshake.decode_from_raw(raw_message)
+        except (ValueError, struct.error) as err:
+            raise ProtocolError('malformed handshake') from err
 
         if peer_handshake.info_hash != handshake.info_hash:
             raise ProtocolError('Remote peer report other info hash')
@@ -82,52 +106,72 @@ class P2PConnection:
 
         return peer_handshake
 
+    def _receive_into_framer(self):
+        """Receive available data of socket straight into framer buffer."""
+        self.flush()
+        received = self.conn.recv_into(self.framer.get_buffer())
+
+        if not received:
+            raise ProtocolError('remote peer closed connection')
+
+        self.framer.buffer_updated(received)
+
     def receive(self) -> BasePeerMessage:
-        """Receive message from remote peer."""
+        """Receive message from remote peer.
+
+        Payload of message is valid until the next call of `receive`.
+        """
         if not self.handshaked:
             raise ProtocolError(
                 'handshake must be called before send or'
                 ' receive any other messages from remote peer',
             )
 
-        tries = 0
-        message_length_bytes = b''
+        self.framer.release()
 
-        while len(message_length_bytes) < 4 and tries < 10:
-            message_length_bytes = self.conn.recv(4)
-            tries += 1
+        try:
+            raw_message = self.framer.next_message()
+            while raw_message is None:
+                self._receive_into_framer()
+                raw_message = self.framer.next_message()
 
-        if len(message_length_bytes) != 4:
-            raise ProtocolError(
-                'unable to read message length from remote peer',
-            )
+            return decode_peer_message(raw_message)
+        except (ValueError, KeyError, struct.error) as err:
+            raise ProtocolError('malformed message from remote peer') from err
 
-        try:
-            message_length, *_ = struct.unpack('>I', message_length_bytes)
-        except struct.error as err:
-            raise ProtocolError(
-                'cannot unpack message length from bytes to integer',
-            ) from err
+    def send(self, message: BasePeerMessage):
+        """Queue message to remote peer, full queue is flushed at once."""
+        self.outbound.push(message)
 
-        message_body = b''
+        while self.outbound.paused:
+            self.outbound.send_to(self.conn)
 
-        while len(message_body) < message_length:
-            received = self.conn.recv(message_length - len(message_body))
-            message_body += received
+    def send_buffer(self, data: Buffer):
+        """Queue raw data to remote peer, e.g. rest of block."""
+        self.outbound.push_buffer(data)
 
-        raw_message_bytes = message_length_bytes + message_body
-        raw_message = RawPeerMessage.from_bytes(raw_message_bytes)
+        while self.outbound.paused:
+            self.outbound.send_to(self.conn)
 
-        peer_message = MESSAGES[raw_message.message_id].decode_from_raw(
-            # NOTE: mypy misunderstood this call of a classmethod
-            raw_message,  # type: ignore
-        )
+    def send_file_block(
+        self,
+        header: bytes,
+        ranges: Iterable[FileRange],
+    ) -> int:
+        """Send header of block after queued messages, block from files.
 
-        return peer_message
+        Return count of bytes sent from files, the rest of block
+        has to be sent by `send_buffer`.
+        """
+        self.outbound.push_buffer(header)
+        self.flush()
 
-    def send(self, message: BasePeerMessage):
-        """Send message to remote peer."""
-        self.conn.sendall(message.encode())
+        return send_file_ranges(self.conn.fileno(), ranges)
+
+    def flush(self):
+        """Send all queued messages to remote peer."""
+        while self.outbound.buffered:
+            self.outbound.send_to(self.conn)
 
     def connect(self):
         """Connect to remote peer."""
@@ -174,8 +218,38 @@ class P2PReadMessageStream:
             raise StopIteration()
 
 
-class TorrentPeerConnection:
-    """Peer to peer connection by BitTorrent protocol."""
+class PeerMessageSender(Protocol):
+    """Connection which is able to send messages to remote peer."""
+
+    def send(self, message: BasePeerMessage):
+        """Send message to remote peer."""
+
+
+class FileSender(PeerMessageSender, Protocol):
+    """Connection which is able to send blocks straight from files."""
+
+    def send_buffer(self, data: Buffer):
+        """Send raw data to remote peer."""
+
+    def send_file_block(
+        self,
+        header: bytes,
+        ranges: Iterable[FileRange],
+    ) -> int:
+        """Send header and block from files, return bytes sent from files."""
+
+
+class BaseTorrentPeerConnection:
+    """State machine of BitTorrent protocol shared by connection engines.
+
+    Subclasses own the transport, they have to set `connection` to object
+    with `send` method which does not wait for remote peer and feed every
+    received message to `_handle_message`. Engines which connection is
+    `FileSender` set `sends_files`, so uploads are sent by sendfile.
+    """
+
+    connection: PeerMessageSender
+    sends_files = False
 
     def __init__(
         self,
@@ -183,20 +257,415 @@ class TorrentPeerConnection:
         torrent: TorrentFile,
         peer_id: str,
         pieces_manager: PiecesManager,
+        choker: Optional[Choker] = None,
+        torrent_stats: Optional[TorrentStats] = None,
     ):
-        """Initialize connection."""
+        """Initialize connection.
+
+        Without choker every interested remote peer is unchoked.
+        Transfers are counted by torrent statistics if they are given.
+        """
         self.remote_peer = remote_peer
-        self.connection = P2PConnection(self.remote_peer)
         self.torrent = torrent
         self.this_peer_id = peer_id
         self.pieces_manager = pieces_manager
-        # States of peers
-        self.this_peer_state: List[str] = []
-        self.remote_peer_state: List[str] = []
+        self.choker = choker
+        self.torrent_stats = torrent_stats
+        self.stats = PeerStats(torrent_stats)
+        # Remote peer chokes us, we are interested in its pieces
+        self.this_peer_state = PeerState()
+        # We choke remote peer, it is interested in our pieces
+        self.remote_peer_state = PeerState()
+        # Bytes of blocks received from and sent to remote peer
+        self.downloaded_bytes = 0
+        self.uploaded_bytes = 0
+        # Time of the last block received or the first request sent
+        # after we had no requests in flight
+        self.last_received = time.monotonic()
+        # Requests sent to remote peer
+        self.pipeline = RequestPipeline()
+        # Requests received from remote peer
+        self.uploads = UploadQueue()
+        # Pieces which remote peer knows we have
+        self._announced: Optional[Bitfield] = None
+        self._announced_count = 0
+
+    def _request_pieces(self):
+        """Fill request pipeline with blocks available on remote peer."""
+        if not self.pipeline.in_flight:
+            self.last_received = time.monotonic()
+
+        while self.pipeline.free_slots():
+            block = self.pieces_manager.next_request(self.remote_peer)
+
+            if block is None:
+                break
+
+            self.connection.send(self.pipeline.add(block))
+
+    def _release_requests(self):
+        """Return outstanding requests to pieces manager."""
+        self.pieces_manager.return_blocks(
+            self.pipeline.drain(),
+            self.remote_peer,
+        )
+
+    def _cancel_request(self, block: PieceBlock) -> bool:
+        """Cancel request of block received from other peer."""
+        if self.pipeline.cancel(block.piece_index, block.offset) is None:
+            return False
+
+        self.connection.send(messages.Cancel(
+            index=block.piece_index,
+            begin=block.offset,
+            length=block.length,
+        ))
+        return True
+
+    def _piece_given(self, piece_message: messages.Piece):
+        now = time.monotonic()
+        self.downloaded_bytes += len(piece_message.block)
+        self.last_received = now
+
+        request = self.pipeline.in_flight.get(
+            (piece_message.index, piece_message.begin),
+        )
+        self.stats.block_received(
+            len(piece_message.block),
+            now - request.sent_at if request is not None else None,
+            now,
+        )
+        self.pipeline.complete(
+            piece_message.index,
+            piece_message.begin,
+            len(piece_message.block),
+            now,
+        )
+        self.pieces_manager.add_piece(piece_message, self.remote_peer)
+
+    def _bitfield_given(self, bitfield_message: messages.BitField):
+        self.pieces_manager.update_peer_with_bitfield(
+            self.remote_peer,
+            bitfield_message,
+        )
+
+    def _have_given(self, have_message: messages.Have):
+        self.pieces_manager.update_peer_with_have_message(
+            self.remote_peer,
+            have_message,
+        )
+
+    def _request_given(self, request: messages.Request):
+        """Queue valid request of remote peer for upload."""
+        if self.remote_peer_state.choked:
+            logger.info(
+                f'Ignore `request` message '
+                f'from choked peer {self.remote_peer.ip}',
+            )
+        elif not self.pieces_manager.is_valid_request(request):
+            logger.warning(
+                f'Ignore invalid request of piece {request.index} '
+                f'from peer {self.remote_peer.ip}',
+            )
+        elif not self.uploads.add(request):
+            logger.warning(
+                f'Upload queue of peer {self.remote_peer.ip} is full',
+            )
+        else:
+            self._uploads_queued()
+
+    def _uploads_queued(self):
+        """Answer queued requests of remote peer.
+
+        Requests are answered at once, engines which send
+        in background override it to wake up their sender.
+        """
+        request = self.uploads.pop()
+
+        while request is not None:
+            self._serve_request(request)
+            request = self.uploads.pop()
+
+    def _serve_request(self, request: messages.Request) -> bool:
+        """Send requested block, return False if it cannot be read.
+
+        Blocks of cached pieces are sent from memory, other blocks
+        are sent straight from files when connection is able to.
+        """
+        if self.sends_files and self.pieces_manager.storage is not None:
+            block = self.pieces_manager.cached_block(request)
+            if block is None:
+                return self._serve_request_from_files(request)
+        else:
+            block = self.pieces_manager.read_block(request)
+            if block is None:
+                return False
+
+        self.connection.send(messages.Piece(
+            index=request.index,
+            begin=request.begin,
+            block=block,
+        ))
+        self._block_sent(len(block))
+        return True
+
+    def _block_sent(self, length: int):
+        """Count block which is sent to remote peer."""
+        self.uploaded_bytes += length
+        self.pieces_manager.uploaded_bytes += length
+        self.stats.block_sent(length)
+
+    def _serve_request_from_files(self, request: messages.Request) -> bool:
+        """Send requested block straight from files by sendfile.
+
+        Only header of block passes through Python, the rest of block
+        which sendfile does not send, e.g. when socket is full,
+        is read from storage and queued.
+        """
+        storage = self.pieces_manager.storage
+        ranges = self.pieces_manager.block_file_ranges(request)
+
+        if storage is None or ranges is None:
+            return False
+
+        connection = cast(FileSender, self.connection)
+        try:
+            sent = connection.send_file_block(
+                messages.Piece.header(
+                    request.index,
+                    request.begin,
+                    request.length,
+                ),
+                ranges,
+            )
+
+            if sent < request.length:
+                connection.send_buffer(storage.read(
+                    request.index,
+                    request.begin + sent,
+                    request.length - sent,
+                ))
+        except StorageError as err:
+            # Header is sent already, so stream cannot be continued
+            raise ProtocolError(
+                f'cannot read block of piece {request.index}',
+            ) from err
+
+        self._block_sent(request.length)
+        return True
+
+    def is_snubbed(self, now: float, timeout: float) -> bool:
+        """Check that remote peer sends nothing for our requests."""
+        return bool(self.pipeline.in_flight) and (
+            now - self.last_received >= timeout
+        )
+
+    def choke_remote_peer(self):
+        """Forbid remote peer to request pieces, its requests are dropped."""
+        if self.remote_peer_state.choked:
+            return
+
+        logger.info(f'Send `choke` message to peer {self.remote_peer.ip}')
+        self.connection.send(messages.Choke())
+        self.remote_peer_state.choked = True
+        self.uploads.clear()
+
+    def unchoke_remote_peer(self) -> bool:
+        """Allow remote peer to request pieces, return whether it may.
+
+        Peer is not unchoked while we have no pieces.
+        """
+        if not self.remote_peer_state.choked:
+            return True
+
+        if not self.pieces_manager.have_count:
+            return False
+
+        logger.info(f'Send `unchoke` message to peer {self.remote_peer.ip}')
+        self.connection.send(messages.Unchoke())
+        self.remote_peer_state.choked = False
+
+        return True
+
+    def _announce_pieces(self):
+        """Send `have` messages of pieces downloaded since last call."""
+        announced = self._announced
+        have_count = self.pieces_manager.have_count
+
+        if announced is None or self._announced_count == have_count:
+            return
+
+        added = self.pieces_manager.have.andnot(announced)
+        for piece_index in added.indices():
+            self.connection.send(messages.Have(piece_index))
+
+        announced |= added
+        self._announced_count = have_count
+
+    def _update_interest(self):
+        """Tell remote peer when it starts or stops having needed pieces."""
+        interested = self.pieces_manager.is_interesting(self.remote_peer)
+        if interested == self.this_peer_state.interested:
+            return
+
+        if interested:
+            logger.info(
+                f'Send `interested` message to peer {self.remote_peer.ip}',
+            )
+            self.connection.send(messages.Interested())
+        else:
+            logger.info(
+                f'Send `not interested` message '
+                f'to peer {self.remote_peer.ip}',
+            )
+            self.connection.send(messages.NotInterested())
+
+        self.this_peer_state.interested = interested
+
+    def _handshake_message(self) -> messages.Handshake:
+        """Return handshake message of this peer."""
+        return messages.Handshake(
+            info_hash=self.torrent.info_hash,
+            peer_id=self.this_peer_id.encode(),
+        )
+
+    def _handshaked(self):
+        """Start communication after successful handshake."""
+        logger.info(f'Success handshaked with peer {self.remote_peer.ip}')
+        self.pieces_manager.cancel_handlers[self.remote_peer] = (
+            self._cancel_request
+        )
+
+        # Remote peer is choked until it is interested in our pieces
+        have = self.pieces_manager.have
+        self._announced = Bitfield(len(have), have.to_bytes())
+        self._announced_count = self.pieces_manager.have_count
+        if have.has_any():
+            logger.info(
+                f'Send `bitfield` message to peer {self.remote_peer.ip}',
+            )
+            self.connection.send(messages.BitField(self._announced))
+
+        if self.choker is not None:
+            self.choker.add(self)
+
+        if self.torrent_stats is not None:
+            self.torrent_stats.add_connection(self)
+
+    def _handle_message(self, message: BasePeerMessage):
+        """Update state of peers by message received from remote peer."""
+        if message.message_id == PeerMessageId.Interested:
+            logger.info(
+                f'Got `interested` message '
+                f'from peer {self.remote_peer.ip}',
+            )
+            self.remote_peer_state.interested = True
+
+            if self.choker is not None:
+                self.choker.peer_interested(self)
+            else:
+                self.unchoke_remote_peer()
+
+        elif message.message_id == PeerMessageId.NotInterested:
+            logger.info(
+                f'Got `not interested` message '
+                f'from peer {self.remote_peer.ip}',
+            )
+            # Peer keeps its slot until the next choke round
+            self.remote_peer_state.interested = False
+
+        elif message.message_id == PeerMessageId.Choke:
+            logger.info(
+                f'Got `choke` message from peer {self.remote_peer.ip}',
+            )
+            self.this_peer_state.choked = True
+            # Remote peer discards all pending requests on choke
+            self._release_requests()
+
+        elif message.message_id == PeerMessageId.Unchoke:
+            logger.info(
+                f'Got `unchoke` message from peer {self.remote_peer.ip}',
+            )
+            self.this_peer_state.choked = False
+
+        elif message.message_id == PeerMessageId.Request:
+            logger.debug(
+                f'Got `request` message '
+                f'from peer {self.remote_peer.ip}',
+            )
+            self._request_given(cast(messages.Request, message))
+
+        elif message.message_id == PeerMessageId.Cancel:
+            logger.debug(
+                f'Got `cancel` message '
+                f'from peer {self.remote_peer.ip}',
+            )
+            cancel = cast(messages.Cancel, message)
+            self.uploads.cancel(cancel.index, cancel.begin, cancel.length)
+
+        elif message.message_id == PeerMessageId.KeepAlive:
+            logger.info(
+                f'Ignore `keep-alive` message '
+                f'from peer {self.remote_peer.ip}',
+            )
+
+        elif message.message_id == PeerMessageId.Have:
+            logger.info(
+                f'Got `have` message '
+                f'from remote peer {self.remote_peer.ip}',
+            )
+            self._have_given(cast(messages.Have, message))
+
+        elif message.message_id == PeerMessageId.BitField:
+            logger.info(
+                f'Got `bitfield` message '
+                f'from remote peer {self.remote_peer.ip}',
+            )
+            self._bitfield_given(cast(messages.BitField, message))
+
+        elif message.message_id == PeerMessageId.Piece:
+            logger.info(
+                f'Got `piece` message '
+                f'from remote peer {self.remote_peer.ip}',
+            )
+            self._piece_given(cast(messages.Piece, message))
+
+        # Pieces of remote peer or ours might be changed by message
+        self._update_interest()
+
+        if (
+            not self.this_peer_state.choked
+            and self.this_peer_state.interested
+        ):
+            self._request_pieces()
+
+        self._announce_pieces()
+
+
+class TorrentPeerConnection(BaseTorrentPeerConnection):
+    """Peer to peer connection by BitTorrent protocol."""
+
+    sends_files = hasattr(os, 'sendfile')
+
+    def __init__(
+        self,
+        remote_peer: TorrentPeer,
+        torrent: TorrentFile,
+        peer_id: str,
+        pieces_manager: PiecesManager,
+    ):
+        """Initialize connection."""
+        super().__init__(remote_peer, torrent, peer_id, pieces_manager)
+        self.connection = P2PConnection(self.remote_peer)
 
     def cancel(self):
         """Cancel working with that peer."""
         logger.info(f'Disconnect from peer {self.remote_peer.ip}')
+        if self.choker is not None:
+            self.choker.remove(self)
+        if self.torrent_stats is not None:
+            self.torrent_stats.remove_connection(self)
+        self._release_requests()
         self.pieces_manager.remove_peer(self.remote_peer)
         self.connection.disconnect()
 
@@ -216,25 +685,6 @@ class TorrentPeerConnection:
 
         self.cancel()
 
-    def _request_piece(self):
-        # TODO: implement request of piece
-        pass
-
-    def _piece_given(self, piece_message: messages.Piece):
-        self.pieces_manager.add_piece(piece_message)
-
-    def _bitfield_given(self, bitfield_message: messages.BitField):
-        self.pieces_manager.update_peer_with_bitfield(
-            self.remote_peer,
-            bitfield_message,
-        )
-
-    def _have_given(self, have_message: messages.Have):
-        self.pieces_manager.update_peer_with_have_message(
-            self.remote_peer,
-            have_message,
-        )
-
     def _communicate(self):
         """Communicate with remote peer by BitTorrent protocol."""
         logger.info(f'Try to connect with peer {self.remote_peer.ip}')
@@ -242,104 +692,8 @@ class TorrentPeerConnection:
         logger.info(f'Connected to peer {self.remote_peer.ip}')
 
         logger.info(f'Handshake with peer {self.remote_peer.ip}')
-        self.connection.handshake(
-            messages.Handshake(
-                info_hash=self.torrent.info_hash,
-                peer_id=self.this_peer_id.encode(),
-            ),
-        )
-        logger.info(f'Success handshaked with peer {self.remote_peer.ip}')
-
-        self.this_peer_state.append('choked')
-        logger.info(f'Send `interested` message to peer {self.remote_peer.ip}')
-        self.connection.send(messages.Interested())
-
-        self.this_peer_state.append('interested')
+        self.connection.handshake(self._handshake_message())
+        self._handshaked()
 
         for message in P2PReadMessageStream(self.connection):
-            if message.message_id == PeerMessageId.Interested:
-                logger.info(
-                    f'Got `interested` message '
-                    f'from peer {self.remote_peer.ip}',
-                )
-                if 'not interested' in self.remote_peer_state:
-                    self.remote_peer_state.remove('not interested')
-
-                self.remote_peer_state.append('interested')
-
-            elif message.message_id == PeerMessageId.NotInterested:
-                logger.info(
-                    f'Got `not interested` message '
-                    f'from peer {self.remote_peer.ip}',
-                )
-                if 'interested' in self.remote_peer_state:
-                    self.remote_peer_state.remove('interested')
-
-                self.remote_peer_state.append('not interested')
-
-            elif message.message_id == PeerMessageId.Choke:
-                logger.info(
-                    f'Got `choke` message from peer {self.remote_peer.ip}',
-                )
-                if 'unchoked' in self.this_peer_state:
-                    self.this_peer_state.remove('unchoked')
-
-                self.this_peer_state.append('choked')
-
-            elif message.message_id == PeerMessageId.Unchoke:
-                logger.info(
-                    f'Got `unchoke` message from peer {self.remote_peer.ip}',
-                )
-                if 'choked' in self.this_peer_state:
-                    self.this_peer_state.remove('choked')
-
-                self.this_peer_state.append('unchoked')
-
-            elif message.message_id == PeerMessageId.Request:
-                logger.info(
-                    f'Ignore `request` message '
-                    f'from peer {self.remote_peer.ip}',
-                )
-
-            elif message.message_id == PeerMessageId.Cancel:
-                logger.info(
-                    f'Ignore `cancel` message '
-                    f'from peer {self.remote_peer.ip}',
-                )
-
-            elif message.message_id == PeerMessageId.KeepAlive:
-                logger.info(
-                    f'Ignore `keep-alive` message '
-                    f'from peer {self.remote_peer.ip}',
-                )
-
-            elif message.message_id == PeerMessageId.Have:
-                logger.info(
-                    f'Got `have` message '
-                    f'from remote peer {self.remote_peer.ip}',
-                )
-                self._have_given(message)
-
-            elif message.message_id == PeerMessageId.BitField:
-                logger.info(
-                    f'Got `bitfield` message '
-                    f'from remote peer {self.remote_peer.ip}',
-                )
-                self._bitfield_given(message)
-
-            elif message.message_id == PeerMessageId.Piece:
-                logger.info(
-                    f'Got `piece` message '
-                    f'from remote peer {self.remote_peer.ip}',
-                )
-                self._piece_given(message)
-
-            if 'choked' not in self.this_peer_state:
-                if 'interested' in self.this_peer_state:
-                    if 'pending request' not in self.this_peer_state:
-                        self.this_peer_state.append('pending request')
-                        logger.info(
-                            f'Pending request piece '
-                            f'from peer {self.remote_peer.ip}',
-                        )
-                        self._request_piece()
+            self._handle_message(message)
@@ -0,0 +1,171 @@
+"""Framing of Peer-to-Peer protocol stream into messages."""
+
+import struct
+
+from typing import Iterator, Optional
+
+from pico_torrent.protocol.peers.raw_message import (
+    HANDSHAKE_LENGTH,
+    HANDSHAKE_PREFIX,
+    PeerMessageId,
+    RawPeerMessage,
+)
+
+# Size of receive buffer, fits several piece messages
+RECEIVE_BUFFER_SIZE = 2**18
+# Free space of buffer which is offered for one read
+MIN_READ_SIZE = 2**14
+# Messages longer than that are considered malformed,
+# largest legal ones are bit fields of huge torrents and 128 KiB blocks
+MAX_MESSAGE_LENGTH = 2**21
+
+LENGTH_PREFIX = struct.Struct('>I')
+LENGTH_PREFIX_SIZE = LENGTH_PREFIX.size
+
+
+class MessageFramer:
+    """Receive buffer splitting stream of peer into raw messages.
+
+    Socket data is received straight into free tail of reusable
+    bytearray, e.g. by `recv_into(framer.get_buffer())`, and messages
+    are returned with payloads as memoryviews of that buffer.
+
+    Payloads stay valid until `release` is called. Unparsed tail of
+    buffer is moved to other buffer when space runs out, so
+    buffer holding unreleased payloads is never overwritten.
+    Two buffers are used in turn, so buffers are not reallocated.
+    """
+
+    def __init__(self, capacity: int = RECEIVE_BUFFER_SIZE):
+        """Initialize empty framer."""
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        # Offsets of unparsed data in buffer
+        self._start = 0
+        self._end = 0
+        # Buffer which might hold unreleased payloads
+        self._retired: Optional[bytearray] = None
+        # Buffer which is free to be used again
+        self._spare: Optional[bytearray] = None
+
+    @property
+    def buffered(self) -> int:
+        """Return count of received and not parsed bytes."""
+        return self._end - self._start
+
+    def get_buffer(self, size_hint: int = -1) -> memoryview:
+        """Return free space of buffer for next read."""
+        if len(self._buffer) - self._end < MIN_READ_SIZE:
+            self._move_to_other_buffer()
+
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int):
+        """Account bytes written into buffer given by `get_buffer`."""
+        self._end += nbytes
+
+    def feed(self, data: bytes):
+        """Copy received data into buffer."""
+        view = memoryview(data)
+
+        while view:
+            buffer = self.get_buffer()
+            size = min(len(buffer), len(view))
+            buffer[:size] = view[:size]
+            self.buffer_updated(size)
+            view = view[size:]
+
+    def release(self):
+        """Allow to reuse memory of returned messages."""
+        if self._retired is not None:
+            self._spare, self._retired = self._retired, None
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def next_handshake(self) -> Optional[RawPeerMessage]:
+        """Return handshake message if it is received completely."""
+        if self.buffered < HANDSHAKE_LENGTH:
+            return None
+
+        start = self._start
+        prefix = self._view[start:start + len(HANDSHAKE_PREFIX)]
+        if prefix != HANDSHAKE_PREFIX:
+            raise ValueError('malformed handshake')
+
+        self._start += HANDSHAKE_LENGTH
+
+        return RawPeerMessage(
+            length=19,
+            message_id=PeerMessageId.Handshake,
+            payload=self._view[start:start + HANDSHAKE_LENGTH],
+        )
+
+    def next_message(self) -> Optional[RawPeerMessage]:
+        """Return next message if it is received completely."""
+        start = self._start
+        if self._end - start < LENGTH_PREFIX_SIZE:
+            return None
+
+        length, = LENGTH_PREFIX.unpack_from(self._buffer, start)
+        if length > MAX_MESSAGE_LENGTH:
+            raise ValueError(f'message of {length} bytes is too long')
+
+        end = start + LENGTH_PREFIX_SIZE + length
+        if end > self._end:
+            return None
+
+        self._start = end
+
+        if length == 0:
+            return RawPeerMessage(
+                length=0,
+                message_id=PeerMessageId.KeepAlive,
+                payload=b'',
+            )
+
+        return RawPeerMessage(
+            length=length,
+            message_id=PeerMessageId(self._buffer[start + 4]),
+            payload=self._view[start + 5:end],
+        )
+
+    def messages(self) -> Iterator[RawPeerMessage]:
+        """Iterate over all completely received messages."""
+        message = self.next_message()
+
+        while message is not None:
+            yield message
+            message = self.next_message()
+
+    def _pending_message_size(self) -> int:
+        """Return full size of partially received message."""
+        if self.buffered < LENGTH_PREFIX_SIZE:
+            return 0
+
+        length, = LENGTH_PREFIX.unpack_from(self._buffer, self._start)
+
+        return LENGTH_PREFIX_SIZE + min(length, MAX_MESSAGE_LENGTH)
+
+    def _move_to_other_buffer(self):
+        """Move unparsed data to the start of spare or new buffer."""
+        buffered = self.buffered
+        size = max(
+            self.capacity,
+            buffered + MIN_READ_SIZE,
+            self._pending_message_size(),
+        )
+        spare = self._spare
+        self._spare = None
+
+        if spare is None or len(spare) < size:
+            spare = bytearray(size)
+
+        spare[:buffered] = self._view[self._start:self._end]
+
+        self._retired = self._buffer
+        self._buffer = spare
+        self._view = memoryview(spare)
+        self._start = 0
+        self._end = buffered
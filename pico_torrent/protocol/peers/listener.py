@@ -0,0 +1,171 @@
+"""Listener of connections of remote peers."""
+
+import asyncio
+import logging
+import ipaddress
+
+from typing import Dict, Optional, Set
+
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.swarm import Swarm
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.connection import ProtocolError
+from pico_torrent.protocol.peers.async_connection import (
+    AsyncP2PConnection,
+    PeerStreamProtocol,
+)
+
+logger = logging.getLogger('pico_torrent.protocol.peers.listener')
+
+
+# Default port announced to trackers
+LISTEN_PORT = 6889
+# Accepted connections which have not sent handshake yet
+MAX_HALF_OPEN = 16
+# Accepted connections of all torrents
+MAX_INBOUND_CONNECTIONS = 100
+# Time given to remote peer to send handshake in seconds
+HANDSHAKE_TIMEOUT = 10.0
+
+
+class InboundProtocol(PeerStreamProtocol):
+    """Stream protocol which reports accepted connection to listener."""
+
+    def __init__(self, listener: 'PeerListener'):
+        """Initialize protocol of accepted connection."""
+        super().__init__(MessageFramer())
+        self.listener = listener
+
+    def connection_made(self, transport):
+        """Pass accepted connection to listener."""
+        super().connection_made(transport)
+        self.listener._connection_made(self)
+
+
+class PeerListener:
+    """Server accepting connections of remote peers.
+
+    Remote peer sends handshake first, connection is routed
+    to swarm of torrent by info hash of handshake and served by the
+    same state machine as outbound connections.
+
+    Connections over `max_half_open` waiting for handshake or over
+    `max_connections` in total are closed at once, so bursts of
+    connections do not exhaust file descriptors.
+    """
+
+    def __init__(
+        self,
+        host: str = '0.0.0.0',  # noqa: S104
+        port: int = LISTEN_PORT,
+        max_half_open: int = MAX_HALF_OPEN,
+        max_connections: int = MAX_INBOUND_CONNECTIONS,
+        handshake_timeout: float = HANDSHAKE_TIMEOUT,
+    ):
+        """Initialize listener, it is started by `start`."""
+        self.host = host
+        self.port = port
+        self.max_half_open = max_half_open
+        self.max_connections = max_connections
+        self.handshake_timeout = handshake_timeout
+
+        self.swarms: Dict[bytes, Swarm] = {}
+        # Connections waiting for handshake
+        self.half_open: Set[InboundProtocol] = set()
+        # Connections given to swarms
+        self.connections: Set[InboundProtocol] = set()
+        self.refused_count = 0
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def add_swarm(self, swarm: Swarm):
+        """Accept connections of remote peers for torrent of swarm."""
+        self.swarms[swarm.torrent.info_hash] = swarm
+
+    def remove_swarm(self, swarm: Swarm):
+        """Stop accepting connections for torrent of swarm."""
+        self.swarms.pop(swarm.torrent.info_hash, None)
+
+    async def start(self):
+        """Start listening on port, port 0 selects free port."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: InboundProtocol(self),
+            self.host,
+            self.port,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f'Listen for peers on port {self.port}')
+
+    async def close(self):
+        """Stop listening, connections waiting for handshake are closed."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        for task in list(self._tasks):
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _connection_made(self, protocol: InboundProtocol):
+        """Start handshake of accepted connection if limits allow."""
+        self.connections = {
+            connection
+            for connection in self.connections
+            if not connection.closed
+        }
+
+        if (
+            len(self.half_open) >= self.max_half_open
+            or len(self.half_open) + len(self.connections)
+            >= self.max_connections
+        ):
+            self.refused_count += 1
+            protocol.transport.close()  # type: ignore
+            return
+
+        self.half_open.add(protocol)
+        task = asyncio.get_running_loop().create_task(self._accept(protocol))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _accept(self, protocol: InboundProtocol):
+        """Receive handshake and give connection to swarm of torrent."""
+        host, port = protocol.transport.get_extra_info(  # type: ignore
+            'peername',
+        )[:2]
+        peer = TorrentPeer(ip=ipaddress.ip_address(host), port=port)
+        connection = AsyncP2PConnection(
+            peer,
+            read_timeout=self.handshake_timeout,
+        )
+        connection.attach(protocol)
+        accepted = False
+
+        try:
+            handshake = await asyncio.wait_for(
+                connection.receive_handshake(),
+                timeout=self.handshake_timeout,
+            )
+
+            swarm = self.swarms.get(handshake.info_hash)
+            if swarm is None:
+                logger.info(f'Peer {peer.ip} requested unknown torrent')
+            elif handshake.peer_id == swarm.peer_id.encode():
+                logger.info('Refuse connection to ourselves')
+            else:
+                # Timeout of established connection is set by swarm
+                connection.read_timeout = swarm.read_timeout
+                accepted = swarm.add_inbound(connection)
+        except (ProtocolError, asyncio.TimeoutError, OSError) as err:
+            logger.info(f'Handshake of peer {peer.ip} failed: {err!r}')
+        finally:
+            self.half_open.discard(protocol)
+
+            if accepted:
+                self.connections.add(protocol)
+            else:
+                connection.disconnect()
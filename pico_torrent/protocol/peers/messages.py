@@ -6,17 +6,20 @@ located at: https://wiki.theory.org/index.php/BitTorrentSpecification
 
 import struct
 
-from typing import List, Final
+from typing import Final, List, Union
 
 from pico_torrent.protocol.peers.abstract import BasePeerMessage
 from pico_torrent.protocol.peers.raw_message import (
     RawPeerMessage,
     PeerMessageId,
 )
+from pico_torrent.protocol.utils.bitfield import Bitfield
 
 
 # Constant representing a request size of bytes
 REQUEST_SIZE: Final[int] = 2**14  # 16 KB
+# Larger requests of remote peers are rejected
+MAX_REQUEST_SIZE: Final[int] = 2**17  # 128 KB
 
 
 class Handshake(BasePeerMessage):
@@ -207,50 +210,45 @@ class BitField(BasePeerMessage):
 
     message_id = PeerMessageId.BitField
 
-    def __init__(self, raw_bitfield: bytes):
+    def __init__(
+        self,
+        raw_bitfield: Union[bytes, bytearray, memoryview, Bitfield],
+    ):
         """Initialize bit field message."""
-        self.raw_bitfield = raw_bitfield
-        self.bit_field_lookup: List[bool] = []
+        if isinstance(raw_bitfield, Bitfield):
+            self.bitfield = raw_bitfield
+        else:
+            self.bitfield = Bitfield.from_bytes(raw_bitfield)
 
-        # FIXME: it's a dirty hack, maybe any other ways of conversion exists?
-        BYTE_LENGTH = 8  # bit
-        for byte in self.raw_bitfield:
-            bin_representation = bin(byte)[2:]
-            bits = [False] * BYTE_LENGTH
-            start_index = BYTE_LENGTH - len(bin_representation)
-
-            for index, symbol in enumerate(bin_representation):
-                bits[start_index + index] = symbol == '1'
-
-            self.bit_field_lookup.extend(bits)
+    @property
+    def raw_bitfield(self) -> memoryview:
+        """Bit field in wire format."""
+        return self.bitfield.to_bytes()
 
     def have_piece(self, piece_index: int) -> bool:
         """Check that bitfield have piece by piece index."""
-        if piece_index > len(self.bit_field_lookup):
+        if piece_index >= len(self.bitfield):
             raise ValueError(
                 f'piece index {piece_index} greater than bit field',
             )
 
-        return self.bit_field_lookup[piece_index]
+        return self.bitfield[piece_index]
 
     @classmethod
     def decode_from_raw(cls, raw_message: RawPeerMessage):
         """Decode from raw peer message."""
         cls._check_message_type(raw_message)
-        bitfield, *_ = struct.unpack(
-            f'>{raw_message.length - 1}s',
-            raw_message.payload,
-        )
-        return cls(raw_bitfield=bitfield)
+        return cls(raw_bitfield=raw_message.payload[:raw_message.length - 1])
 
     def encode(self) -> bytes:
         """Encode message to bytes."""
+        raw_bitfield = self.raw_bitfield
+
         return struct.pack(
-            f'>Ib{len(self.raw_bitfield)}s',
-            len(self.raw_bitfield)+1,
+            '>Ib',
+            len(raw_bitfield)+1,
             self.message_id,
-            self.raw_bitfield,
-        )
+        ) + raw_bitfield
 
 
 class Request(BasePeerMessage):
@@ -307,7 +305,12 @@ class Piece(BasePeerMessage):
     # Piece message length without block data
     BASE_LENGTH = 9
 
-    def __init__(self, index: int, begin: int, block: bytes):
+    def __init__(
+        self,
+        index: int,
+        begin: int,
+        block: Union[bytes, memoryview],
+    ):
         """Initialize piece message."""
         self.index = index
         self.begin = begin
@@ -315,29 +318,45 @@ class Piece(BasePeerMessage):
 
     @classmethod
     def decode_from_raw(cls, raw_message: RawPeerMessage):
-        """Decode from raw peer message."""
+        """Decode from raw peer message.
+
+        Block is a slice of raw payload, so block of message received
+        by framer is a view of receive buffer and is not copied.
+        """
         cls._check_message_type(raw_message)
         index, begin = struct.unpack(
             '>II',
             raw_message.payload[:8],
         )
-        block, *_ = struct.unpack(
-            f'>{raw_message.length-cls.BASE_LENGTH}s',
-            raw_message.payload[8:],
-        )
+        block = raw_message.payload[8:raw_message.length - 1]
+        if len(block) != raw_message.length - cls.BASE_LENGTH:
+            raise ValueError('piece message is shorter than its length')
+
         return cls(index=index, begin=begin, block=block)
 
-    def encode(self) -> bytes:
-        """Encode message to bytes."""
+    @classmethod
+    def header(cls, index: int, begin: int, length: int) -> bytes:
+        """Encode message with block of given length without block data."""
         return struct.pack(
-            f'>IbII{len(self.block)}s',
-            self.BASE_LENGTH+len(self.block),
-            self.message_id,
-            self.index,
-            self.begin,
-            self.block,
+            '>IbII',
+            cls.BASE_LENGTH+length,
+            cls.message_id,
+            index,
+            begin,
         )
 
+    def encode_header(self) -> bytes:
+        """Encode message without block data."""
+        return self.header(self.index, self.begin, len(self.block))
+
+    def encode(self) -> bytes:
+        """Encode message to bytes."""
+        return self.encode_header() + self.block
+
+    def encode_parts(self) -> List[Union[bytes, memoryview]]:
+        """Encode message to header and block, block is not copied."""
+        return [self.encode_header(), memoryview(self.block)]
+
 
 class Cancel(BasePeerMessage):
     """Cancel message of P2P protocol.
@@ -397,13 +416,13 @@ class Port(BasePeerMessage):
     def decode_from_raw(cls, raw_message: RawPeerMessage):
         """Decode from raw peer message."""
         cls._check_message_type(raw_message)
-        port, *_ = struct.unpack('>I', raw_message.payload)
+        port, *_ = struct.unpack('>H', raw_message.payload[:2])
         return cls(listen_port=port)
 
     def encode(self) -> bytes:
         """Encode message to bytes."""
         return struct.pack(
-            '>IbI',
+            '>IbH',
             3,
             self.message_id,
             self.listen_port,
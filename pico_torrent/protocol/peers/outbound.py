@@ -0,0 +1,181 @@
+"""Queue of messages waiting to be sent to remote peer."""
+
+import os
+import errno
+import socket
+import collections
+
+from typing import Deque, Iterable, List, Optional, Protocol, Union
+
+from pico_torrent.protocol.peers.abstract import BasePeerMessage
+from pico_torrent.protocol.pieces.storage import FileRange
+
+
+# Parts of messages shorter than that are copied into shared buffer,
+# longer ones, e.g. blocks of pieces, are sent as separate buffers
+COALESCE_THRESHOLD = 1024
+
+# Producers are paused when that many bytes are queued and resumed
+# when queue is flushed under low watermark
+HIGH_WATERMARK = 256 * 2**10
+LOW_WATERMARK = 64 * 2**10
+
+# Buffers passed to one `sendmsg` call, IOV_MAX is 1024 on Linux
+MAX_SEND_BUFFERS = 512
+
+# Errors of sendfile for files or sockets which it does not support
+SENDFILE_UNSUPPORTED = frozenset((
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+))
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class BufferWriter(Protocol):
+    """Transport which writes many buffers at once, e.g. of asyncio."""
+
+    def writelines(self, buffers: List[Buffer]):
+        """Write buffers one after another."""
+
+
+class OutboundQueue:
+    """Encoded messages of one connection waiting to be sent.
+
+    Small messages queued one after another are coalesced into
+    one buffer, so burst of requests is sent by one syscall. Large
+    payloads are kept as views next to their headers and sent by
+    vectored write without copying.
+    """
+
+    def __init__(
+        self,
+        high_watermark: int = HIGH_WATERMARK,
+        low_watermark: int = LOW_WATERMARK,
+    ):
+        """Initialize empty queue."""
+        if low_watermark > high_watermark:
+            raise ValueError('low watermark is over high watermark')
+
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        # Count of queued bytes
+        self.buffered = 0
+        # Queue is over high watermark and not flushed under low yet
+        self.paused = False
+        self._buffers: Deque[Buffer] = collections.deque()
+        # Last buffer which small messages are appended to
+        self._tail: Optional[bytearray] = None
+
+    def __len__(self) -> int:
+        """Return count of queued buffers."""
+        return len(self._buffers)
+
+    def push(self, message: BasePeerMessage):
+        """Queue encoded message."""
+        for part in message.encode_parts():
+            self.push_buffer(part)
+
+    def push_buffer(self, data: Buffer):
+        """Queue raw data, e.g. part of message sent by other way."""
+        length = len(data)
+
+        if length >= COALESCE_THRESHOLD:
+            self._buffers.append(data)
+            self._tail = None
+        elif length:
+            if self._tail is None:
+                self._tail = bytearray()
+                self._buffers.append(self._tail)
+            self._tail += data
+
+        self.buffered += length
+        if self.buffered >= self.high_watermark:
+            self.paused = True
+
+    def buffers(self, limit: int = MAX_SEND_BUFFERS) -> List[Buffer]:
+        """Return first queued buffers in order of sending."""
+        if len(self._buffers) <= limit:
+            return list(self._buffers)
+
+        return [self._buffers[index] for index in range(limit)]
+
+    def advance(self, sent: int):
+        """Remove bytes which are sent from head of queue."""
+        self.buffered -= sent
+
+        while sent:
+            head = self._buffers[0]
+            if sent < len(head):
+                # Tail cannot grow while its view is queued
+                if head is self._tail:
+                    self._tail = None
+                self._buffers[0] = memoryview(head)[sent:]
+                break
+
+            sent -= len(head)
+            self._buffers.popleft()
+            if head is self._tail:
+                self._tail = None
+
+        if self.paused and self.buffered <= self.low_watermark:
+            self.paused = False
+
+    def send_to(self, sock: socket.socket) -> int:
+        """Send queued buffers by one syscall, return count of sent bytes."""
+        buffers = self.buffers()
+        if not buffers:
+            return 0
+
+        if hasattr(sock, 'sendmsg'):
+            sent = sock.sendmsg(buffers)
+        else:
+            sent = sock.send(b''.join(buffers))
+
+        self.advance(sent)
+        return sent
+
+    def write_to(self, transport: BufferWriter) -> int:
+        """Move all queued buffers to transport, return count of bytes."""
+        buffered = self.buffered
+        if buffered:
+            transport.writelines(list(self._buffers))
+            self.advance(buffered)
+
+        return buffered
+
+
+def send_file_ranges(sock_fd: int, ranges: Iterable[FileRange]) -> int:
+    """Send ranges of files to socket by sendfile, return count of bytes.
+
+    Sending stops early when socket is full, file is shorter than
+    range or sendfile does not support that file.
+    """
+    sent = 0
+
+    for file_range in ranges:
+        range_sent = 0
+
+        while range_sent < file_range.length:
+            try:
+                count = os.sendfile(
+                    sock_fd,
+                    file_range.fd,
+                    file_range.offset + range_sent,
+                    file_range.length - range_sent,
+                )
+            except BlockingIOError:
+                return sent + range_sent
+            except OSError as err:
+                if err.errno in SENDFILE_UNSUPPORTED:
+                    return sent + range_sent
+                raise
+
+            if not count:
+                return sent + range_sent
+            range_sent += count
+
+        sent += range_sent
+
+    return sent
@@ -3,10 +3,23 @@
 import ipaddress
 import dataclasses
 
+from typing import Union
+
 
 @dataclasses.dataclass(frozen=True)
 class TorrentPeer:
     """Torrent peer definition."""
 
-    ip: ipaddress.IPv4Address
+    ip: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
     port: int
+
+
+@dataclasses.dataclass
+class PeerState:
+    """Choke and interest flags of one side of connection.
+
+    Every peer starts choked and not interested by BitTorrent protocol.
+    """
+
+    choked: bool = True
+    interested: bool = False
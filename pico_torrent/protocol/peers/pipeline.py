@@ -0,0 +1,175 @@
+"""Pipeline of block requests to remote peer."""
+
+import math
+import time
+import dataclasses
+
+from typing import Dict, List, Optional, Tuple
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.pieces.piece import PieceBlock
+
+
+# Bounds of count of outstanding requests
+MIN_QUEUE_DEPTH = 2
+MAX_QUEUE_DEPTH = 250
+INITIAL_QUEUE_DEPTH = 4
+
+# Queue keeps `DEPTH_GAIN` times more requests than bandwidth-delay
+# product, so queue grows until peer throughput stops to grow
+DEPTH_GAIN = 2.0
+
+# Window of throughput measurement in seconds
+RATE_WINDOW = 0.25
+# Weight of new sample in moving averages
+EWMA_ALPHA = 0.3
+
+BlockKey = Tuple[int, int]
+
+
+@dataclasses.dataclass
+class InFlightRequest:
+    """Request sent to remote peer and not answered yet."""
+
+    block: PieceBlock
+    sent_at: float
+
+
+class RequestPipeline:
+    """Outstanding block requests to one remote peer.
+
+    Queue depth follows bandwidth-delay product of connection:
+    measured throughput multiplied by minimal round trip time
+    of request, so queue is long enough to keep connection busy.
+    Until throughput is measured depth grows by one on every received
+    block, i.e. doubles every round trip.
+    """
+
+    def __init__(
+        self,
+        min_depth: int = MIN_QUEUE_DEPTH,
+        max_depth: int = MAX_QUEUE_DEPTH,
+        initial_depth: int = INITIAL_QUEUE_DEPTH,
+    ):
+        """Initialize request pipeline."""
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.depth = max(min_depth, min(initial_depth, max_depth))
+
+        self.in_flight: Dict[BlockKey, InFlightRequest] = {}
+
+        # Moving average of throughput in bytes per second
+        self.rate: Optional[float] = None
+        # Round trip times of requests in seconds
+        self.rtt: Optional[float] = None
+        self.min_rtt: Optional[float] = None
+
+        self._window_started: Optional[float] = None
+        self._window_bytes = 0
+
+    def free_slots(self) -> int:
+        """Return count of requests which might be sent now."""
+        return max(0, self.depth - len(self.in_flight))
+
+    def add(
+        self,
+        block: PieceBlock,
+        now: Optional[float] = None,
+    ) -> messages.Request:
+        """Register block as requested and return request message."""
+        now = time.monotonic() if now is None else now
+
+        self.in_flight[(block.piece_index, block.offset)] = InFlightRequest(
+            block=block,
+            sent_at=now,
+        )
+
+        if self._window_started is None:
+            self._window_started = now
+
+        return messages.Request(
+            index=block.piece_index,
+            begin=block.offset,
+            length=block.length,
+        )
+
+    def complete(
+        self,
+        index: int,
+        begin: int,
+        length: int,
+        now: Optional[float] = None,
+    ) -> Optional[PieceBlock]:
+        """Match received block to request and update queue depth.
+
+        Return requested block, or None if block was not requested.
+        """
+        request = self.in_flight.pop((index, begin), None)
+
+        if request is None:
+            return None
+
+        now = time.monotonic() if now is None else now
+        self._update_rtt(now - request.sent_at)
+
+        if self.rate is None:
+            self.depth = min(self.depth + 1, self.max_depth)
+
+        self._update_rate(length, now)
+
+        return request.block
+
+    def cancel(self, index: int, begin: int) -> Optional[PieceBlock]:
+        """Forget request of block, return it if it was requested."""
+        request = self.in_flight.pop((index, begin), None)
+        return request.block if request is not None else None
+
+    def drain(self) -> List[PieceBlock]:
+        """Forget all outstanding requests and return their blocks.
+
+        Used on choke or disconnect, when remote peer drops requests.
+        """
+        blocks = [request.block for request in self.in_flight.values()]
+        self.in_flight.clear()
+        self._window_started = None
+        self._window_bytes = 0
+
+        return blocks
+
+    def _update_rtt(self, rtt: float):
+        """Update round trip time averages."""
+        self.rtt = rtt if self.rtt is None else (
+            EWMA_ALPHA * rtt + (1 - EWMA_ALPHA) * self.rtt
+        )
+        self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+
+    def _update_rate(self, length: int, now: float):
+        """Update throughput by received bytes, adjust queue depth."""
+        self._window_bytes += length
+
+        if self._window_started is None:
+            self._window_started = now
+            return
+
+        elapsed = now - self._window_started
+        if elapsed < RATE_WINDOW:
+            return
+
+        rate = self._window_bytes / elapsed
+        self.rate = rate if self.rate is None else (
+            EWMA_ALPHA * rate + (1 - EWMA_ALPHA) * self.rate
+        )
+        self._window_started = now
+        self._window_bytes = 0
+
+        self._adjust_depth()
+
+    def _adjust_depth(self):
+        """Set queue depth to bandwidth-delay product of connection."""
+        if self.rate is None or self.min_rtt is None:
+            return
+
+        bdp_blocks = self.rate * self.min_rtt / messages.REQUEST_SIZE
+        depth = math.ceil(bdp_blocks * DEPTH_GAIN) + 1
+
+        self.depth = max(self.min_depth, min(depth, self.max_depth))
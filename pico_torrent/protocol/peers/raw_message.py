@@ -4,6 +4,8 @@ import enum
 import struct
 import dataclasses
 
+from typing import Union
+
 
 class PeerMessageId(enum.IntEnum):
     """Peer message ids according to specification."""
@@ -24,29 +26,31 @@ class PeerMessageId(enum.IntEnum):
     Handshake = -2  # Handshake is not real message
 
 
+HANDSHAKE_LENGTH = 68
+HANDSHAKE_PREFIX = b'\x13BitTorrent protocol'
+
+
 @dataclasses.dataclass
 class RawPeerMessage:
     """Raw peer message."""
 
     length: int
     message_id: PeerMessageId
-    payload: bytes
+    payload: Union[bytes, memoryview]
 
     @staticmethod
     def from_bytes(raw_payload: bytes) -> 'RawPeerMessage':
         """Convert raw bytes payload into RawPeerMessage."""
         # Check for Handshake message
-        try:
-            parts = struct.unpack('>B19s8x20s20s', raw_payload)
-        except struct.error:
-            pass
-        else:
-            if parts[1] == b'BitTorrent protocol':
-                return RawPeerMessage(
-                    length=19,
-                    message_id=PeerMessageId.Handshake,
-                    payload=raw_payload,
-                )
+        if (
+            len(raw_payload) == HANDSHAKE_LENGTH
+            and raw_payload[:len(HANDSHAKE_PREFIX)] == HANDSHAKE_PREFIX
+        ):
+            return RawPeerMessage(
+                length=19,
+                message_id=PeerMessageId.Handshake,
+                payload=raw_payload,
+            )
 
         length, *_ = struct.unpack('>I', raw_payload[:4])
 
@@ -0,0 +1,188 @@
+"""Throughput and latency statistics of peers and of torrent."""
+
+import time
+import dataclasses
+
+from typing import Dict, List, Optional, Protocol
+
+from pico_torrent.protocol.peers.peer import PeerState, TorrentPeer
+from pico_torrent.protocol.peers.pipeline import RequestPipeline
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.utils.stats import Histogram, RateMeter
+
+
+@dataclasses.dataclass
+class PeerSnapshot:
+    """Statistics of one remote peer at some moment."""
+
+    peer: TorrentPeer
+    download_rate: float
+    upload_rate: float
+    downloaded: int
+    uploaded: int
+    # Requests sent to remote peer and not answered yet
+    in_flight: int
+    # Time from request of block to its arrival in seconds
+    latency_p50: Optional[float]
+    latency_p90: Optional[float]
+    # Remote peer chokes us
+    choked: bool
+    # We choke remote peer
+    choking: bool
+
+
+@dataclasses.dataclass
+class TorrentSnapshot:
+    """Statistics of torrent and its connected peers at some moment."""
+
+    download_rate: float
+    upload_rate: float
+    downloaded: int
+    uploaded: int
+    left: int
+    have_count: int
+    pieces_count: int
+    in_flight: int
+    hash_failures: int
+    wasted_bytes: int
+    latency_p50: Optional[float]
+    latency_p90: Optional[float]
+    peers: List[PeerSnapshot]
+
+
+class PeerStats:
+    """Transfer meters of one remote peer.
+
+    Transfers are counted by torrent statistics too, if they are given.
+    """
+
+    def __init__(self, torrent_stats: Optional['TorrentStats'] = None):
+        """Initialize statistics without transfers."""
+        self.torrent_stats = torrent_stats
+        self.download = RateMeter()
+        self.upload = RateMeter()
+        self.latency = Histogram()
+
+    def block_received(
+        self,
+        length: int,
+        latency: Optional[float],
+        now: Optional[float] = None,
+    ):
+        """Count received block, latency is None for unrequested block."""
+        now = time.monotonic() if now is None else now
+        self.download.add(length, now)
+
+        if latency is not None:
+            self.latency.add(latency)
+
+        if self.torrent_stats is not None:
+            self.torrent_stats.download.add(length, now)
+
+            if latency is not None:
+                self.torrent_stats.latency.add(latency)
+
+    def block_sent(self, length: int, now: Optional[float] = None):
+        """Count block sent to remote peer."""
+        now = time.monotonic() if now is None else now
+        self.upload.add(length, now)
+
+        if self.torrent_stats is not None:
+            self.torrent_stats.upload.add(length, now)
+
+
+class MeasuredConnection(Protocol):
+    """Connection with remote peer which reports its statistics."""
+
+    remote_peer: TorrentPeer
+    this_peer_state: PeerState
+    remote_peer_state: PeerState
+    pipeline: RequestPipeline
+    stats: PeerStats
+
+
+class TorrentStats:
+    """Transfer statistics of torrent and of its connections.
+
+    Snapshot is taken on demand, e.g. for status line or announce.
+    """
+
+    def __init__(self, pieces_manager: PiecesManager):
+        """Initialize statistics of torrent of pieces manager."""
+        self.pieces_manager = pieces_manager
+        self.download = RateMeter()
+        self.upload = RateMeter()
+        self.latency = Histogram()
+        self.connections: Dict[TorrentPeer, MeasuredConnection] = {}
+
+    def add_connection(self, connection: MeasuredConnection):
+        """Report statistics of handshaked connection in snapshots."""
+        self.connections[connection.remote_peer] = connection
+
+    def remove_connection(self, connection: MeasuredConnection):
+        """Stop reporting statistics of closed connection."""
+        if self.connections.get(connection.remote_peer) is connection:
+            del self.connections[connection.remote_peer]
+
+    def snapshot(self, now: Optional[float] = None) -> TorrentSnapshot:
+        """Return statistics of torrent and connected peers."""
+        now = time.monotonic() if now is None else now
+        manager = self.pieces_manager
+
+        peers = [
+            PeerSnapshot(
+                peer=peer,
+                download_rate=connection.stats.download.rate(now),
+                upload_rate=connection.stats.upload.rate(now),
+                downloaded=connection.stats.download.total,
+                uploaded=connection.stats.upload.total,
+                in_flight=len(connection.pipeline.in_flight),
+                latency_p50=connection.stats.latency.percentile(0.5),
+                latency_p90=connection.stats.latency.percentile(0.9),
+                choked=connection.this_peer_state.choked,
+                choking=connection.remote_peer_state.choked,
+            )
+            for peer, connection in self.connections.items()
+        ]
+
+        return TorrentSnapshot(
+            download_rate=self.download.rate(now),
+            upload_rate=self.upload.rate(now),
+            downloaded=manager.downloaded_bytes,
+            uploaded=manager.uploaded_bytes,
+            left=manager.left_bytes(),
+            have_count=manager.have_count,
+            pieces_count=manager.pieces_count,
+            in_flight=sum(peer.in_flight for peer in peers),
+            hash_failures=manager.hash_failures,
+            wasted_bytes=manager.wasted_bytes,
+            latency_p50=self.latency.percentile(0.5),
+            latency_p90=self.latency.percentile(0.9),
+            peers=peers,
+        )
+
+
+def _format_latency(latency: Optional[float]) -> str:
+    """Return latency in milliseconds or dash if it is unknown."""
+    return '-' if latency is None else f'{latency * 1000:.0f}'
+
+
+def format_status(snapshot: TorrentSnapshot) -> str:
+    """Return one line status of torrent for command line."""
+    done = snapshot.have_count / snapshot.pieces_count if (
+        snapshot.pieces_count
+    ) else 1.0
+    unchoked = sum(not peer.choked for peer in snapshot.peers)
+
+    return (
+        f'{done:.1%} done, '
+        f'down {snapshot.download_rate / 2**10:.1f} KiB/s, '
+        f'up {snapshot.upload_rate / 2**10:.1f} KiB/s, '
+        f'left {snapshot.left / 2**20:.1f} MiB, '
+        f'peers {len(snapshot.peers)} ({unchoked} unchoke us), '
+        f'in flight {snapshot.in_flight}, '
+        f'latency p50/p90 {_format_latency(snapshot.latency_p50)}/'
+        f'{_format_latency(snapshot.latency_p90)} ms, '
+        f'hash failures {snapshot.hash_failures}, '
+        f'wasted {snapshot.wasted_bytes / 2**10:.0f} KiB'
+    )
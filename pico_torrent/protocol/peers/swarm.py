@@ -0,0 +1,298 @@
+"""Swarm of remote peers downloading one torrent."""
+
+import time
+import asyncio
+import logging
+import collections
+
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.stats import TorrentStats, format_status
+from pico_torrent.protocol.peers.choker import UPLOAD_SLOTS, Choker
+from pico_torrent.protocol.peers.async_connection import (
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    AsyncP2PConnection,
+    AsyncTorrentPeerConnection,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+logger = logging.getLogger('pico_torrent.protocol.peers.swarm')
+
+
+# Default count of concurrently connected peers
+MAX_PEERS = 30
+# Minimal interval between requests for new peers in seconds
+PEERS_REFRESH_INTERVAL = 30.0
+# Interval between status reports in seconds
+REPORT_INTERVAL = 5.0
+# Tasks which are still running after that time are cancelled again
+CANCEL_RETRY_INTERVAL = 0.1
+
+PeersSource = Callable[[], Awaitable[List[TorrentPeer]]]
+
+
+async def _cancel_tasks(tasks: List[asyncio.Task]):
+    """Cancel tasks and wait until they are finished.
+
+    `asyncio.wait_for` of Python before 3.12 swallows cancellation
+    when awaited future is done at the same time, so tasks which
+    are still running are cancelled again.
+    """
+    pending = set(tasks)
+
+    while pending:
+        for task in pending:
+            task.cancel()
+
+        _, pending = await asyncio.wait(
+            pending,
+            timeout=CANCEL_RETRY_INTERVAL,
+        )
+
+    # Exceptions of finished tasks are retrieved
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class Swarm:
+    """Swarm of remote peers sharing one pieces manager.
+
+    Swarm keeps up to `max_peers` connections, a slot of failed
+    connection is taken by the next candidate peer. When candidates
+    are exhausted new peers are requested from `peers_source`.
+    """
+
+    def __init__(
+        self,
+        torrent: TorrentFile,
+        peer_id: str,
+        pieces_manager: PiecesManager,
+        peers_source: Optional[PeersSource] = None,
+        max_peers: int = MAX_PEERS,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        peers_refresh_interval: float = PEERS_REFRESH_INTERVAL,
+        report_interval: float = REPORT_INTERVAL,
+        upload_slots: int = UPLOAD_SLOTS,
+        stop_on_complete: bool = False,
+    ):
+        """Initialize swarm.
+
+        Swarm keeps seeding after download unless `stop_on_complete`.
+        """
+        self.torrent = torrent
+        self.peer_id = peer_id
+        self.pieces_manager = pieces_manager
+        self.peers_source = peers_source
+        self.max_peers = max_peers
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.peers_refresh_interval = peers_refresh_interval
+        self.report_interval = report_interval
+        # Remote peers are unchoked by rate they give us, or by rate
+        # they take from us after download is complete
+        self.choker = Choker(
+            is_seeding=pieces_manager.is_complete,
+            upload_slots=upload_slots,
+        )
+        # Throughput and latency of torrent and of connected peers
+        self.stats = TorrentStats(pieces_manager)
+
+        self.candidates: Deque[TorrentPeer] = collections.deque()
+        self.active: Dict[TorrentPeer, asyncio.Task] = {}
+        # Connections of active peers, handshake of them tells peer id
+        self.connections: Dict[TorrentPeer, AsyncP2PConnection] = {}
+
+        self._last_refresh: Optional[float] = None
+        self._peers_added = asyncio.Event()
+        self._stopped = asyncio.Event()
+
+        self.stop_on_complete = stop_on_complete
+        if stop_on_complete:
+            pieces_manager.completion_handlers.append(self.stop)
+
+    def add_peers(self, peers: Iterable[TorrentPeer]):
+        """Add candidate peers, known and connected peers are skipped."""
+        added = 0
+
+        for peer in peers:
+            if peer in self.active or peer in self.candidates:
+                continue
+
+            self.candidates.append(peer)
+            added += 1
+
+        if added:
+            logger.info(f'Added {added} candidate peers')
+            self._peers_added.set()
+
+    def add_inbound(self, connection: AsyncP2PConnection) -> bool:
+        """Take connection accepted from remote peer after its handshake.
+
+        Inbound peers share slots with outbound ones, connection
+        is refused when swarm is full or peer is already connected.
+        Remote peer connects from ephemeral port, so it is recognized
+        by peer id of its handshake.
+        """
+        peer = connection.peer
+        handshake = connection.remote_handshake
+
+        if (
+            self._stopped.is_set()
+            or peer in self.active
+            or len(self.active) >= self.max_peers
+        ):
+            return False
+
+        if handshake is not None and self._is_connected(handshake.peer_id):
+            logger.info(f'Peer {peer.ip} is already connected')
+            return False
+
+        logger.info(f'Accepted connection of peer {peer.ip}')
+        peer_connection = AsyncTorrentPeerConnection(
+            remote_peer=peer,
+            torrent=self.torrent,
+            peer_id=self.peer_id,
+            pieces_manager=self.pieces_manager,
+            read_timeout=self.read_timeout,
+            connection=connection,
+            choker=self.choker,
+            torrent_stats=self.stats,
+        )
+        self.connections[peer] = connection
+        self.active[peer] = asyncio.create_task(peer_connection.communicate())
+        # Wake up run loop, so it waits for the new task too
+        self._peers_added.set()
+
+        return True
+
+    def stop(self):
+        """Stop swarm, all connections are cancelled."""
+        self._stopped.set()
+
+    async def run(self):
+        """Run swarm until it is stopped."""
+        reporter = asyncio.create_task(self._report_status())
+        choker = asyncio.create_task(self.choker.run())
+        refresh: Optional[asyncio.Task] = None
+
+        if self.stop_on_complete and self.pieces_manager.is_complete():
+            self.stop()
+
+        try:
+            while not self._stopped.is_set():
+                # Trackers might answer slowly, peers are refreshed in
+                # background and connected as soon as they are added
+                if refresh is None or refresh.done():
+                    refresh = asyncio.create_task(self._refresh_peers())
+
+                self._fill_slots()
+                await self._wait_for_changes()
+        finally:
+            tasks = [reporter, choker, *self.active.values()]
+            if refresh is not None:
+                tasks.append(refresh)
+
+            await _cancel_tasks(tasks)
+            self.active.clear()
+            self.connections.clear()
+
+    def _is_connected(self, peer_id: bytes) -> bool:
+        """Check whether remote peer with given id is connected."""
+        for connection in self.connections.values():
+            handshake = connection.remote_handshake
+            if handshake is not None and handshake.peer_id == peer_id:
+                return True
+
+        return False
+
+    def _fill_slots(self):
+        """Connect to candidate peers while free slots exist."""
+        while self.candidates and len(self.active) < self.max_peers:
+            peer = self.candidates.popleft()
+            self.connections[peer] = AsyncP2PConnection(
+                peer,
+                connect_timeout=self.connect_timeout,
+                read_timeout=self.read_timeout,
+            )
+            peer_connection = AsyncTorrentPeerConnection(
+                remote_peer=peer,
+                torrent=self.torrent,
+                peer_id=self.peer_id,
+                pieces_manager=self.pieces_manager,
+                read_timeout=self.read_timeout,
+                connection=self.connections[peer],
+                choker=self.choker,
+                torrent_stats=self.stats,
+            )
+            self.active[peer] = asyncio.create_task(
+                peer_connection.communicate(),
+            )
+
+    async def _refresh_peers(self):
+        """Request new peers when there are not enough candidates."""
+        if self.peers_source is None:
+            return
+
+        if len(self.active) + len(self.candidates) >= self.max_peers:
+            return
+
+        now = time.monotonic()
+        if (
+            self._last_refresh is not None
+            and now - self._last_refresh < self.peers_refresh_interval
+        ):
+            return
+
+        self._last_refresh = now
+
+        try:
+            self.add_peers(await self.peers_source())
+        except Exception as err:
+            logger.error(f'Cannot fetch new peers: {err!r}')
+
+    async def _wait_for_changes(self):
+        """Wait for finished connection, new peers, stop or refresh time."""
+        self._peers_added.clear()
+
+        waiters = [
+            asyncio.create_task(self._peers_added.wait()),
+            asyncio.create_task(self._stopped.wait()),
+        ]
+
+        try:
+            await asyncio.wait(
+                [*self.active.values(), *waiters],
+                timeout=self.peers_refresh_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+        for peer, task in list(self.active.items()):
+            if task.done():
+                del self.active[peer]
+                self.connections.pop(peer, None)
+
+    async def _report_status(self):
+        """Log status line of torrent periodically."""
+        manager = self.pieces_manager
+
+        while True:
+            await asyncio.sleep(self.report_interval)
+
+            logger.info(
+                f'{format_status(self.stats.snapshot())}, '
+                f'{len(self.active)} active connections '
+                f'and {len(self.candidates)} candidates',
+            )
+
+            if manager.cache is not None and manager.cache.misses:
+                logger.info(
+                    f'Piece cache hit ratio '
+                    f'{manager.cache.hit_ratio():.1%}, '
+                    f'{manager.cache.cached_bytes / 2**20:.1f} MiB cached',
+                )
@@ -0,0 +1,59 @@
+"""Queue of block requests received from remote peer."""
+
+import collections
+
+from typing import Optional, Tuple
+
+from pico_torrent.protocol.peers import messages
+
+
+# Requests over that count are dropped, remote peer requests them again
+MAX_UPLOAD_QUEUE = 500
+
+RequestKey = Tuple[int, int, int]
+
+
+class UploadQueue:
+    """Requests of remote peer waiting to be answered in order.
+
+    Duplicate requests are queued once, cancelled requests are removed,
+    so blocks which remote peer does not need anymore are not sent.
+    """
+
+    def __init__(self, max_length: int = MAX_UPLOAD_QUEUE):
+        """Initialize empty queue."""
+        self.max_length = max_length
+        self._requests: collections.OrderedDict = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        """Return count of queued requests."""
+        return len(self._requests)
+
+    def add(self, request: messages.Request) -> bool:
+        """Queue request, return False if queue is full."""
+        key = (request.index, request.begin, request.length)
+
+        if key in self._requests:
+            return True
+
+        if len(self._requests) >= self.max_length:
+            return False
+
+        self._requests[key] = request
+        return True
+
+    def cancel(self, index: int, begin: int, length: int) -> bool:
+        """Remove request from queue, return True if it was queued."""
+        return self._requests.pop((index, begin, length), None) is not None
+
+    def pop(self) -> Optional[messages.Request]:
+        """Return the oldest queued request."""
+        if not self._requests:
+            return None
+
+        _, request = self._requests.popitem(last=False)
+        return request
+
+    def clear(self):
+        """Drop all queued requests, e.g. when remote peer is choked."""
+        self._requests.clear()
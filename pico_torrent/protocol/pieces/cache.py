@@ -0,0 +1,129 @@
+"""Cache of stored pieces served to remote peers."""
+
+import logging
+import collections
+
+from typing import Optional, Union
+
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.cache')
+
+
+# Default size limit of cached pieces in bytes
+PIECE_CACHE_SIZE = 2**26
+
+
+class PieceCache:
+    """LRU cache of whole pieces read from storage.
+
+    Remote peers request pieces by blocks, so the whole piece is read
+    by one call on the first request and following blocks of the same
+    piece, e.g. requested by other peers, are served from memory.
+    Least recently used pieces are dropped when cached pieces
+    take more than `max_bytes`. Freshly downloaded pieces might be
+    put by `put`, other peers are likely to request them soon.
+    """
+
+    def __init__(
+        self,
+        storage: TorrentStorage,
+        max_bytes: int = PIECE_CACHE_SIZE,
+    ):
+        """Initialize empty cache of storage pieces."""
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.cached_bytes = 0
+        self._pieces: collections.OrderedDict = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.read_bytes = 0
+
+    def hit_ratio(self) -> float:
+        """Return share of blocks served from memory."""
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def cached_block(
+        self,
+        piece_index: int,
+        offset: int,
+        length: int,
+    ) -> Optional[memoryview]:
+        """Return block of cached piece, None on miss."""
+        piece = self._pieces.get(piece_index)
+
+        if piece is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._pieces.move_to_end(piece_index)
+
+        return _block_of(piece_index, piece, offset, length)
+
+    def read_block(
+        self,
+        piece_index: int,
+        offset: int,
+        length: int,
+    ) -> memoryview:
+        """Return block of piece, piece is read from storage on miss."""
+        block = self.cached_block(piece_index, offset, length)
+        if block is not None:
+            return block
+
+        piece = self.storage.read(piece_index)
+        self.read_bytes += len(piece)
+        self._add(piece_index, piece)
+
+        return _block_of(piece_index, piece, offset, length)
+
+    def put(
+        self,
+        piece_index: int,
+        piece: Union[bytes, bytearray, memoryview],
+    ):
+        """Cache piece written to storage, its data is copied."""
+        self.invalidate(piece_index)
+
+        if len(piece) <= self.max_bytes:
+            self._add(piece_index, bytearray(piece))
+
+    def invalidate(self, piece_index: int):
+        """Drop cached piece, e.g. when its data is rewritten."""
+        piece = self._pieces.pop(piece_index, None)
+
+        if piece is not None:
+            self.cached_bytes -= len(piece)
+
+    def _add(self, piece_index: int, piece: bytearray):
+        """Cache piece, least recently used pieces are dropped."""
+        if len(piece) > self.max_bytes:
+            return
+
+        while self._pieces and self.cached_bytes + len(piece) > self.max_bytes:
+            _, evicted = self._pieces.popitem(last=False)
+            self.cached_bytes -= len(evicted)
+            self.evictions += 1
+
+        self._pieces[piece_index] = piece
+        self.cached_bytes += len(piece)
+
+
+def _block_of(
+    piece_index: int,
+    piece: bytearray,
+    offset: int,
+    length: int,
+) -> memoryview:
+    """Return read-only view of block of piece."""
+    if offset < 0 or length < 0 or offset + length > len(piece):
+        raise ValueError(
+            f'block {offset}:{offset + length} '
+            f'out of piece {piece_index}',
+        )
+
+    return memoryview(piece)[offset:offset + length].toreadonly()
@@ -1,42 +1,137 @@
 """Pieces manager."""
 
-from typing import Dict
+import logging
+
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from pico_torrent.protocol.peers import messages
 from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.pieces.piece import (
+    BlockStatus,
+    Piece,
+    PieceBlock,
+    PieceBufferPool,
+)
+from pico_torrent.protocol.pieces.cache import PieceCache
+from pico_torrent.protocol.pieces.picker import PiecePicker
+from pico_torrent.protocol.pieces.storage import (
+    FileRange,
+    StorageError,
+    TorrentStorage,
+)
+from pico_torrent.protocol.pieces.verifier import Buffer, PieceVerifier
 from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.manager')
 
 
 PieceIndex = int
-Exists = bool
+BlockKey = Tuple[PieceIndex, int]
+# Cancels request of block sent to peer, returns False if it was not sent
+CancelHandler = Callable[[PieceBlock], bool]
 
 
 class PieceLookup:
     """Pieces lookup from bit field."""
 
-    def __init__(self):
+    def __init__(self, pieces_count: int):
         """Initialize pieces lookup."""
-        self.lookup: Dict[PieceIndex, Exists] = {}
+        self.bitfield = Bitfield(pieces_count)
 
-    def add_by_have_message(self, have: messages.Have):
-        """Add piece existence by have message."""
-        self.lookup[have.piece_index] = True
+    def add_by_have_message(self, have: messages.Have) -> bool:
+        """Add piece existence by have message, return True if it is new."""
+        return self.bitfield.mark(have.piece_index)
 
-    def add_by_bitfield_message(self, bitfield: messages.BitField):
-        """Add piece existence by bitfield message."""
-        for piece_index, piece_exists in enumerate(bitfield.bit_field_lookup):
-            self.lookup[piece_index] = (
-                self.lookup.get(piece_index) or piece_exists
-            )
+    def pieces(self) -> Iterable[PieceIndex]:
+        """Return indexes of pieces which peer has."""
+        return self.bitfield.indices()
+
+    def has_piece(self, piece_index: PieceIndex) -> bool:
+        """Check that peer have piece by piece index."""
+        return self.bitfield[piece_index]
+
+    def add_by_bitfield_message(self, bitfield: messages.BitField) -> Bitfield:
+        """Add piece existence by bitfield message, return new pieces."""
+        # Bit field of message is padded to whole bytes
+        received = Bitfield(len(self.bitfield), bitfield.raw_bitfield)
+        added = received.andnot(self.bitfield)
+        self.bitfield |= received
+
+        return added
 
 
 class PiecesManager:
     """Pieces manager."""
 
-    def __init__(self, torrent: TorrentFile):
-        """Initialize pieces manager."""
+    def __init__(
+        self,
+        torrent: TorrentFile,
+        storage: Optional[TorrentStorage] = None,
+        verifier: Optional[PieceVerifier] = None,
+        cache: Optional[PieceCache] = None,
+    ):
+        """Initialize pieces manager, verified pieces go to storage.
+
+        Hashes of pieces are checked by verifier if it is given,
+        otherwise pieces are hashed incrementally as blocks arrive.
+        Blocks requested by remote peers are read through cache,
+        it is created for storage by default.
+        """
         self.torrent = torrent
+        self.storage = storage
+        self.verifier = verifier
+        self.cache = cache if cache is not None or storage is None else (
+            PieceCache(storage)
+        )
         self.peers: Dict[TorrentPeer, PieceLookup] = {}
+        self.pieces_count = len(torrent.info.pieces)
+        self.total_length = sum(file.length for file in torrent.info.files)
+        # Pieces which are downloaded and verified
+        self.have = Bitfield(self.pieces_count)
+        self.have_count = 0
+        # Pieces which are downloading now
+        self.pieces: Dict[PieceIndex, Piece] = {}
+        # Complete pieces waiting for result of hash verification
+        self.verifying: Set[PieceIndex] = set()
+        # Buffers of downloading pieces
+        self.buffers = PieceBufferPool()
+        # Availability of pieces in swarm
+        self.picker = PiecePicker(self.pieces_count)
+        # Peers having all pieces share one lookup,
+        # they are counted by picker as seeds
+        self.seeds: Set[TorrentPeer] = set()
+        self._seed_lookup = PieceLookup(self.pieces_count)
+        self._seed_lookup.bitfield = Bitfield.full(self.pieces_count)
+        # Peers which requested blocks and were not answered yet
+        self.requests: Dict[BlockKey, Set[TorrentPeer]] = {}
+        # Connections register their handlers to cancel requests
+        self.cancel_handlers: Dict[TorrentPeer, CancelHandler] = {}
+        # In endgame blocks in flight are requested from several peers
+        self.endgame = False
+        self.duplicate_requests = 0
+        self.cancelled_requests = 0
+        # Count of bytes of blocks received more than once
+        self.wasted_bytes = 0
+        # Count of downloaded pieces which did not match their hash
+        self.hash_failures = 0
+        # Verified pieces which cannot be written to storage
+        self.storage_failures = 0
+        # Handlers are called once the last piece is downloaded
+        self.completion_handlers: List[Callable[[], None]] = []
+        # Count of bytes received from all peers
+        self.downloaded_bytes = 0
+        # Count of bytes sent to all peers, counted by connections
+        self.uploaded_bytes = 0
 
     def update_peer_with_bitfield(
         self,
@@ -44,10 +139,29 @@ class PiecesManager:
         bitfield: messages.BitField,
     ):
         """Add peed pieces blocks by remote peer bitfield message."""
-        lookup: PieceLookup = self.peers.get(peer, PieceLookup())
-        lookup.add_by_bitfield_message(bitfield)
+        if peer in self.seeds:
+            return
 
-        self.peers[peer] = lookup
+        lookup = self.peers.get(peer)
+        if lookup is None:
+            lookup = PieceLookup(self.pieces_count)
+
+        try:
+            added = lookup.add_by_bitfield_message(bitfield)
+        except ValueError:
+            logger.warning(f'Bit field of peer {peer.ip} is too short')
+            return
+
+        if lookup.bitfield.is_full():
+            self.picker.remove_peer_pieces(
+                lookup.bitfield.andnot(added).indices(),
+            )
+            self.picker.add_seed()
+            self.seeds.add(peer)
+            self.peers[peer] = self._seed_lookup
+        else:
+            self.picker.add_peer_pieces(added.indices())
+            self.peers[peer] = lookup
 
     def update_peer_with_have_message(
         self,
@@ -55,14 +169,449 @@ class PiecesManager:
         have: messages.Have,
     ):
         """Add peer piece blocks by remote peer have message."""
-        lookup: PieceLookup = self.peers.get(peer, PieceLookup())
-        lookup.add_by_have_message(have)
+        if have.piece_index >= self.pieces_count or peer in self.seeds:
+            return
+
+        lookup = self.peers.get(peer)
+        if lookup is None:
+            lookup = PieceLookup(self.pieces_count)
+            self.peers[peer] = lookup
 
-        self.peers[peer] = lookup
+        if lookup.add_by_have_message(have):
+            self.picker.increment(have.piece_index)
 
     def remove_peer(self, peer: TorrentPeer):
         """Remove given peer from peers lookup."""
-        self.peers.pop(peer, None)
+        self.cancel_handlers.pop(peer, None)
+        lookup = self.peers.pop(peer, None)
+
+        if lookup is None:
+            return
+
+        if peer in self.seeds:
+            self.seeds.remove(peer)
+            self.picker.remove_seed()
+        else:
+            self.picker.remove_peer_pieces(lookup.pieces())
+
+    def mark_have(self, piece_index: PieceIndex):
+        """Mark piece as downloaded and verified."""
+        if self.have.mark(piece_index):
+            self.have_count += 1
+
+            if self.have_count == self.pieces_count:
+                logger.info('All pieces are downloaded')
+                for handler in self.completion_handlers:
+                    handler()
+
+        self.picker.remove(piece_index)
+
+        downloading = self.pieces.pop(piece_index, None)
+        if downloading is not None:
+            downloading.release()
+
+    def restore_have(self, have: Bitfield):
+        """Mark all pieces of bit field as downloaded and verified."""
+        self.have |= have
+        self.have_count = self.have.count()
+        self.picker.remove_many(have)
+
+        for piece_index in list(self.pieces):
+            if self.have[piece_index]:
+                self.pieces.pop(piece_index).release()
+
+    def flush_partial_blocks(self):
+        """Write received blocks of not verified pieces to storage.
+
+        Blocks are restored from storage after restart by maps of
+        unfinished pieces.
+        """
+        if self.storage is None:
+            return
+
+        for piece_index, piece in self.pieces.items():
+            content = piece.content
+            for block in piece.blocks.values():
+                if block.status == BlockStatus.Retreived:
+                    self.storage.write(
+                        piece_index,
+                        block.offset,
+                        content[block.offset:block.offset + block.length],
+                    )
+
+    def unfinished_pieces(self) -> Dict[PieceIndex, Bitfield]:
+        """Return maps of received blocks of not verified pieces."""
+        unfinished = {}
+
+        for piece_index, piece in self.pieces.items():
+            received = piece.received_map()
+            if received.has_any():
+                unfinished[piece_index] = received
+
+        return unfinished
+
+    def restore_piece(self, piece_index: PieceIndex, received: Bitfield):
+        """Restore received blocks of unfinished piece from storage."""
+        if self.storage is None or self.have[piece_index]:
+            return
+
+        piece = self._create_piece(piece_index)
+        offsets = sorted(piece.blocks)
+
+        if len(received) != len(offsets):
+            return
+
+        for block_index in received.indices():
+            block = piece.blocks[offsets[block_index]]
+            piece.add_block(
+                block.offset,
+                self.storage.read(piece_index, block.offset, block.length),
+            )
+
+        if not piece.is_complete():
+            self.pieces[piece_index] = piece
+        elif piece.is_hash_matching():
+            self.mark_have(piece_index)
+
+    def is_valid_request(self, request: messages.Request) -> bool:
+        """Check that requested block is inside of piece which we have."""
+        return (
+            0 <= request.index < self.pieces_count
+            and self.have[request.index]
+            and 0 < request.length <= messages.MAX_REQUEST_SIZE
+            and 0 <= request.begin
+            and request.begin + request.length
+            <= self.piece_length(request.index)
+        )
+
+    def read_block(self, request: messages.Request) -> Optional[memoryview]:
+        """Return block requested by remote peer, None if it is unavailable."""
+        if self.cache is None or not self.is_valid_request(request):
+            return None
+
+        try:
+            block = self.cache.read_block(
+                request.index,
+                request.begin,
+                request.length,
+            )
+        except (StorageError, OSError, ValueError) as err:
+            logger.error(f'Cannot read piece {request.index}: {err!r}')
+            return None
+
+        return block
+
+    def cached_block(
+        self,
+        request: messages.Request,
+    ) -> Optional[memoryview]:
+        """Return requested block if its piece is cached, None otherwise."""
+        if self.cache is None or not self.is_valid_request(request):
+            return None
+
+        return self.cache.cached_block(
+            request.index,
+            request.begin,
+            request.length,
+        )
+
+    def block_file_ranges(
+        self,
+        request: messages.Request,
+    ) -> Optional[Iterator[FileRange]]:
+        """Return files holding block requested by remote peer.
+
+        Block is sent straight from files then, without cache,
+        None is returned if block is unavailable.
+        """
+        if self.storage is None or not self.is_valid_request(request):
+            return None
+
+        return self.storage.file_ranges(
+            request.index,
+            request.begin,
+            request.length,
+        )
+
+    def is_interesting(self, peer: TorrentPeer) -> bool:
+        """Check that remote peer has pieces which we do not have."""
+        lookup = self.peers.get(peer)
+        return (
+            lookup is not None
+            and lookup.bitfield.andnot(self.have).has_any()
+        )
+
+    def is_complete(self) -> bool:
+        """Check that all pieces are downloaded."""
+        return self.have_count == self.pieces_count
+
+    def left_bytes(self) -> int:
+        """Return count of bytes of pieces which we do not have."""
+        if not self.pieces_count:
+            return 0
+
+        last_index = self.pieces_count - 1
+        left = (
+            (self.pieces_count - self.have_count)
+            * self.torrent.info.piece_length
+        )
+
+        # The last piece might be shorter than others
+        if not self.have[last_index]:
+            left -= (
+                self.torrent.info.piece_length
+                - self.piece_length(last_index)
+            )
+
+        return left
+
+    def piece_length(self, piece_index: PieceIndex) -> int:
+        """Return length of piece, last piece might be shorter."""
+        piece_length = self.torrent.info.piece_length
+
+        if piece_index == self.pieces_count - 1:
+            return self.total_length - piece_length * piece_index
+
+        return piece_length
+
+    def _create_piece(self, piece_index: PieceIndex) -> Piece:
+        """Create piece split into blocks of request size."""
+        piece_length = self.piece_length(piece_index)
+
+        return Piece(
+            index=piece_index,
+            piece_hash=self.torrent.info.pieces.hash_for(piece_index),
+            blocks=[
+                PieceBlock(
+                    piece_index=piece_index,
+                    offset=offset,
+                    length=min(messages.REQUEST_SIZE, piece_length - offset),
+                )
+                for offset in range(0, piece_length, messages.REQUEST_SIZE)
+            ],
+            pool=self.buffers,
+            incremental_hash=self.verifier is None,
+        )
+
+    def next_request(self, peer: TorrentPeer) -> Optional[PieceBlock]:
+        """Return next block to request from remote peer.
+
+        Rarest of already downloading pieces are preferred, so pieces
+        are completed before new ones are started. New pieces are
+        picked by rarest first strategy.
+        """
+        lookup = self.peers.get(peer)
+
+        if lookup is None:
+            return None
+
+        piece_index = self.picker.pick(
+            lookup.has_piece,
+            partial=[
+                piece_index
+                for piece_index, piece in self.pieces.items()
+                if piece.missing_blocks
+            ],
+            skip=self.pieces,
+        )
+
+        if piece_index is None:
+            if not self._is_endgame():
+                return None
+
+            block = self._endgame_request(peer)
+        else:
+            piece = self.pieces.get(piece_index)
+            if piece is None:
+                piece = self._create_piece(piece_index)
+                self.pieces[piece_index] = piece
+
+            block = piece.next_block_for_request()
+
+        if block is not None:
+            self.requests.setdefault(
+                (block.piece_index, block.offset),
+                set(),
+            ).add(peer)
+
+        return block
+
+    def _is_endgame(self) -> bool:
+        """Check that every wanted block is requested already."""
+        if self.have_count + len(self.pieces) < self.pieces_count:
+            return False
+
+        if any(piece.missing_blocks for piece in self.pieces.values()):
+            return False
+
+        if not self.endgame and self.pieces:
+            logger.info(
+                f'Enter endgame mode with {len(self.requests)} '
+                f'blocks in flight',
+            )
+            self.endgame = True
+
+        return True
+
+    def _endgame_request(self, peer: TorrentPeer) -> Optional[PieceBlock]:
+        """Return block in flight which peer did not request yet.
+
+        Blocks requested from the least count of peers are preferred.
+        """
+        lookup = self.peers[peer]
+        requested: Optional[PieceBlock] = None
+        requesters_count = 0
+
+        for piece_index, piece in self.pieces.items():
+            if (
+                piece_index in self.verifying
+                or not lookup.has_piece(piece_index)
+            ):
+                continue
+
+            for block in piece.blocks.values():
+                if block.status != BlockStatus.Pending:
+                    continue
+
+                requesters = self.requests.get((piece_index, block.offset))
+                if requesters is not None and peer in requesters:
+                    continue
+
+                count = len(requesters) if requesters is not None else 0
+                if requested is None or count < requesters_count:
+                    requested, requesters_count = block, count
+
+        if requested is not None:
+            self.duplicate_requests += 1
+
+        return requested
+
+    def return_blocks(
+        self,
+        blocks: Iterable[PieceBlock],
+        peer: Optional[TorrentPeer] = None,
+    ):
+        """Return requested but not received blocks for new request.
+
+        Block stays pending while other peers are asked for it.
+        """
+        for block in blocks:
+            key = (block.piece_index, block.offset)
+            requesters = self.requests.get(key)
+
+            if requesters is not None:
+                if peer is not None:
+                    requesters.discard(peer)
+                if requesters:
+                    continue
+
+                del self.requests[key]
+
+            piece = self.pieces.get(block.piece_index)
+
+            if piece is not None:
+                piece.cancel_block(block.offset)
+
+    def _cancel_requests(
+        self,
+        block: PieceBlock,
+        requesters: Set[TorrentPeer],
+    ):
+        """Cancel requests of received block sent to other peers."""
+        for peer in requesters:
+            handler = self.cancel_handlers.get(peer)
+
+            if handler is not None and handler(block):
+                self.cancelled_requests += 1
+
+    def add_piece(
+        self,
+        piece: messages.Piece,
+        peer: Optional[TorrentPeer] = None,
+    ):
+        """Add fetched piece block to downloading pieces.
+
+        Requests of the same block sent to other peers are cancelled.
+        """
+        self.downloaded_bytes += len(piece.block)
+
+        requesters = self.requests.pop((piece.index, piece.begin), set())
+        if peer is not None:
+            requesters.discard(peer)
+
+        downloading = self.pieces.get(piece.index)
+        if (
+            downloading is None
+            or piece.index in self.verifying
+            or not downloading.add_block(piece.begin, piece.block)
+        ):
+            self.wasted_bytes += len(piece.block)
+            return
+
+        if requesters:
+            self._cancel_requests(
+                downloading.blocks[piece.begin],
+                requesters,
+            )
+
+        if not downloading.is_complete():
+            return
+
+        if self.verifier is None:
+            self._piece_verified(
+                piece.index,
+                downloading.content,
+                downloading.is_hash_matching(),
+            )
+            return
+
+        self.verifying.add(piece.index)
+        self.verifier.submit(
+            piece.index,
+            downloading.content,
+            downloading.hash,
+            self._piece_verified,
+        )
+
+    def _piece_verified(
+        self,
+        piece_index: PieceIndex,
+        data: Buffer,
+        matching: bool,
+    ):
+        """Store verified piece, or download it again on hash mismatch."""
+        self.verifying.discard(piece_index)
+
+        downloading = self.pieces.get(piece_index)
+        if downloading is None:
+            return
+
+        if not matching:
+            logger.warning(f'Piece {piece_index} hash mismatch')
+            self.hash_failures += 1
+            self._download_again(piece_index, downloading)
+            return
+
+        if self.storage is not None:
+            try:
+                self.storage.write_piece(piece_index, data)
+            except (StorageError, OSError) as err:
+                # E.g. disk is full, piece is requested again later
+                logger.error(f'Cannot store piece {piece_index}: {err!r}')
+                self.storage_failures += 1
+                self._download_again(piece_index, downloading)
+                return
+
+        # Other peers are likely to request the new piece soon
+        if self.cache is not None:
+            self.cache.put(piece_index, data)
+
+        logger.info(f'Piece {piece_index} is downloaded')
+        self.mark_have(piece_index)
+
+    def _download_again(self, piece_index: PieceIndex, downloading: Piece):
+        """Drop received blocks of piece, so they are requested again."""
+        downloading.reset()
 
-    def add_piece(self, piece: messages.Piece):
-        """Add fetched piece to fetched pieces."""
+        for offset in downloading.blocks:
+            self.requests.pop((piece_index, offset), None)
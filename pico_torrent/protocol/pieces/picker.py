@@ -0,0 +1,234 @@
+"""Rarest-first piece picker."""
+
+import array
+import bisect
+import random
+import itertools
+
+from typing import Callable, Container, Iterable, List, Optional
+
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+
+class PiecePicker:
+    """Rarest-first piece picker with incremental availability.
+
+    Wanted pieces are kept in one array ordered by availability,
+    the array is split into buckets of pieces with equal availability.
+    Change of availability by one moves piece to a neighbour bucket
+    by a single swap, so picker never sorts pieces.
+
+    Peers having all pieces are counted separately as seeds,
+    they do not change order of pieces and cost O(1) to add or remove.
+    """
+
+    def __init__(self, pieces_count: int, rng: Optional[random.Random] = None):
+        """Initialize picker, all pieces are wanted and not available."""
+        self.pieces_count = pieces_count
+        self.seeds = 0
+        self._rng = rng or random.Random()  # noqa: S311
+
+        # Count of peers having piece, seeds are not included
+        self._availability = array.array('L', [0]) * pieces_count
+        # Wanted pieces ordered by availability, pieces of one bucket
+        # are scanned from random position, so order is not shuffled
+        self._order: List[int] = list(range(pieces_count))
+        # Position of piece in order, -1 for not wanted pieces
+        self._position = array.array('l', range(pieces_count))
+        # End position of bucket with availability equal to list index
+        self._boundaries: List[int] = [pieces_count]
+
+    def availability(self, piece_index: int) -> int:
+        """Return count of peers having piece."""
+        return self._availability[piece_index] + self.seeds
+
+    def is_wanted(self, piece_index: int) -> bool:
+        """Check that piece is not downloaded yet."""
+        return self._position[piece_index] != -1
+
+    def add_seed(self):
+        """Count peer having all pieces."""
+        self.seeds += 1
+
+    def remove_seed(self):
+        """Forget peer having all pieces."""
+        self.seeds -= 1
+
+    def add_peer_pieces(self, pieces: Iterable[int]):
+        """Count pieces of peer, e.g. from bitfield or have message."""
+        for piece_index in pieces:
+            self.increment(piece_index)
+
+    def remove_peer_pieces(self, pieces: Iterable[int]):
+        """Forget pieces of disconnected peer."""
+        for piece_index in pieces:
+            self.decrement(piece_index)
+
+    def increment(self, piece_index: int):
+        """Increase availability of piece by one."""
+        availability = self._availability[piece_index]
+        self._availability[piece_index] = availability + 1
+
+        if self._position[piece_index] == -1:
+            return
+
+        if len(self._boundaries) == availability + 1:
+            self._boundaries.append(len(self._order))
+
+        # Last piece of bucket becomes first piece of next bucket
+        last = self._boundaries[availability] - 1
+        self._swap(self._position[piece_index], last)
+        self._boundaries[availability] -= 1
+
+    def decrement(self, piece_index: int):
+        """Decrease availability of piece by one."""
+        availability = self._availability[piece_index]
+        if availability == 0:
+            raise ValueError(f'piece {piece_index} is not available')
+
+        self._availability[piece_index] = availability - 1
+
+        if self._position[piece_index] == -1:
+            return
+
+        # First piece of bucket becomes last piece of previous bucket
+        first = self._boundaries[availability - 1]
+        self._swap(self._position[piece_index], first)
+        self._boundaries[availability - 1] += 1
+
+    def remove(self, piece_index: int):
+        """Stop picking of piece, e.g. when it is downloaded."""
+        position = self._position[piece_index]
+        if position == -1:
+            return
+
+        # Move piece to the end of order through last slots of buckets
+        for bucket in range(
+            self._availability[piece_index],
+            len(self._boundaries),
+        ):
+            last = self._boundaries[bucket] - 1
+            self._swap(position, last)
+            position = last
+            self._boundaries[bucket] -= 1
+
+        self._order.pop()
+        self._position[piece_index] = -1
+
+    def remove_many(self, pieces: Bitfield):
+        """Stop picking of all pieces set in bit field.
+
+        Kept pieces are sorted by their positions, that is faster than
+        removal of pieces one by one, e.g. when download is resumed.
+        """
+        kept = Bitfield.full(self.pieces_count).andnot(pieces)
+        position = self._position
+        order = sorted(
+            (
+                piece_index
+                for piece_index in kept.indices()
+                if position[piece_index] != -1
+            ),
+            key=position.__getitem__,
+        )
+        positions = [position[piece_index] for piece_index in order]
+
+        self._order = order
+        self._boundaries = [
+            bisect.bisect_left(positions, end)
+            for end in self._boundaries
+        ]
+        self._position = array.array('l', [-1]) * self.pieces_count
+        for new_position, piece_index in enumerate(order):
+            self._position[piece_index] = new_position
+
+    def add(self, piece_index: int):
+        """Start picking of piece again, e.g. when its data was lost."""
+        if self._position[piece_index] != -1:
+            return
+
+        availability = self._availability[piece_index]
+        while len(self._boundaries) <= availability:
+            self._boundaries.append(len(self._order))
+
+        self._order.append(piece_index)
+        position = len(self._order) - 1
+        self._position[piece_index] = position
+        self._boundaries[-1] += 1
+
+        # Move piece down to its bucket through first slots of buckets
+        for bucket in range(len(self._boundaries) - 1, availability, -1):
+            first = self._boundaries[bucket - 1]
+            self._swap(position, first)
+            position = first
+            self._boundaries[bucket - 1] += 1
+
+    def pick(
+        self,
+        has_piece: Callable[[int], bool],
+        partial: Iterable[int] = (),
+        skip: Container[int] = (),
+    ) -> Optional[int]:
+        """Return index of piece to download from peer.
+
+        Rarest of `partial` pieces which peer has is returned first.
+        Otherwise rarest wanted piece which peer has and which is not
+        in `skip` is returned, ties are broken randomly.
+        """
+        rarest_partial = min(
+            (
+                piece_index
+                for piece_index in partial
+                if has_piece(piece_index)
+            ),
+            key=self._availability.__getitem__,
+            default=None,
+        )
+
+        if rarest_partial is not None:
+            return rarest_partial
+
+        start = 0
+        for bucket, end in enumerate(self._boundaries):
+            # Pieces of zero bucket might be downloaded only from seeds,
+            # they are the rarest ones if any seed exists
+            if start < end and (bucket or self.seeds):
+                picked = self._pick_from_bucket(start, end, has_piece, skip)
+
+                if picked is not None:
+                    return picked
+
+            start = end
+
+        return None
+
+    def _pick_from_bucket(
+        self,
+        start: int,
+        end: int,
+        has_piece: Callable[[int], bool],
+        skip: Container[int],
+    ) -> Optional[int]:
+        """Return piece which peer has from random position of bucket."""
+        order = self._order
+        offset = self._rng.randrange(start, end)
+
+        for position in itertools.chain(
+            range(offset, end),
+            range(start, offset),
+        ):
+            piece_index = order[position]
+
+            if piece_index not in skip and has_piece(piece_index):
+                return piece_index
+
+        return None
+
+    def _swap(self, first: int, second: int):
+        """Swap pieces at given positions of order."""
+        order = self._order
+        first_piece, second_piece = order[first], order[second]
+
+        order[first], order[second] = second_piece, first_piece
+        self._position[first_piece] = second
+        self._position[second_piece] = first
@@ -4,7 +4,14 @@ import enum
 import hashlib
 import dataclasses
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
+
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+# Default size of free buffers kept by pool in bytes
+PIECE_POOL_SIZE = 64 * 2**20
+# Received prefix of piece is hashed by chunks of that size at least
+HASH_CHUNK_SIZE = 2**18
 
 
 class BlockStatus(enum.Enum):
@@ -27,14 +34,62 @@ class PieceBlock:
     offset: int
     length: int
 
-    data: bytes = b''
     status: BlockStatus = BlockStatus.Missing
 
 
+class PieceBufferPool:
+    """Pool of piece buffers reused across pieces.
+
+    Buffers are kept by length, pieces of one torrent except the last
+    one have the same length. Pool keeps at most `max_bytes` of free
+    buffers.
+    """
+
+    def __init__(self, max_bytes: int = PIECE_POOL_SIZE):
+        """Initialize empty pool."""
+        self.max_bytes = max_bytes
+        self.free_bytes = 0
+        self.allocated = 0
+        self.reused = 0
+        self._free: Dict[int, List[bytearray]] = {}
+
+    def acquire(self, length: int) -> bytearray:
+        """Return buffer of given length, content is not cleared."""
+        free = self._free.get(length)
+
+        if free:
+            self.reused += 1
+            self.free_bytes -= length
+            return free.pop()
+
+        self.allocated += 1
+        return bytearray(length)
+
+    def release(self, buffer: bytearray):
+        """Return buffer to pool, it is dropped when pool is full."""
+        if self.free_bytes + len(buffer) > self.max_bytes:
+            return
+
+        self.free_bytes += len(buffer)
+        self._free.setdefault(len(buffer), []).append(buffer)
+
+
 class Piece:
-    """Piece is part of torrent data wich constructs from piece blocks."""
+    """Piece is part of torrent data wich constructs from piece blocks.
+
+    Blocks are written into one buffer of piece. With incremental
+    hashing the longest received prefix of piece is hashed as blocks
+    arrive, so hash is ready when the last block is received.
+    """
 
-    def __init__(self, index: int, piece_hash: str, blocks: List[PieceBlock]):
+    def __init__(
+        self,
+        index: int,
+        piece_hash: bytes,
+        blocks: List[PieceBlock],
+        pool: Optional[PieceBufferPool] = None,
+        incremental_hash: bool = True,
+    ):
         """Initialize piece."""
         self.index = index
         self.hash = piece_hash
@@ -42,6 +97,28 @@ class Piece:
             block.offset: block
             for block in blocks
         }
+        self.length = max(
+            (block.offset + block.length for block in blocks),
+            default=0,
+        )
+        # Count of blocks in missing state
+        self.missing_blocks = sum(
+            block.status == BlockStatus.Missing
+            for block in blocks
+        )
+        # Count of blocks in retreived state
+        self.received_blocks = sum(
+            block.status == BlockStatus.Retreived
+            for block in blocks
+        )
+
+        self._pool = pool
+        self.incremental_hash = incremental_hash
+        self._buffer: Optional[bytearray] = None
+        self._hasher = hashlib.sha1()  # noqa: S303
+        # Length of received and hashed prefixes of piece
+        self.received_length = 0
+        self.hashed_length = 0
 
     def next_block_for_request(self) -> Optional[PieceBlock]:
         """Return next block for request it from remote peer."""
@@ -50,44 +127,124 @@ class Piece:
 
             if block.status == BlockStatus.Missing:
                 self.blocks[offset].status = BlockStatus.Pending
+                self.missing_blocks -= 1
                 return block
 
         return None
 
+    def cancel_block(self, offset: int):
+        """Set pending block back to missing state."""
+        block = self.blocks.get(offset)
+
+        if block is not None and block.status == BlockStatus.Pending:
+            block.status = BlockStatus.Missing
+            self.missing_blocks += 1
+
     def reset(self):
         """Set all piece blocks to missing state."""
         for offset in self.blocks:
             self.blocks[offset].status = BlockStatus.Missing
-            self.blocks[offset].data = b''
 
-    def add_block(self, offset: int, data: bytes):
-        """Add block to piece."""
-        if offset not in self.blocks:
-            # TODO: warn in logs
-            return
+        self.missing_blocks = len(self.blocks)
+        self.received_blocks = 0
+        self._hasher = hashlib.sha1()  # noqa: S303
+        self.received_length = 0
+        self.hashed_length = 0
+
+    def add_block(
+        self,
+        offset: int,
+        data: Union[bytes, bytearray, memoryview],
+    ) -> bool:
+        """Copy block into piece buffer, return True if block is new.
+
+        Blocks of unexpected offset or length and blocks which are
+        already received are ignored.
+        """
+        block = self.blocks.get(offset)
+
+        if (
+            block is None
+            or block.length != len(data)
+            or block.status == BlockStatus.Retreived
+        ):
+            return False
+
+        if block.status == BlockStatus.Missing:
+            self.missing_blocks -= 1
+
+        if self._buffer is None:
+            self._buffer = (
+                self._pool.acquire(self.length)
+                if self._pool is not None
+                else bytearray(self.length)
+            )
+
+        self._buffer[offset:offset + block.length] = data
+        block.status = BlockStatus.Retreived
+        self.received_blocks += 1
+
+        if self.incremental_hash and offset == self.received_length:
+            self._hash_prefix()
+
+        return True
+
+    def _hash_prefix(self):
+        """Extend received prefix of piece and hash it by large chunks."""
+        block = self.blocks.get(self.received_length)
+
+        while block is not None and block.status == BlockStatus.Retreived:
+            self.received_length = block.offset + block.length
+            block = self.blocks.get(self.received_length)
+
+        if (
+            self.received_length - self.hashed_length >= HASH_CHUNK_SIZE
+            or self.received_length == self.length
+        ):
+            self._hasher.update(
+                memoryview(self._buffer)[  # type: ignore
+                    self.hashed_length:self.received_length
+                ],
+            )
+            self.hashed_length = self.received_length
+
+    def received_map(self) -> Bitfield:
+        """Return bit field of received blocks in order of offsets."""
+        received = Bitfield(len(self.blocks))
 
-        self.blocks[offset].status = BlockStatus.Retreived
-        self.blocks[offset].data = data
+        for block_index, offset in enumerate(sorted(self.blocks)):
+            if self.blocks[offset].status == BlockStatus.Retreived:
+                received[block_index] = True
+
+        return received
 
     def is_complete(self) -> bool:
         """Check that piece is fully complete."""
-        return all(
-            block.status == BlockStatus.Retreived
-            for block in self.blocks.values()
-        )
+        return self.received_blocks == len(self.blocks)
 
     @property
-    def content(self) -> bytes:
-        """Piece content bytes."""
-        return b''.join(
-            block.data
-            for block in sorted(
-                self.blocks.values(),
-                key=lambda block: block.offset,
-            )
-        )
+    def content(self) -> memoryview:
+        """Piece content, valid until buffer of piece is released."""
+        if self._buffer is None:
+            return memoryview(b'')
+
+        return memoryview(self._buffer).toreadonly()
+
+    def is_hashed(self) -> bool:
+        """Check that hash of whole piece content is calculated."""
+        return self.hashed_length == self.length
 
     def is_hash_matching(self) -> bool:
         """Check that content hash match to torrent file hash."""
+        if self.is_hashed():
+            return self._hasher.digest() == self.hash
+
         content_hash = hashlib.sha1(self.content).digest()  # noqa: S303
         return content_hash == self.hash
+
+    def release(self):
+        """Return buffer of piece to pool, content is not valid after."""
+        if self._buffer is not None and self._pool is not None:
+            self._pool.release(self._buffer)
+
+        self._buffer = None
@@ -0,0 +1,220 @@
+"""Verification of torrent data stored on disk."""
+
+import os
+import time
+import hashlib
+import logging
+import dataclasses
+import collections
+import concurrent.futures
+
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+from typing import Tuple
+
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.piece_hashes import PieceHashes
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.recheck')
+
+
+# Default count of threads reading and hashing pieces
+RECHECK_WORKERS = os.cpu_count() or 1
+# Consecutive pieces of that size are checked by one worker,
+# so every worker reads files sequentially
+BATCH_SIZE = 2**25
+
+PieceCheck = Tuple[int, bool]
+
+
+@dataclasses.dataclass
+class RecheckProgress:
+    """Progress of data recheck."""
+
+    checked_pieces: int
+    pieces_count: int
+    checked_bytes: int
+    have_count: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Return recheck throughput in bytes per second."""
+        return self.checked_bytes / self.elapsed if self.elapsed else 0.0
+
+
+@dataclasses.dataclass
+class RecheckResult:
+    """Pieces which are stored and completion of every file."""
+
+    have: Bitfield
+    # Share of verified bytes of every file
+    files_completion: List[float]
+
+
+def _batches(
+    storage: TorrentStorage,
+    pieces: Iterable[int],
+) -> Iterator[List[int]]:
+    """Split pieces into batches of consecutive pieces."""
+    batch: List[int] = []
+    batch_size = 0
+
+    for piece_index in pieces:
+        if batch and (
+            piece_index != batch[-1] + 1 or batch_size >= BATCH_SIZE
+        ):
+            yield batch
+            batch, batch_size = [], 0
+
+        batch.append(piece_index)
+        batch_size += storage.piece_length
+
+    if batch:
+        yield batch
+
+
+def _check_batch(
+    storage: TorrentStorage,
+    hashes: PieceHashes,
+    batch: List[int],
+) -> List[PieceCheck]:
+    """Read and hash consecutive pieces with own file descriptors.
+
+    Descriptors of storage are not shared between threads,
+    pieces of missing, short or unreadable files fail the check.
+    """
+    descriptors: Dict[int, Optional[int]] = {}
+    buffer = bytearray(storage.piece_length)
+    view = memoryview(buffer)
+    results = []
+
+    try:
+        for piece_index in batch:
+            length = 0
+
+            for segment in storage.segments[piece_index]:
+                if segment.file_index not in descriptors:
+                    try:
+                        descriptors[segment.file_index] = os.open(
+                            storage.paths[segment.file_index],
+                            os.O_RDONLY,
+                        )
+                    except OSError:
+                        descriptors[segment.file_index] = None
+
+                fd = descriptors[segment.file_index]
+                if fd is None:
+                    break
+
+                chunk = view[length:length + segment.length]
+                try:
+                    read = os.preadv(fd, [chunk], segment.file_offset)
+                except OSError:
+                    break
+
+                length += read
+                if read != segment.length:
+                    break
+
+            matching = (
+                length == storage.piece_size(piece_index)
+                and hashlib.sha1(  # noqa: S303
+                    view[:length],
+                ).digest() == hashes.hash_for(piece_index)
+            )
+            results.append((piece_index, matching))
+    finally:
+        for fd in descriptors.values():
+            if fd is not None:
+                os.close(fd)
+
+    return results
+
+
+def check_pieces(
+    storage: TorrentStorage,
+    hashes: PieceHashes,
+    pieces: Iterable[int],
+    workers: int = RECHECK_WORKERS,
+) -> Iterator[PieceCheck]:
+    """Hash stored pieces, yield index of piece and result of check.
+
+    Batches of pieces are read and hashed by thread pool, reads and
+    hashing release GIL, so checking scales over cores.
+    Results are yielded in order of pieces.
+    """
+    with concurrent.futures.ThreadPoolExecutor(
+        workers,
+        thread_name_prefix='pico-torrent-recheck',
+    ) as executor:
+        pending: Deque[concurrent.futures.Future] = collections.deque()
+
+        for batch in _batches(storage, pieces):
+            pending.append(
+                executor.submit(_check_batch, storage, hashes, batch),
+            )
+
+            # Keep queue short, so disk is read ahead of hashing
+            # only by a few batches
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def recheck(
+    storage: TorrentStorage,
+    hashes: PieceHashes,
+    workers: int = RECHECK_WORKERS,
+    progress: Optional[Callable[[RecheckProgress], None]] = None,
+) -> RecheckResult:
+    """Check all stored pieces, report progress after every batch."""
+    have = Bitfield(storage.pieces_count)
+    checked_bytes = 0
+    started = time.monotonic()
+
+    for checked, (piece_index, matching) in enumerate(
+        check_pieces(storage, hashes, range(storage.pieces_count), workers),
+        start=1,
+    ):
+        checked_bytes += storage.piece_size(piece_index)
+        if matching:
+            have[piece_index] = True
+
+        if progress is not None and (
+            checked % max(1, BATCH_SIZE // storage.piece_length) == 0
+            or checked == storage.pieces_count
+        ):
+            progress(RecheckProgress(
+                checked_pieces=checked,
+                pieces_count=storage.pieces_count,
+                checked_bytes=checked_bytes,
+                have_count=have.count(),
+                elapsed=time.monotonic() - started,
+            ))
+
+    return RecheckResult(
+        have=have,
+        files_completion=files_completion(storage, have),
+    )
+
+
+def files_completion(storage: TorrentStorage, have: Bitfield) -> List[float]:
+    """Return share of bytes of every file covered by given pieces."""
+    completion = []
+
+    for file in storage.files:
+        if not file.length:
+            completion.append(1.0)
+            continue
+
+        completed = sum(
+            piece_slice.length
+            for piece_slice in file.pieces
+            if have[piece_slice.piece_index]
+        )
+        completion.append(completed / file.length)
+
+    return completion
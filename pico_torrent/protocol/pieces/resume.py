@@ -0,0 +1,256 @@
+"""Fast resume of download without rehashing of stored data."""
+
+import os
+import asyncio
+import logging
+import dataclasses
+
+from typing import Dict, List, Optional, Set, Type, TypeVar
+from pathlib import Path
+
+from pico_torrent.protocol import bencode
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.recheck import check_pieces
+from pico_torrent.protocol.pieces.storage import FileStat
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.resume')
+
+
+FILE_FORMAT = b'pico-torrent resume file'
+FILE_VERSION = 1
+# Interval between saves of resume data in seconds
+RESUME_INTERVAL = 60.0
+
+T = TypeVar('T')
+
+
+class BadResumeFile(Exception):
+    """Exception when resume file cannot be used."""
+
+
+@dataclasses.dataclass
+class ResumeData:
+    """State of download which is saved between runs.
+
+    Stats of files are taken after data is written, so files
+    which are changed later are detected by size or mtime.
+    """
+
+    info_hash: bytes
+    have: Bitfield
+    files: List[Optional[FileStat]]
+    # Received blocks of not verified pieces
+    unfinished: Dict[int, Bitfield]
+
+    def encode(self) -> bytes:
+        """Encode resume data into bencoded dictionary."""
+        data = {
+            b'file-format': FILE_FORMAT,
+            b'file-version': FILE_VERSION,
+            b'files': [
+                [stat.size, stat.mtime_ns] if stat is not None else []
+                for stat in self.files
+            ],
+            b'info-hash': self.info_hash,
+            b'pieces': bytes(self.have.to_bytes()),
+            b'unfinished': [
+                {
+                    b'blocks': bytes(received.to_bytes()),
+                    b'blocks-count': len(received),
+                    b'piece': piece_index,
+                }
+                for piece_index, received in sorted(self.unfinished.items())
+            ],
+        }
+
+        return bencode.BencodeEncoder().encode(data).getvalue()
+
+    @classmethod
+    def decode(cls, raw: bytes, pieces_count: int) -> 'ResumeData':
+        """Decode resume data of torrent with given count of pieces."""
+        try:
+            data = _checked(
+                bencode.BencodeBufferDecoder(raw).decode(),
+                dict,
+                'resume data',
+            )
+
+            if (
+                data.get(b'file-format') != FILE_FORMAT
+                or data.get(b'file-version') != FILE_VERSION
+            ):
+                raise BadResumeFile('unsupported format of resume file')
+
+            files: List[Optional[FileStat]] = []
+            for value in _checked(data[b'files'], list, 'files'):
+                stat = _checked(value, list, 'file stat')
+                files.append(FileStat(
+                    size=_checked(stat[0], int, 'file size'),
+                    mtime_ns=_checked(stat[1], int, 'file mtime'),
+                ) if stat else None)
+
+            unfinished: Dict[int, Bitfield] = {}
+            for value in _checked(data[b'unfinished'], list, 'unfinished'):
+                item = _checked(value, dict, 'unfinished piece')
+                unfinished[_checked(item[b'piece'], int, 'piece')] = Bitfield(
+                    _checked(item[b'blocks-count'], int, 'blocks count'),
+                    _checked(item[b'blocks'], bytes, 'blocks'),
+                )
+
+            return cls(
+                info_hash=_checked(data[b'info-hash'], bytes, 'info hash'),
+                have=Bitfield(
+                    pieces_count,
+                    _checked(data[b'pieces'], bytes, 'pieces'),
+                ),
+                files=files,
+                unfinished=unfinished,
+            )
+        except (
+            bencode.BencodeDecodeError,
+            KeyError,
+            IndexError,
+            ValueError,
+        ) as err:
+            raise BadResumeFile(f'malformed resume file: {err!r}') from err
+
+
+def _checked(value: object, kind: Type[T], name: str) -> T:
+    """Return decoded value if it is of expected type."""
+    if not isinstance(value, kind):
+        raise BadResumeFile(
+            f'{name} of resume file is not {kind.__name__}',
+        )
+
+    return value
+
+
+def collect_resume_data(manager: PiecesManager) -> ResumeData:
+    """Take resume data of download, unfinished blocks are stored."""
+    if manager.storage is None:
+        raise BadResumeFile('download without storage cannot be resumed')
+
+    manager.flush_partial_blocks()
+    unfinished = manager.unfinished_pieces()
+
+    return ResumeData(
+        info_hash=manager.torrent.info_hash,
+        have=Bitfield(manager.pieces_count, manager.have.to_bytes()),
+        files=manager.storage.stat_files(),
+        unfinished=unfinished,
+    )
+
+
+def save_resume_data(path: Path, data: ResumeData):
+    """Write resume file, old file is replaced atomically."""
+    temporary = path.with_name(path.name + '.tmp')
+
+    with temporary.open('wb') as f:
+        f.write(data.encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temporary, path)
+
+
+def load_resume_data(path: Path, torrent: TorrentFile) -> Optional[ResumeData]:
+    """Read resume file of torrent, None if it is missing or unusable."""
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    try:
+        data = ResumeData.decode(raw, len(torrent.info.pieces))
+    except BadResumeFile as err:
+        logger.warning(f'Resume file {path} is ignored: {err}')
+        return None
+
+    if data.info_hash != torrent.info_hash:
+        logger.warning(f'Resume file {path} is of other torrent')
+        return None
+
+    return data
+
+
+def restore_download(
+    manager: PiecesManager,
+    data: Optional[ResumeData],
+) -> Set[int]:
+    """Restore download state, return indexes of rechecked files.
+
+    Resume data is trusted for files which size and mtime match,
+    pieces of other existing files are rechecked. Without resume data
+    all existing files are rechecked.
+    """
+    storage = manager.storage
+    if storage is None:
+        raise BadResumeFile('download without storage cannot be resumed')
+
+    stats = storage.stat_files()
+    recorded: List[Optional[FileStat]] = (
+        data.files if data is not None else []
+    )
+
+    changed = set()
+    missing_pieces: Set[int] = set()
+    for file_index, stat in enumerate(stats):
+        if stat is None:
+            missing_pieces.update(storage.file_pieces(file_index))
+        elif (
+            file_index >= len(recorded)
+            or recorded[file_index] != stat
+        ):
+            changed.add(file_index)
+
+    stale_pieces: Set[int] = set()
+    for file_index in changed:
+        stale_pieces.update(storage.file_pieces(file_index))
+
+    if data is not None:
+        have = Bitfield(manager.pieces_count, data.have.to_bytes())
+        for piece_index in stale_pieces | missing_pieces:
+            have[piece_index] = False
+        manager.restore_have(have)
+
+        for piece_index, received in data.unfinished.items():
+            if (
+                0 <= piece_index < manager.pieces_count
+                and piece_index not in stale_pieces
+                and piece_index not in missing_pieces
+            ):
+                manager.restore_piece(piece_index, received)
+
+    if changed:
+        logger.info(f'Recheck {len(changed)} changed files')
+
+    for piece_index, matching in check_pieces(
+        storage,
+        manager.torrent.info.pieces,
+        sorted(stale_pieces - missing_pieces),
+    ):
+        if matching:
+            manager.mark_have(piece_index)
+
+    logger.info(
+        f'Restored {manager.have_count} of {manager.pieces_count} pieces',
+    )
+
+    return changed
+
+
+async def save_periodically(
+    manager: PiecesManager,
+    path: Path,
+    interval: float = RESUME_INTERVAL,
+):
+    """Save resume data of download every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            save_resume_data(path, collect_resume_data(manager))
+        except OSError as err:
+            logger.error(f'Cannot save resume file {path}: {err!r}')
@@ -0,0 +1,306 @@
+"""Disk storage of torrent pieces."""
+
+import os
+import logging
+import dataclasses
+import collections
+
+from typing import Iterator, List, Optional, Union
+from pathlib import Path
+
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.metainfo.files_to_pieces import (
+    MappedToPiecesFile,
+    map_files_to_pieces,
+)
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.storage')
+
+
+# Default count of files kept open at the same time
+MAX_OPEN_FILES = 64
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class StorageError(Exception):
+    """Exception when torrent data cannot be stored or read."""
+
+
+@dataclasses.dataclass
+class FileSegment:
+    """Part of piece stored in one file."""
+
+    file_index: int
+    file_offset: int
+    piece_offset: int
+    length: int
+
+
+@dataclasses.dataclass
+class FileRange:
+    """Range of open file holding part of piece."""
+
+    fd: int
+    offset: int
+    length: int
+
+
+@dataclasses.dataclass
+class FileStat:
+    """Size and modification time of file on disk."""
+
+    size: int
+    mtime_ns: int
+
+
+class TorrentStorage:
+    """Files of torrent on disk, addressed by pieces.
+
+    Every piece is described by segments of files it covers,
+    data is written and read by positional calls, so one file
+    descriptor serves any count of pieces. Recently used files are
+    kept open up to `max_open_files`.
+    """
+
+    def __init__(
+        self,
+        torrent: TorrentFile,
+        directory: Path,
+        max_open_files: int = MAX_OPEN_FILES,
+    ):
+        """Initialize storage of torrent in given directory."""
+        info = torrent.info
+        self.directory = Path(directory)
+        self.root = self._root_path(info.name) if info.multi_file else (
+            self.directory
+        )
+        self.piece_length = info.piece_length
+        self.pieces_count = len(info.pieces)
+        self.max_open_files = max_open_files
+
+        self.files: List[MappedToPiecesFile] = map_files_to_pieces(
+            info.files,
+            self.pieces_count,
+            self.piece_length,
+        )
+        self.paths = [self._file_path(file.path) for file in self.files]
+        self.segments: List[List[FileSegment]] = [
+            [] for _ in range(self.pieces_count)
+        ]
+
+        for file_index, file in enumerate(self.files):
+            file_offset = 0
+
+            for piece_slice in file.pieces:
+                self.segments[piece_slice.piece_index].append(FileSegment(
+                    file_index=file_index,
+                    file_offset=file_offset,
+                    piece_offset=piece_slice.offset,
+                    length=piece_slice.length,
+                ))
+                file_offset += piece_slice.length
+
+        self._descriptors: collections.OrderedDict = collections.OrderedDict()
+
+    def _root_path(self, name: str) -> Path:
+        """Return directory of multi-file torrent inside of directory."""
+        path = Path(name)
+
+        if path.is_absolute() or len(path.parts) != 1 or '..' in path.parts:
+            raise StorageError(f'unsafe name of torrent {name!r}')
+
+        return self.directory / path
+
+    def _file_path(self, path: Path) -> Path:
+        """Return path of torrent file inside of storage root."""
+        if path.is_absolute() or '..' in path.parts:
+            raise StorageError(f'unsafe path of torrent file {path}')
+
+        return self.root / path
+
+    def create_files(self):
+        """Create directory tree and files of torrent with their lengths.
+
+        Existing files are kept, missing parts of files stay sparse.
+        """
+        logger.info(f'Create {len(self.files)} files in {self.root}')
+
+        for file, path in zip(self.files, self.paths):
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            with path.open('ab') as f:
+                if f.tell() < file.length:
+                    f.truncate(file.length)
+
+    def stat_files(self) -> List[Optional[FileStat]]:
+        """Return stats of torrent files, None for missing files."""
+        stats: List[Optional[FileStat]] = []
+
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stats.append(None)
+            else:
+                stats.append(FileStat(
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                ))
+
+        return stats
+
+    def file_pieces(self, file_index: int) -> range:
+        """Return indexes of pieces covering file."""
+        slices = self.files[file_index].pieces
+
+        if not slices:
+            return range(0)
+
+        return range(slices[0].piece_index, slices[-1].piece_index + 1)
+
+    def _descriptor(self, file_index: int) -> int:
+        """Return open descriptor of file, least recently used is closed."""
+        fd = self._descriptors.get(file_index)
+
+        if fd is not None:
+            self._descriptors.move_to_end(file_index)
+            return fd
+
+        if len(self._descriptors) >= self.max_open_files:
+            _, oldest = self._descriptors.popitem(last=False)
+            os.close(oldest)
+
+        fd = os.open(self.paths[file_index], os.O_RDWR | os.O_CREAT, 0o644)
+        self._descriptors[file_index] = fd
+
+        return fd
+
+    def piece_size(self, piece_index: int) -> int:
+        """Return length of piece, last piece might be shorter."""
+        return sum(segment.length for segment in self.segments[piece_index])
+
+    def _segments(
+        self,
+        piece_index: int,
+        offset: int,
+        length: int,
+    ) -> Iterator[FileSegment]:
+        """Return file segments covering given range of piece."""
+        if not 0 <= piece_index < self.pieces_count:
+            raise StorageError(f'piece {piece_index} out of torrent')
+
+        end = offset + length
+        if offset < 0 or length < 0 or end > self.piece_size(piece_index):
+            raise StorageError(
+                f'range {offset}:{end} out of piece {piece_index}',
+            )
+
+        for segment in self.segments[piece_index]:
+            segment_end = segment.piece_offset + segment.length
+            start = max(offset, segment.piece_offset)
+            stop = min(end, segment_end)
+
+            if start >= stop:
+                continue
+
+            yield FileSegment(
+                file_index=segment.file_index,
+                file_offset=segment.file_offset + start - segment.piece_offset,
+                piece_offset=start,
+                length=stop - start,
+            )
+
+    def file_ranges(
+        self,
+        piece_index: int,
+        offset: int,
+        length: int,
+    ) -> Iterator[FileRange]:
+        """Return ranges of open files holding range of piece.
+
+        Range is checked at once, files are opened one by one while
+        ranges are taken, so descriptor of range is valid until the
+        next range is taken, e.g. with one open file allowed.
+        """
+        segments = list(self._segments(piece_index, offset, length))
+
+        return (
+            FileRange(
+                fd=self._descriptor(segment.file_index),
+                offset=segment.file_offset,
+                length=segment.length,
+            )
+            for segment in segments
+        )
+
+    def write(self, piece_index: int, offset: int, data: Buffer):
+        """Write data to piece from given offset."""
+        view = memoryview(data)
+
+        for segment in self._segments(piece_index, offset, len(view)):
+            fd = self._descriptor(segment.file_index)
+            position = segment.piece_offset - offset
+            chunk = view[position:position + segment.length]
+            file_offset = segment.file_offset
+
+            while chunk:
+                written = os.pwrite(fd, chunk, file_offset)
+                chunk = chunk[written:]
+                file_offset += written
+
+    def write_piece(self, piece_index: int, data: Buffer):
+        """Write whole piece."""
+        if len(data) != self.piece_size(piece_index):
+            raise StorageError(
+                f'piece {piece_index} of {len(data)} bytes, '
+                f'expected {self.piece_size(piece_index)}',
+            )
+
+        self.write(piece_index, 0, data)
+
+    def read(
+        self,
+        piece_index: int,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> bytearray:
+        """Read range of piece, whole piece by default."""
+        if length is None:
+            length = self.piece_size(piece_index) - offset
+
+        buffer = bytearray(length)
+        view = memoryview(buffer)
+
+        for segment in self._segments(piece_index, offset, length):
+            fd = self._descriptor(segment.file_index)
+            position = segment.piece_offset - offset
+            chunk = view[position:position + segment.length]
+            file_offset = segment.file_offset
+
+            while chunk:
+                read = os.preadv(fd, [chunk], file_offset)
+                if not read:
+                    raise StorageError(
+                        f'file {self.paths[segment.file_index]} '
+                        f'is shorter than torrent expects',
+                    )
+                chunk = chunk[read:]
+                file_offset += read
+
+        return buffer
+
+    def close(self):
+        """Close all open files."""
+        while self._descriptors:
+            _, fd = self._descriptors.popitem()
+            os.close(fd)
+
+    def __enter__(self) -> 'TorrentStorage':
+        """Context manager of storage, files are created on enter."""
+        self.create_files()
+        return self
+
+    def __exit__(self, err_type, err_value, traceback):
+        """Exit from context closes all files."""
+        self.close()
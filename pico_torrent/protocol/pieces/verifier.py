@@ -0,0 +1,169 @@
+"""Verification of piece hashes out of event loop thread."""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import concurrent.futures
+
+from typing import Callable, Optional, Set, Tuple, Union
+
+logger = logging.getLogger('pico_torrent.protocol.pieces.verifier')
+
+
+# Default count of hashing workers
+VERIFY_WORKERS = min(4, os.cpu_count() or 1)
+
+Buffer = Union[bytes, bytearray, memoryview]
+# Called with piece index, piece data and result of verification
+VerifiedCallback = Callable[[int, Buffer, bool], None]
+
+
+def _sha1_digest(data: Buffer) -> Tuple[bytes, float]:
+    """Return SHA1 digest of data and time spent on hashing."""
+    started = time.perf_counter()
+    digest = hashlib.sha1(data).digest()  # noqa: S303
+    return digest, time.perf_counter() - started
+
+
+class PieceVerifier:
+    """Pool of workers checking hashes of completed pieces.
+
+    Hashlib releases GIL on large buffers, so threads hash pieces
+    in parallel with event loop. Process pool might be used instead,
+    then piece data is copied to worker process.
+
+    Results are delivered to event loop thread of `submit` caller.
+    Without running event loop piece is verified in place.
+    """
+
+    def __init__(
+        self,
+        workers: int = VERIFY_WORKERS,
+        use_processes: bool = False,
+    ):
+        """Initialize verifier with given count of workers."""
+        self.workers = workers
+        self.use_processes = use_processes
+        self._executor: concurrent.futures.Executor
+        if use_processes:
+            self._executor = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                workers,
+                thread_name_prefix='pico-torrent-verifier',
+            )
+
+        # Pieces submitted and not verified yet
+        self.queue_depth = 0
+        self.verified_count = 0
+        self.failed_count = 0
+        self.hashed_bytes = 0
+        # Seconds spent by workers on hashing
+        self.hashing_time = 0.0
+
+        self._futures: Set[concurrent.futures.Future] = set()
+
+    def hash_rate(self) -> float:
+        """Return hashing throughput of one worker in bytes per second."""
+        if not self.hashing_time:
+            return 0.0
+
+        return self.hashed_bytes / self.hashing_time
+
+    def submit(
+        self,
+        piece_index: int,
+        data: Buffer,
+        expected_hash: bytes,
+        callback: VerifiedCallback,
+    ):
+        """Verify hash of piece data, result is passed to callback."""
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = (
+                asyncio.get_running_loop()
+            )
+        except RuntimeError:
+            loop = None
+
+        self.queue_depth += 1
+
+        if loop is None:
+            digest, elapsed = _sha1_digest(data)
+            self._deliver(
+                piece_index, data, expected_hash, digest, elapsed, callback,
+            )
+            return
+
+        future = self._executor.submit(
+            _sha1_digest,
+            # Views cannot be sent to worker process
+            bytes(data) if self.use_processes else data,
+        )
+        self._futures.add(future)
+
+        def done(future: concurrent.futures.Future):
+            self._futures.discard(future)
+
+            if future.cancelled():
+                return
+
+            try:
+                digest, elapsed = future.result()
+            except Exception as err:
+                logger.error(f'Cannot verify piece {piece_index}: {err!r}')
+                digest, elapsed = b'', 0.0
+
+            try:
+                loop.call_soon_threadsafe(  # type: ignore
+                    self._deliver,
+                    piece_index,
+                    data,
+                    expected_hash,
+                    digest,
+                    elapsed,
+                    callback,
+                )
+            except RuntimeError:
+                # Event loop is closed, nobody waits for result
+                pass
+
+        future.add_done_callback(done)
+
+    def _deliver(
+        self,
+        piece_index: int,
+        data: Buffer,
+        expected_hash: bytes,
+        digest: bytes,
+        elapsed: float,
+        callback: VerifiedCallback,
+    ):
+        """Update counters and pass result of verification to callback."""
+        matching = digest == expected_hash
+
+        self.queue_depth -= 1
+        self.hashed_bytes += len(data)
+        self.hashing_time += elapsed
+        if matching:
+            self.verified_count += 1
+        else:
+            self.failed_count += 1
+
+        callback(piece_index, data, matching)
+
+    def close(self):
+        """Stop workers, pieces in queue are dropped."""
+        for future in list(self._futures):
+            future.cancel()
+
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> 'PieceVerifier':
+        """Context manager of verifier."""
+        return self
+
+    def __exit__(self, err_type, err_value, traceback):
+        """Exit from context stops workers."""
+        self.close()
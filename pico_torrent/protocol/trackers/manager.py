@@ -1,52 +1,217 @@
 """Trackers manager."""
 
-import datetime
+import time
+import random
+import asyncio
+import logging
+import dataclasses
+import concurrent.futures
 
-from typing import List, Tuple, Optional
+from typing import Callable, Iterable, List, Optional
+
+import requests
 
 from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
 from pico_torrent.protocol.trackers.tracker import (
+    ANNOUNCE_TIMEOUT,
+    Tracker,
     TorrentTracker,
     BadTrackerResponse,
+    create_session,
 )
+from pico_torrent.protocol.trackers.udp_tracker import UdpTorrentTracker
+
+logger = logging.getLogger('pico_torrent.protocol.trackers.manager')
+
+
+# Interval between announces if tracker does not set it, in seconds
+DEFAULT_INTERVAL = 1800
+# Interval before retry of tier whose trackers all failed, in seconds
+RETRY_INTERVAL = 60
+# Count of tiers announced at the same time
+MAX_CONCURRENT_ANNOUNCES = 8
+# Retransmits of UDP trackers, full schedule of BEP 15 would block
+# tier of silent tracker for hours
+UDP_MAX_RETRANSMITS = 1
+
+PeersCallback = Callable[[List[TorrentPeer]], None]
+
+
+@dataclasses.dataclass
+class TrackerTier:
+    """Trackers of one tier, they are tried in order until one answers."""
+
+    trackers: List[Tracker]
+    # Monotonic time of next announce
+    next_announce: float = 0.0
 
 
-TrackerWithLastVisitDate = Tuple[TorrentTracker, Optional[datetime.datetime]]
+def merge_peers(peer_lists: Iterable[List[TorrentPeer]]) -> List[TorrentPeer]:
+    """Merge lists of peers, duplicates are dropped and order is kept."""
+    merged: dict = {}
+
+    for peers in peer_lists:
+        merged.update(dict.fromkeys(peers))
+
+    return list(merged)
 
 
 class TrackersManager:
-    """Torrent trackers manager."""
+    """Torrent trackers manager.
 
-    def __init__(self, trackers: List[TorrentTracker]):
-        """Initialize trackers manager."""
-        self.trackers: List[TrackerWithLastVisitDate] = [
-            (tracker, None)
-            for tracker in trackers
+    Trackers are grouped in tiers by BEP 12: trackers of a tier are
+    shuffled once and tried in order, tracker which answers is moved to
+    the front of its tier. Tiers are announced concurrently, so slow or
+    dead trackers of one tier do not delay peers of other tiers.
+    """
+
+    def __init__(
+        self,
+        tiers: List[List[Tracker]],
+        max_concurrent: int = MAX_CONCURRENT_ANNOUNCES,
+    ):
+        """Initialize trackers manager with tiers of trackers."""
+        self.tiers = [
+            TrackerTier(
+                trackers=random.sample(  # noqa: S311
+                    trackers,
+                    len(trackers),
+                ),
+            )
+            for trackers in tiers
+            if trackers
         ]
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max(1, min(max_concurrent, len(self.tiers))),
+            thread_name_prefix='pico-torrent-tracker',
+        )
 
-    def get_remote_peers(self) -> List[TorrentPeer]:
-        """Fetch all avaliable remote peers."""
-        now = datetime.datetime.now()
+    @classmethod
+    def from_torrent(
+        cls,
+        torrent: TorrentFile,
+        peer_id: str,
+        listen_port: int,
+        session: Optional[requests.Session] = None,
+        timeout: float = ANNOUNCE_TIMEOUT,
+    ) -> 'TrackersManager':
+        """Create trackers of announce list, or of announce url without it.
 
-        all_avaliable_peers: List[TorrentPeer] = []
+        Client of tracker is chosen by url scheme. HTTP trackers
+        share one session with pool of kept-alive connections.
+        """
+        session = session or create_session()
+        urls = torrent.announce_list or [[torrent.announce]]
+        full_torrent_bytes = sum(file.length for file in torrent.info.files)
 
-        for index, (tracker, last_visited) in enumerate(self.trackers):
-            if last_visited is not None:
-                time_to_next_visit = (
-                    last_visited
-                    + datetime.timedelta(seconds=(tracker.interval or 0))
-                )
-                if time_to_next_visit >= now:
-                    continue
+        tiers = []
+        for tier_urls in urls:
+            tier: List[Tracker] = []
+
+            for url in tier_urls:
+                if url.startswith('udp://'):
+                    tier.append(UdpTorrentTracker(
+                        torrent_announce_url=url,
+                        torrent_info_hash=torrent.info_hash,
+                        full_torrent_bytes=full_torrent_bytes,
+                        this_peer_listen_port=listen_port,
+                        this_peer_id=peer_id,
+                        max_retransmits=UDP_MAX_RETRANSMITS,
+                    ))
+                elif url.startswith(('http://', 'https://')):
+                    tier.append(TorrentTracker(
+                        torrent_announce_url=url,
+                        torrent_info_hash=torrent.info_hash,
+                        full_torrent_bytes=full_torrent_bytes,
+                        this_peer_listen_port=listen_port,
+                        this_peer_id=peer_id,
+                        session=session,
+                        timeout=timeout,
+                    ))
+                else:
+                    logger.info(f'Skip tracker with unsupported url {url}')
+
+            tiers.append(tier)
+
+        return cls(tiers)
 
+    def update_transfer(self, uploaded: int, downloaded: int, left: int):
+        """Set transfer stats reported by the following announces."""
+        for tier in self.tiers:
+            for tracker in tier.trackers:
+                tracker.uploaded = uploaded
+                tracker.downloaded = downloaded
+                tracker.left = left
+
+    def _announce_tier(self, tier: TrackerTier) -> List[TorrentPeer]:
+        """Announce to the first answering tracker of tier when it is due."""
+        now = time.monotonic()
+
+        if now < tier.next_announce:
+            return []
+
+        for tracker in list(tier.trackers):
             try:
-                available_peers_from_tracker = tracker.get_available_peers()
-            except BadTrackerResponse:
+                peers = tracker.get_available_peers()
+            except BadTrackerResponse as err:
+                logger.warning(
+                    f'Tracker {tracker.announce_url} failed: {err}',
+                )
                 continue
+            except Exception as err:
+                # Failure of one tracker must not lose peers of others
+                logger.error(
+                    f'Tracker {tracker.announce_url} failed: {err!r}',
+                )
+                continue
+
+            tier.trackers.remove(tracker)
+            tier.trackers.insert(0, tracker)
+            tier.next_announce = now + (tracker.interval or DEFAULT_INTERVAL)
+
+            logger.info(
+                f'Tracker {tracker.announce_url} returned {len(peers)} peers',
+            )
+            return peers
+
+        tier.next_announce = now + RETRY_INTERVAL
+        return []
+
+    def get_remote_peers(self) -> List[TorrentPeer]:
+        """Fetch available remote peers from due tiers concurrently."""
+        return merge_peers(self._executor.map(self._announce_tier, self.tiers))
+
+    async def announce(
+        self,
+        on_peers: Optional[PeersCallback] = None,
+    ) -> List[TorrentPeer]:
+        """Fetch remote peers of due tiers without blocking event loop.
+
+        Peers of every tier are passed to `on_peers` as soon as the tier
+        answers, merged peers of all tiers are returned.
+        """
+        loop = asyncio.get_running_loop()
+        announces = [
+            loop.run_in_executor(self._executor, self._announce_tier, tier)
+            for tier in self.tiers
+        ]
+        peer_lists = []
+
+        for announce in asyncio.as_completed(announces):
+            peers = await announce
+            peer_lists.append(peers)
+
+            if on_peers is not None and peers:
+                on_peers(peers)
 
-            available_peers_from_tracker.extend(available_peers_from_tracker)
+        return merge_peers(peer_lists)
 
-            # Update last visit time
-            self.trackers[index] = (tracker, now)
+    def close(self):
+        """Stop announce workers, sockets of UDP trackers are closed."""
+        self._executor.shutdown(wait=False)
 
-        return all_avaliable_peers
+        for tier in self.tiers:
+            for tracker in tier.trackers:
+                if isinstance(tracker, UdpTorrentTracker):
+                    tracker.close()
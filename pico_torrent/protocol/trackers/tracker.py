@@ -1,22 +1,91 @@
 """Torrent tracker."""
 
 import io
-import socket
 import struct
 import requests
+import requests.adapters
 import ipaddress
 
 from urllib.parse import urlencode
-from typing import List, Tuple, cast
+from typing import List, Optional, Protocol, Union
 
 from pico_torrent.protocol.peers.peer import TorrentPeer
 from pico_torrent.protocol.bencode import BencodeDecoder, BencodeDecodeError
 
 
+# Timeout of connection to tracker and of its response in seconds
+ANNOUNCE_TIMEOUT = 15.0
+# Count of kept-alive connections to each tracker host
+TRACKER_POOL_SIZE = 4
+
+PORT = struct.Struct('>H')
+
+
 class BadTrackerResponse(Exception):
     """Exception when tracker return non 200 http code."""
 
 
+class Tracker(Protocol):
+    """Client of tracker announcing torrent, chosen by url scheme."""
+
+    announce_url: str
+    interval: Optional[int]
+    # Transfer stats of this peer reported on announce
+    uploaded: int
+    downloaded: int
+    left: int
+
+    def get_available_peers(self) -> List[TorrentPeer]:
+        """Fetch available peers from announce."""
+
+
+def parse_compact_peers(
+    raw_peers: Union[bytes, memoryview],
+    address_length: int = 4,
+) -> List[TorrentPeer]:
+    """Parse peers of compact format, address is followed by port.
+
+    Addresses of 4 bytes are IPv4, of 16 bytes are IPv6.
+    """
+    entry_length = address_length + 2
+
+    if len(raw_peers) % entry_length != 0:
+        raise ValueError(
+            f'length of compact peers is not multiple of {entry_length}',
+        )
+
+    address_type = (
+        ipaddress.IPv4Address if address_length == 4
+        else ipaddress.IPv6Address
+    )
+    view = memoryview(raw_peers)
+
+    return [
+        TorrentPeer(
+            ip=address_type(bytes(view[offset:offset + address_length])),
+            port=PORT.unpack_from(view, offset + address_length)[0],
+        )
+        for offset in range(0, len(view), entry_length)
+    ]
+
+
+def create_session(pool_size: int = TRACKER_POOL_SIZE) -> requests.Session:
+    """Create HTTP session keeping connections to trackers alive.
+
+    Session is shared by trackers of torrent, so repeated announces
+    reuse connections instead of new TCP and TLS handshakes.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
 class TorrentTracker:
     """Torrent Tracker for get available peers for download."""
 
@@ -27,25 +96,27 @@ class TorrentTracker:
         full_torrent_bytes: int,
         this_peer_listen_port: int,
         this_peer_id: str,
+        session: Optional[requests.Session] = None,
+        timeout: float = ANNOUNCE_TIMEOUT,
     ):
-        """Initialize torrent tracker client."""
-        self.interval = None
+        """Initialize torrent tracker client, announces go by session."""
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.interval: Optional[int] = None
         self.tracker_id = None
+        # Tracker is told about start of download only once
+        self.started = False
         self.announce_url = torrent_announce_url
         self.torrent_info_hash = torrent_info_hash
         self.full_torrent_bytes = full_torrent_bytes
-        # Some useful stats for tracker
+        # Transfer stats reported to tracker, updated by client
         self.uploaded = 0
         self.downloaded = 0
+        self.left = full_torrent_bytes
         # Information about this peer
         self.this_peer_port = this_peer_listen_port
         self.this_peer_id = this_peer_id
 
-    @property
-    def left(self) -> int:
-        """Count of bytes left for download full torrent file."""
-        return self.full_torrent_bytes - self.downloaded
-
     def _get_url_for_fetch_available_peers(self, first: bool = False) -> str:
         """Return url for fetch available peers from announce tracker."""
         params = {
@@ -69,9 +140,15 @@ class TorrentTracker:
     def get_available_peers(self) -> List[TorrentPeer]:
         """Fetch available peers from announce."""
         request_url = self._get_url_for_fetch_available_peers(
-            first=True if not self.tracker_id else False,
+            first=not self.started,
         )
-        tracker_response = requests.get(request_url)
+        try:
+            tracker_response = self.session.get(
+                request_url,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as err:
+            raise BadTrackerResponse(f'announce failed: {err!r}') from err
 
         if tracker_response.status_code != 200:
             raise BadTrackerResponse(tracker_response.content)
@@ -79,33 +156,34 @@ class TorrentTracker:
         decoder = BencodeDecoder(io.BytesIO(tracker_response.content))
 
         try:
-            decoded_content: dict = cast(dict, decoder.decode())
+            decoded_content = decoder.decode()
         except BencodeDecodeError:
             raise BadTrackerResponse("malformed response")
 
-        if b'faliure reason' in decoded_content:
-            raise Exception(decoded_content[b'faliure reason'].decode())
+        if not isinstance(decoded_content, dict):
+            raise BadTrackerResponse('response is not dictionary')
 
-        self.interval = decoded_content[b'interval']
-        self.tracker_id = decoded_content.get(b'tracker id', None)
-
-        raw_peers = decoded_content[b'peers']
-
-        if len(raw_peers) % 6 != 0:
-            raise BadTrackerResponse('get malformed peers')
-
-        fetched_peers = []
+        reason = decoded_content.get(b'failure reason')
+        if isinstance(reason, bytes):
+            raise BadTrackerResponse(reason.decode(errors='replace'))
+        elif reason is not None:
+            raise BadTrackerResponse(f'failure reason {reason!r}')
 
-        for index in range(0, len(raw_peers), 6):
-            raw_peer_bytes = raw_peers[index:index+6]
+        if not {b'interval', b'peers'} <= decoded_content.keys():
+            raise BadTrackerResponse('response without peers')
 
-            ip_bytes = raw_peer_bytes[:4]
-            port_bytes = raw_peer_bytes[4:]
+        if not isinstance(decoded_content[b'interval'], int):
+            raise BadTrackerResponse('interval is not integer')
 
-            ip = ipaddress.IPv4Address(socket.inet_ntoa(ip_bytes))
-            port, *_ = cast(Tuple[int, ...], struct.unpack('>H', port_bytes))
+        # Peers of dictionary model are not supported
+        if not isinstance(decoded_content[b'peers'], (bytes, memoryview)):
+            raise BadTrackerResponse('response without compact peers')
 
-            peer = TorrentPeer(ip=ipaddress.IPv4Address(ip), port=port)
-            fetched_peers.append(peer)
+        self.started = True
+        self.interval = decoded_content[b'interval']
+        self.tracker_id = decoded_content.get(b'tracker id', None)
 
-        return fetched_peers
+        try:
+            return parse_compact_peers(decoded_content[b'peers'])
+        except ValueError as err:
+            raise BadTrackerResponse('get malformed peers') from err
@@ -0,0 +1,324 @@
+"""Torrent tracker over UDP protocol (BEP 15)."""
+
+import os
+import time
+import socket
+import struct
+import logging
+import threading
+import dataclasses
+
+from urllib.parse import urlparse
+from typing import List, Optional
+
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.trackers.tracker import (
+    BadTrackerResponse,
+    parse_compact_peers,
+)
+
+logger = logging.getLogger('pico_torrent.protocol.trackers.udp_tracker')
+
+
+PROTOCOL_ID = 0x41727101980
+
+ACTION_CONNECT = 0
+ACTION_ANNOUNCE = 1
+ACTION_SCRAPE = 2
+ACTION_ERROR = 3
+
+EVENT_NONE = 0
+EVENT_COMPLETED = 1
+EVENT_STARTED = 2
+EVENT_STOPPED = 3
+
+# Retransmit timeout is `UDP_TIMEOUT * 2**n` seconds for n-th attempt
+UDP_TIMEOUT = 15.0
+MAX_RETRANSMITS = 8
+# Blocked receive checks whether tracker is closed that often, in seconds
+CLOSE_POLL_INTERVAL = 0.5
+# Connection id might be used during one minute after it is received
+CONNECTION_ID_LIFETIME = 60.0
+MAX_DATAGRAM_SIZE = 2**16
+
+REQUEST_HEADER = struct.Struct('>QII')
+RESPONSE_HEADER = struct.Struct('>II')
+CONNECT_RESPONSE = struct.Struct('>IIQ')
+ANNOUNCE_REQUEST = struct.Struct('>20s20sQQQIIIiH')
+ANNOUNCE_RESPONSE = struct.Struct('>IIIII')
+SCRAPE_ENTRY = struct.Struct('>III')
+
+
+def _random_id() -> int:
+    """Return random 32-bit identifier."""
+    return int.from_bytes(os.urandom(4), 'big')
+
+
+@dataclasses.dataclass
+class ScrapeResult:
+    """Counts of peers of torrent reported by tracker."""
+
+    seeders: int
+    completed: int
+    leechers: int
+
+
+class UdpTorrentTracker:
+    """Torrent tracker speaking UDP protocol.
+
+    Interface is the same as of HTTP `TorrentTracker`. Requests are
+    sent with connection id which is cached for a minute, requests
+    without response are retransmitted with doubled timeout.
+
+    Request might be waiting in other thread, `close` makes it fail
+    within `CLOSE_POLL_INTERVAL`.
+    """
+
+    def __init__(
+        self,
+        torrent_announce_url: str,
+        torrent_info_hash: bytes,
+        full_torrent_bytes: int,
+        this_peer_listen_port: int,
+        this_peer_id: str,
+        timeout: float = UDP_TIMEOUT,
+        max_retransmits: int = MAX_RETRANSMITS,
+    ):
+        """Initialize UDP tracker client."""
+        self.timeout = timeout
+        self.max_retransmits = max_retransmits
+        self.interval: Optional[int] = None
+        self.tracker_id = None
+        self.announce_url = torrent_announce_url
+        self.torrent_info_hash = torrent_info_hash
+        self.full_torrent_bytes = full_torrent_bytes
+        # Transfer stats reported to tracker, updated by client
+        self.uploaded = 0
+        self.downloaded = 0
+        self.left = full_torrent_bytes
+        # Information about this peer
+        self.this_peer_port = this_peer_listen_port
+        self.this_peer_id = this_peer_id
+        # Tracker is told about start of download only once
+        self.started = False
+        # Peers of swarm reported by the last announce
+        self.seeders: Optional[int] = None
+        self.leechers: Optional[int] = None
+
+        # Key lets tracker identify us when our address changes
+        self._key = _random_id()
+        self._socket: Optional[socket.socket] = None
+        self._connection_id: Optional[int] = None
+        self._connection_time = 0.0
+        # Held by request in progress, its socket is closed by it
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connected_socket(self) -> socket.socket:
+        """Return socket connected to tracker address."""
+        if self._closed:
+            raise BadTrackerResponse('tracker is closed')
+
+        if self._socket is not None:
+            return self._socket
+
+        url = urlparse(self.announce_url)
+        if url.hostname is None or url.port is None:
+            raise BadTrackerResponse(f'bad tracker url {self.announce_url}')
+
+        try:
+            family, kind, proto, _, address = socket.getaddrinfo(
+                url.hostname,
+                url.port,
+                type=socket.SOCK_DGRAM,
+            )[0]
+            self._socket = socket.socket(family, kind, proto)
+            self._socket.connect(address)
+        except OSError as err:
+            raise BadTrackerResponse(
+                f'cannot reach tracker: {err!r}',
+            ) from err
+
+        return self._socket
+
+    def _transact(
+        self,
+        request: bytes,
+        transaction_id: int,
+        action: int,
+        timeout: float,
+    ) -> Optional[memoryview]:
+        """Send request once, return its response or None on timeout."""
+        sock = self._connected_socket()
+        deadline = time.monotonic() + timeout
+
+        try:
+            sock.send(request)
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+                sock.settimeout(min(remaining, CLOSE_POLL_INTERVAL))
+                try:
+                    response = memoryview(sock.recv(MAX_DATAGRAM_SIZE))
+                except socket.timeout:
+                    if self._closed:
+                        raise BadTrackerResponse('tracker is closed')
+                    continue
+
+                if len(response) < RESPONSE_HEADER.size:
+                    continue
+
+                response_action, response_transaction = (
+                    RESPONSE_HEADER.unpack_from(response)
+                )
+                # Late responses of retransmitted requests are skipped
+                if response_transaction != transaction_id:
+                    continue
+
+                if response_action == ACTION_ERROR:
+                    raise BadTrackerResponse(
+                        bytes(response[RESPONSE_HEADER.size:]).decode(
+                            errors='replace',
+                        ),
+                    )
+
+                if response_action != action:
+                    raise BadTrackerResponse(
+                        f'response of action {response_action}, '
+                        f'expected {action}',
+                    )
+
+                return response
+        except OSError as err:
+            raise BadTrackerResponse(f'tracker failed: {err!r}') from err
+
+    def _connect(self, timeout: float) -> Optional[int]:
+        """Return connection id, cached one is used while it is valid."""
+        if (
+            self._connection_id is not None
+            and time.monotonic() - self._connection_time
+            < CONNECTION_ID_LIFETIME
+        ):
+            return self._connection_id
+
+        transaction_id = _random_id()
+        response = self._transact(
+            REQUEST_HEADER.pack(PROTOCOL_ID, ACTION_CONNECT, transaction_id),
+            transaction_id,
+            ACTION_CONNECT,
+            timeout,
+        )
+
+        if response is None:
+            return None
+
+        if len(response) < CONNECT_RESPONSE.size:
+            raise BadTrackerResponse('malformed connect response')
+
+        _, _, self._connection_id = CONNECT_RESPONSE.unpack_from(response)
+        self._connection_time = time.monotonic()
+
+        return self._connection_id
+
+    def _request(self, action: int, body: bytes) -> memoryview:
+        """Send request, socket is closed after it if tracker is closed."""
+        try:
+            with self._lock:
+                return self._retransmit(action, body)
+        finally:
+            if self._closed:
+                self.close()
+
+    def _retransmit(self, action: int, body: bytes) -> memoryview:
+        """Send request with connection id, retransmit it on timeouts."""
+        for attempt in range(self.max_retransmits + 1):
+            timeout = self.timeout * 2**attempt
+
+            connection_id = self._connect(timeout)
+            if connection_id is None:
+                continue
+
+            transaction_id = _random_id()
+            response = self._transact(
+                REQUEST_HEADER.pack(connection_id, action, transaction_id)
+                + body,
+                transaction_id,
+                action,
+                timeout,
+            )
+
+            if response is not None:
+                return response
+
+            logger.debug(f'Retransmit request to {self.announce_url}')
+
+        raise BadTrackerResponse(f'no response from {self.announce_url}')
+
+    def get_available_peers(self) -> List[TorrentPeer]:
+        """Fetch available peers from announce."""
+        body = ANNOUNCE_REQUEST.pack(
+            self.torrent_info_hash,
+            self.this_peer_id.encode(),
+            self.downloaded,
+            self.left,
+            self.uploaded,
+            EVENT_STARTED if not self.started else EVENT_NONE,
+            0,  # Address of request sender is used
+            self._key,
+            -1,  # Default count of peers
+            self.this_peer_port,
+        )
+        family = self._connected_socket().family
+        response = self._request(ACTION_ANNOUNCE, body)
+
+        if len(response) < ANNOUNCE_RESPONSE.size:
+            raise BadTrackerResponse('malformed announce response')
+
+        _, _, interval, leechers, seeders = ANNOUNCE_RESPONSE.unpack_from(
+            response,
+        )
+
+        try:
+            peers = parse_compact_peers(
+                response[ANNOUNCE_RESPONSE.size:],
+                address_length=16 if family == socket.AF_INET6 else 4,
+            )
+        except ValueError as err:
+            raise BadTrackerResponse('get malformed peers') from err
+
+        self.started = True
+        self.interval = interval
+        self.leechers = leechers
+        self.seeders = seeders
+
+        return peers
+
+    def scrape(self) -> ScrapeResult:
+        """Fetch counts of peers of torrent."""
+        response = self._request(ACTION_SCRAPE, self.torrent_info_hash)
+
+        if len(response) < RESPONSE_HEADER.size + SCRAPE_ENTRY.size:
+            raise BadTrackerResponse('malformed scrape response')
+
+        return ScrapeResult(*SCRAPE_ENTRY.unpack_from(
+            response,
+            RESPONSE_HEADER.size,
+        ))
+
+    def close(self):
+        """Close tracker, request waiting in other thread is stopped."""
+        self._closed = True
+
+        # Socket of request in progress is closed by its thread
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+        finally:
+            self._lock.release()
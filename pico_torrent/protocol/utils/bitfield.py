@@ -0,0 +1,187 @@
+"""Compact bit field of pieces."""
+
+from typing import Iterator, Optional, Union
+
+BYTE_LENGTH = 8  # bit
+
+# Bytes of bit field in wire format
+BitfieldData = Union[bytes, bytearray, memoryview]
+
+
+def _popcount(value: int) -> int:
+    """Return count of set bits of integer."""
+    try:
+        return value.bit_count()  # type: ignore
+    except AttributeError:  # python < 3.10
+        return bin(value).count('1')
+
+
+class Bitfield:
+    """Bit field backed by bytearray in wire format of BitField message.
+
+    Bit of piece 0 is the high bit of first byte, spare bits
+    of last byte are always zero.
+    """
+
+    __slots__ = ('length', '_bits')
+
+    def __init__(self, length: int, data: Optional[BitfieldData] = None):
+        """Initialize bit field of given length in bits."""
+        size = -(-length // BYTE_LENGTH)
+        self.length = length
+
+        if data is None:
+            self._bits = bytearray(size)
+            return
+
+        if len(data) < size:
+            raise ValueError(
+                f'bit field of {len(data)} bytes is too short '
+                f'for {length} bits',
+            )
+
+        self._bits = bytearray(data[:size])
+        self._clear_spare_bits()
+
+    @classmethod
+    def from_bytes(cls, data: BitfieldData) -> 'Bitfield':
+        """Create bit field of all bits of given bytes."""
+        return cls(len(data) * BYTE_LENGTH, data)
+
+    @classmethod
+    def full(cls, length: int) -> 'Bitfield':
+        """Create bit field with all bits set."""
+        return cls(length, b'\xff' * -(-length // BYTE_LENGTH))
+
+    @classmethod
+    def _from_int(cls, length: int, value: int) -> 'Bitfield':
+        """Create bit field from big-endian integer."""
+        size = -(-length // BYTE_LENGTH)
+        bitfield = cls(length)
+        bitfield._bits[:] = value.to_bytes(size, 'big')
+        return bitfield
+
+    def _to_int(self) -> int:
+        """Return bit field as big-endian integer."""
+        return int.from_bytes(self._bits, 'big')
+
+    def _clear_spare_bits(self):
+        """Reset bits of last byte after length."""
+        spare = len(self._bits) * BYTE_LENGTH - self.length
+
+        if spare:
+            self._bits[-1] &= (0xff << spare) & 0xff
+
+    def _check_index(self, index: int):
+        """Check that bit index is in bit field."""
+        if not 0 <= index < self.length:
+            raise IndexError(
+                f'bit index {index} out of bit field of {self.length}',
+            )
+
+    def _check_length(self, other: 'Bitfield'):
+        """Check that bit fields have the same length."""
+        if self.length != other.length:
+            raise ValueError(
+                f'bit fields lengths {self.length} and {other.length} differ',
+            )
+
+    def __len__(self) -> int:
+        """Return length of bit field in bits."""
+        return self.length
+
+    def __getitem__(self, index: int) -> bool:
+        """Return bit by index."""
+        self._check_index(index)
+        return bool(self._bits[index >> 3] & (0x80 >> (index & 7)))
+
+    def __setitem__(self, index: int, value: bool):
+        """Set or reset bit by index."""
+        self._check_index(index)
+
+        if value:
+            self._bits[index >> 3] |= 0x80 >> (index & 7)
+        else:
+            self._bits[index >> 3] &= ~(0x80 >> (index & 7)) & 0xff
+
+    def mark(self, index: int) -> bool:
+        """Set bit by index, return True if it was not set."""
+        self._check_index(index)
+        mask = 0x80 >> (index & 7)
+
+        if self._bits[index >> 3] & mask:
+            return False
+
+        self._bits[index >> 3] |= mask
+        return True
+
+    def count(self) -> int:
+        """Return count of set bits."""
+        return _popcount(self._to_int())
+
+    def has_any(self) -> bool:
+        """Check that at least one bit is set."""
+        return self._bits.count(0) != len(self._bits)
+
+    def is_full(self) -> bool:
+        """Check that all bits are set."""
+        return self.count() == self.length
+
+    def indices(self) -> Iterator[int]:
+        """Iterate over indices of set bits, zero bytes are skipped."""
+        for byte_index, byte in enumerate(self._bits):
+            if not byte:
+                continue
+
+            base = byte_index * BYTE_LENGTH
+            for bit in range(BYTE_LENGTH):
+                if byte & (0x80 >> bit):
+                    yield base + bit
+
+    def __and__(self, other: 'Bitfield') -> 'Bitfield':
+        """Return bits set in both bit fields."""
+        self._check_length(other)
+        return Bitfield._from_int(
+            self.length,
+            self._to_int() & other._to_int(),
+        )
+
+    def __or__(self, other: 'Bitfield') -> 'Bitfield':
+        """Return bits set in any of bit fields."""
+        self._check_length(other)
+        return Bitfield._from_int(
+            self.length,
+            self._to_int() | other._to_int(),
+        )
+
+    def __ior__(self, other: 'Bitfield') -> 'Bitfield':
+        """Set bits which are set in other bit field."""
+        self._check_length(other)
+        self._bits[:] = (self._to_int() | other._to_int()).to_bytes(
+            len(self._bits),
+            'big',
+        )
+        return self
+
+    def andnot(self, other: 'Bitfield') -> 'Bitfield':
+        """Return bits set in this bit field and not set in other one."""
+        self._check_length(other)
+        return Bitfield._from_int(
+            self.length,
+            self._to_int() & ~other._to_int(),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Compare bit fields."""
+        if not isinstance(other, Bitfield):
+            return NotImplemented
+
+        return self.length == other.length and self._bits == other._bits
+
+    def to_bytes(self) -> memoryview:
+        """Return read-only view of bit field in wire format."""
+        return memoryview(self._bits).toreadonly()
+
+    def __repr__(self) -> str:
+        """Return representation of bit field."""
+        return f'{type(self).__name__}({self.count()}/{self.length})'
@@ -0,0 +1,92 @@
+"""Rate meters and histograms for transfer statistics."""
+
+import math
+import time
+import bisect
+
+from typing import List, Optional
+
+
+# Time constant of rate meters in seconds, rate of older transfers
+# decays by `e` times every time constant
+RATE_TIME_CONSTANT = 5.0
+
+# Upper bounds of latency histogram buckets in seconds, from 1 ms
+# to 64 s, values over the last bound go to overflow bucket
+LATENCY_BOUNDS = [0.001 * 2**power for power in range(17)]
+
+
+class RateMeter:
+    """Exponentially weighted moving average of transfer rate.
+
+    Every transfer adds its bytes divided by time constant, the
+    accumulated rate decays continuously, so steady transfer of
+    `r` bytes per second is measured as `r`. Update is O(1).
+    """
+
+    def __init__(self, time_constant: float = RATE_TIME_CONSTANT):
+        """Initialize meter without transfers."""
+        self.time_constant = time_constant
+        self.total = 0
+        self._rate = 0.0
+        self._updated: Optional[float] = None
+
+    def _decay(self, now: float) -> float:
+        """Return rate decayed to given time."""
+        if self._updated is None:
+            return 0.0
+
+        elapsed = max(now - self._updated, 0.0)
+        return self._rate * math.exp(-elapsed / self.time_constant)
+
+    def add(self, count: int, now: Optional[float] = None):
+        """Add transferred bytes to meter."""
+        now = time.monotonic() if now is None else now
+
+        self._rate = self._decay(now) + count / self.time_constant
+        self._updated = now
+        self.total += count
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Return rate in bytes per second."""
+        return self._decay(time.monotonic() if now is None else now)
+
+
+class Histogram:
+    """Histogram of values over fixed bucket bounds."""
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        """Initialize empty histogram, latency bounds are default."""
+        self.bounds = bounds if bounds is not None else LATENCY_BOUNDS
+        # The last bucket counts values over the last bound
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float):
+        """Count value in its bucket."""
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def mean(self) -> Optional[float]:
+        """Return mean of values, None if histogram is empty."""
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, share: float) -> Optional[float]:
+        """Return upper bound of bucket holding given share of values.
+
+        Values of overflow bucket are reported as infinity.
+        """
+        if not self.count:
+            return None
+
+        rank = share * self.count
+        seen = 0
+
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return math.inf
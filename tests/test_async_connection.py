@@ -0,0 +1,110 @@
+import io
+import asyncio
+import ipaddress
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.async_connection import (
+    AsyncTorrentPeerConnection,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+from tests.test_torrent import TORRENT
+
+PEER_ID = '-PC0100-000000000000'
+
+
+async def _serve_peer(handler):
+    """Start stand-in remote peer, return server and its peer."""
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('127.0.0.1'), port=port)
+
+    return server, peer
+
+
+def _make_connection(peer, **kwargs):
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    manager = PiecesManager(torrent)
+    conn = AsyncTorrentPeerConnection(
+        remote_peer=peer,
+        torrent=torrent,
+        peer_id=PEER_ID,
+        pieces_manager=manager,
+        **kwargs,
+    )
+    return conn, manager
+
+
+def test_communicate_until_remote_closes():
+    received = []
+
+    async def handler(reader, writer):
+        handshake = await reader.readexactly(68)
+        received.append(handshake)
+        writer.write(handshake)
+        writer.write(messages.BitField(b'\xc0').encode())
+        writer.write(messages.Unchoke().encode())
+        received.append(await reader.readexactly(5))
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        server, peer = await _serve_peer(handler)
+        conn, manager = _make_connection(peer)
+
+        async with server:
+            await asyncio.wait_for(conn.communicate(), timeout=5)
+
+        return conn, manager
+
+    conn, manager = asyncio.run(main())
+
+    assert received[1] == messages.Interested().encode()
+    assert not conn.this_peer_state.choked
+    assert manager.peers == {}
+
+
+def test_cancel_removes_peer():
+    async def handler(reader, writer):
+        writer.write(await reader.readexactly(68))
+        writer.write(messages.BitField(b'\xc0').encode())
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    async def main():
+        server, peer = await _serve_peer(handler)
+        conn, manager = _make_connection(peer)
+
+        async with server:
+            task = asyncio.create_task(conn.communicate())
+
+            while peer not in manager.peers:
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        return manager
+
+    assert asyncio.run(main()).peers == {}
+
+
+def test_read_timeout():
+    async def handler(reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def main():
+        server, peer = await _serve_peer(handler)
+        conn, manager = _make_connection(peer, read_timeout=0.1)
+
+        async with server:
+            await asyncio.wait_for(conn.communicate(), timeout=5)
+
+        return conn
+
+    assert not asyncio.run(main()).connection.handshaked
@@ -0,0 +1,80 @@
+import io
+import mmap
+
+import pytest
+
+from pico_torrent.protocol.bencode import (
+    BencodeDecoder,
+    BencodeDecodeError,
+    BencodeBufferDecoder,
+    BencodeEncoder,
+)
+
+ENCODED = b'd4:listli1ei-20e3:abce3:str11:hello worlde'
+DECODED = {b'list': [1, -20, b'abc'], b'str': b'hello world'}
+
+
+def test_buffer_decoder():
+    assert BencodeBufferDecoder(ENCODED).decode() == DECODED
+
+
+def test_buffer_decoder_zero_copy():
+    decoded = BencodeBufferDecoder(ENCODED, zero_copy=True).decode()
+
+    assert isinstance(decoded[b'str'], memoryview)
+    assert all(isinstance(key, bytes) for key in decoded)
+    assert decoded == DECODED
+
+
+def test_buffer_decoder_from_memoryview():
+    view = memoryview(b'xx' + ENCODED)[2:]
+    decoded = BencodeBufferDecoder(view).decode()
+
+    assert isinstance(decoded[b'str'], bytes)
+    assert decoded == DECODED
+
+
+def test_buffer_decoder_from_mmap(tmp_path):
+    path = tmp_path / 'data.torrent'
+    path.write_bytes(ENCODED)
+
+    with path.open('rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            assert BencodeBufferDecoder(buffer).decode() == DECODED
+
+
+def test_file_decoder_keeps_position():
+    bencode_file = io.BytesIO(b'i42e3:abc')
+    decoder = BencodeDecoder(bencode_file)
+
+    assert decoder.decode() == 42
+    assert decoder.decode() == b'abc'
+
+
+def test_decoder_roundtrip_with_encoder():
+    encoded = BencodeEncoder().encode(DECODED).getvalue()
+    assert BencodeBufferDecoder(encoded).decode() == DECODED
+
+
+@pytest.mark.parametrize('encoded', [
+    b'',
+    b'i42',
+    b'5:abc',
+    b'l1:a',
+    b'd3:abc',
+    b'x',
+    b'di1ei2ee',
+])
+def test_decoder_errors(encoded):
+    with pytest.raises(BencodeDecodeError):
+        BencodeBufferDecoder(encoded).decode()
+
+
+def test_buffer_decoder_records_top_level_spans():
+    decoder = BencodeBufferDecoder(ENCODED)
+    decoder.decode()
+
+    start, end = decoder.spans[b'list']
+    assert ENCODED[start:end] == b'li1ei-20e3:abce'
+    start, end = decoder.spans[b'str']
+    assert ENCODED[start:end] == b'11:hello world'
@@ -0,0 +1,59 @@
+import pytest
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.raw_message import RawPeerMessage
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+
+def test_bitfield_get_set_and_count():
+    bitfield = Bitfield(10)
+    bitfield[0] = True
+    bitfield[9] = True
+
+    assert bitfield.mark(3) is True
+    assert bitfield.mark(3) is False
+    assert bitfield[0] and bitfield[3] and bitfield[9]
+    assert not bitfield[1]
+    assert bitfield.count() == 3
+    assert list(bitfield.indices()) == [0, 3, 9]
+    assert bytes(bitfield.to_bytes()) == b'\x90\x40'
+
+    bitfield[0] = False
+    assert bitfield.count() == 2
+
+    with pytest.raises(IndexError):
+        bitfield[10]
+
+
+def test_bitfield_clears_spare_bits():
+    bitfield = Bitfield(10, b'\xff\xff')
+
+    assert bitfield.is_full()
+    assert bytes(bitfield.to_bytes()) == b'\xff\xc0'
+
+
+def test_bitfield_set_operations():
+    ours = Bitfield(12, b'\xf0\x00')
+    theirs = Bitfield(12, b'\x3c\x30')
+
+    assert list((ours & theirs).indices()) == [2, 3]
+    assert list(theirs.andnot(ours).indices()) == [4, 5, 10, 11]
+    assert (ours | theirs).count() == 8
+    assert not Bitfield(12).has_any()
+
+    ours |= theirs
+    assert ours == Bitfield(12, b'\xfc\x30')
+
+    with pytest.raises(ValueError):
+        ours & Bitfield(16)
+
+
+def test_bitfield_message_roundtrip():
+    encoded = messages.BitField(b'\xa0\x01').encode()
+    message = messages.BitField.decode_from_raw(
+        RawPeerMessage.from_bytes(encoded),
+    )
+
+    assert encoded == b'\x00\x00\x00\x03\x05\xa0\x01'
+    assert message.have_piece(0) and message.have_piece(15)
+    assert not message.have_piece(1)
@@ -0,0 +1,189 @@
+import io
+import random
+import ipaddress
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import PeerState, TorrentPeer
+from pico_torrent.protocol.peers.choker import Choker
+from pico_torrent.protocol.peers.connection import BaseTorrentPeerConnection
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+from tests.test_torrent import TORRENT
+from tests.test_async_connection import PEER_ID
+
+
+class FakePeer:
+    def __init__(self, index, interested=True, snubbed=False):
+        self.remote_peer = TorrentPeer(
+            ip=ipaddress.IPv4Address(f'10.0.0.{index + 1}'),
+            port=6881,
+        )
+        self.remote_peer_state = PeerState(interested=interested)
+        self.downloaded_bytes = 0
+        self.uploaded_bytes = 0
+        self.snubbed = snubbed
+
+    def is_snubbed(self, now, timeout):
+        return self.snubbed
+
+    def choke_remote_peer(self):
+        self.remote_peer_state.choked = True
+
+    def unchoke_remote_peer(self):
+        self.remote_peer_state.choked = False
+        return True
+
+
+def _choker(peers, seeding=False, **kwargs):
+    choker = Choker(
+        is_seeding=lambda: seeding,
+        rng=random.Random(0),
+        **kwargs,
+    )
+    for peer in peers:
+        choker.add(peer)
+    return choker
+
+
+def test_fastest_interested_peers_are_unchoked():
+    peers = [FakePeer(index) for index in range(6)]
+    peers[5].remote_peer_state.interested = False
+    choker = _choker(peers, upload_slots=2)
+
+    for index, peer in enumerate(peers):
+        peer.downloaded_bytes = index * 1000
+    choker.run_round(now=choker._round_started + 10)
+
+    assert {peers[3], peers[4]} <= choker.unchoked
+    assert choker.optimistic in peers[:3]
+    assert len(choker.unchoked) == 3
+    assert peers[5].remote_peer_state.choked
+    assert all(
+        peer.remote_peer_state.choked == (peer not in choker.unchoked)
+        for peer in peers
+    )
+
+
+def test_optimistic_unchoke_rotates_and_snubbed_peers_are_not_regular():
+    peers = [FakePeer(index) for index in range(4)]
+    peers[3].snubbed = True
+    peers[3].downloaded_bytes = 10**6
+    choker = _choker(peers, upload_slots=1, optimistic_rounds=2)
+
+    optimistic = set()
+    previous = None
+    for round_index in range(20):
+        peers[2].downloaded_bytes += 1000
+        choker.run_round(now=choker._round_started + 10)
+
+        assert peers[2] in choker.unchoked
+        assert choker.optimistic is not peers[2]
+        # Snubbed peer is fast, but it is unchoked only optimistically
+        assert peers[3] not in choker.unchoked - {choker.optimistic}
+        if round_index % 2:
+            assert choker.optimistic is previous
+        previous = choker.optimistic
+        optimistic.add(choker.optimistic)
+
+    assert optimistic == {peers[0], peers[1], peers[3]}
+
+
+def test_seeding_ranks_peers_by_upload_rate():
+    peers = [FakePeer(index, snubbed=True) for index in range(3)]
+    choker = _choker(peers, seeding=True, upload_slots=1)
+
+    peers[0].downloaded_bytes = 10**6
+    peers[1].uploaded_bytes = 1000
+    choker.run_round(now=choker._round_started + 10)
+
+    assert peers[1] in choker.unchoked
+    assert choker.optimistic is not peers[1]
+
+
+def test_interested_peer_takes_free_slot_at_once():
+    peers = [FakePeer(index, interested=False) for index in range(3)]
+    choker = _choker(peers, upload_slots=1)
+
+    choker.peer_interested(peers[0])
+    choker.peer_interested(peers[1])
+
+    assert not peers[0].remote_peer_state.choked
+    assert peers[1].remote_peer_state.choked
+
+    choker.remove(peers[0])
+    choker.peer_interested(peers[1])
+    assert not peers[1].remote_peer_state.choked
+
+
+class Sender:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+def test_peer_which_cannot_be_unchoked_does_not_take_slot():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    manager = PiecesManager(torrent)
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    choker = _choker([], upload_slots=1)
+    conn = BaseTorrentPeerConnection(
+        peer, torrent, PEER_ID, manager, choker=choker,
+    )
+    conn.connection = Sender()
+    conn._handshaked()
+
+    conn._handle_message(messages.Interested())
+
+    assert conn.remote_peer_state.choked
+    assert choker.unchoked == set()
+
+
+def test_choked_peer_requests_are_dropped():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    manager = PiecesManager(torrent)
+    manager.have[0] = True
+    manager.have_count = 1
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    choker = _choker([], upload_slots=1)
+    conn = BaseTorrentPeerConnection(
+        peer, torrent, PEER_ID, manager, choker=choker,
+    )
+    conn.connection = Sender()
+    conn._handshaked()
+
+    conn._handle_message(messages.Interested())
+    assert conn in choker.unchoked
+    assert isinstance(conn.connection.sent[-1], messages.Unchoke)
+
+    conn.uploads.add(messages.Request(0, 0, 10))
+    conn.choke_remote_peer()
+    assert isinstance(conn.connection.sent[-1], messages.Choke)
+    assert len(conn.uploads) == 0
+
+    conn._handle_message(messages.Request(0, 0, 10))
+    assert len(conn.uploads) == 0
+
+
+def test_interest_follows_pieces_of_remote_peer():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    manager = PiecesManager(torrent)
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    conn = BaseTorrentPeerConnection(peer, torrent, PEER_ID, manager)
+    conn.connection = Sender()
+    conn._handshaked()
+    assert conn.connection.sent == []
+
+    conn._handle_message(messages.BitField(b'\x80'))
+    assert isinstance(conn.connection.sent[-1], messages.Interested)
+
+    manager.mark_have(0)
+    conn._handle_message(messages.KeepAlive())
+    assert conn.this_peer_state.interested is False
+    assert [type(message) for message in conn.connection.sent] == [
+        messages.Interested,
+        messages.NotInterested,
+        messages.Have,
+    ]
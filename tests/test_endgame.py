@@ -0,0 +1,72 @@
+import os
+import hashlib
+import ipaddress
+
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+DATA = os.urandom(2 * messages.REQUEST_SIZE)
+FAST = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=1)
+SLOW = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.2'), port=2)
+
+
+def _manager() -> PiecesManager:
+    torrent = TorrentFile.from_torrent_file(BencodeEncoder().encode({
+        b'announce': b'http://tracker/announce',
+        b'info': {
+            b'length': len(DATA),
+            b'name': b'test',
+            b'piece length': len(DATA),
+            b'pieces': hashlib.sha1(DATA).digest(),
+        },
+    }))
+    manager = PiecesManager(torrent)
+
+    for peer in (FAST, SLOW):
+        manager.update_peer_with_bitfield(peer, messages.BitField(b'\x80'))
+
+    return manager
+
+
+def _block_message(block) -> messages.Piece:
+    return messages.Piece(
+        block.piece_index,
+        block.offset,
+        DATA[block.offset:block.offset + block.length],
+    )
+
+
+def test_blocks_in_flight_are_requested_again_in_endgame():
+    manager = _manager()
+    cancelled = []
+    manager.cancel_handlers[SLOW] = lambda block: not cancelled.append(block)
+
+    slow_blocks = [manager.next_request(SLOW), manager.next_request(SLOW)]
+    assert not manager.endgame
+    assert manager.next_request(SLOW) is None
+    assert manager.endgame
+
+    fast_blocks = [manager.next_request(FAST), manager.next_request(FAST)]
+    assert fast_blocks == slow_blocks
+    assert manager.next_request(FAST) is None
+    assert manager.duplicate_requests == 2
+
+    manager.add_piece(_block_message(fast_blocks[0]), FAST)
+    assert cancelled == [slow_blocks[0]]
+    assert manager.cancelled_requests == 1
+
+    # Copy of slow peer arrives before it handles cancel
+    manager.add_piece(_block_message(slow_blocks[0]), SLOW)
+    assert manager.wasted_bytes == messages.REQUEST_SIZE
+
+    # Slow peer chokes us, block is still requested from fast peer
+    manager.return_blocks([slow_blocks[1]], SLOW)
+    assert manager.next_request(SLOW) is slow_blocks[1]
+    manager.return_blocks([slow_blocks[1]], SLOW)
+
+    manager.add_piece(_block_message(fast_blocks[1]), FAST)
+    assert manager.is_complete()
+    assert manager.requests == {}
@@ -0,0 +1,69 @@
+import pytest
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.connection import decode_peer_message
+from pico_torrent.protocol.peers.raw_message import PeerMessageId
+
+
+def test_all_messages_of_one_read_are_parsed():
+    framer = MessageFramer()
+    handshake = messages.Handshake(b'i' * 20, b'p' * 20)
+    framer.feed(
+        handshake.encode()
+        + messages.KeepAlive().encode()
+        + messages.Have(7).encode()
+        + messages.Piece(1, 0, b'data').encode()[:10],
+    )
+
+    raw_handshake = framer.next_handshake()
+    assert messages.Handshake.decode_from_raw(raw_handshake).peer_id == (
+        b'p' * 20
+    )
+    assert [raw.message_id for raw in framer.messages()] == [
+        PeerMessageId.KeepAlive,
+        PeerMessageId.Have,
+    ]
+
+    framer.feed(messages.Piece(1, 0, b'data').encode()[10:])
+    piece = decode_peer_message(framer.next_message())
+
+    assert isinstance(piece.block, memoryview)
+    assert piece.block == b'data'
+    assert framer.buffered == 0
+
+
+def test_payload_is_valid_until_release():
+    framer = MessageFramer(capacity=2**15)
+    block = bytes(range(256)) * 64
+    encoded = messages.Piece(0, 0, block).encode()
+
+    framer.feed(encoded)
+    piece = decode_peer_message(framer.next_message())
+
+    # Buffer runs out of space, data is moved to other buffer
+    for _ in range(4):
+        framer.feed(encoded)
+    assert piece.block == block
+
+    framer.release()
+    for raw in framer.messages():
+        assert decode_peer_message(raw).block == block
+
+
+def test_too_long_message_is_rejected():
+    framer = MessageFramer()
+    framer.feed(b'\xff\xff\xff\xff\x07')
+
+    with pytest.raises(ValueError):
+        framer.next_message()
+
+
+def test_port_message_has_two_bytes_port():
+    framer = MessageFramer()
+    framer.feed(messages.Port(6881).encode() + messages.Have(1).encode())
+
+    port = decode_peer_message(framer.next_message())
+
+    assert port.listen_port == 6881
+    assert framer.next_message().message_id == PeerMessageId.Have
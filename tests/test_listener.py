@@ -0,0 +1,156 @@
+import io
+import asyncio
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.swarm import Swarm
+from pico_torrent.protocol.peers.listener import PeerListener
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+from tests.test_torrent import TORRENT
+from tests.test_async_connection import PEER_ID
+
+REMOTE_PEER_ID = b'-XX0100-111111111111'
+
+
+async def _start(**kwargs):
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    manager = PiecesManager(torrent)
+    swarm = Swarm(torrent=torrent, peer_id=PEER_ID, pieces_manager=manager)
+    listener = PeerListener(host='127.0.0.1', port=0, **kwargs)
+    listener.add_swarm(swarm)
+    await listener.start()
+
+    return swarm, listener, asyncio.create_task(swarm.run())
+
+
+async def _stop(swarm, listener, task):
+    swarm.stop()
+    await asyncio.wait_for(task, timeout=5)
+    await listener.close()
+
+
+def test_inbound_peer_is_routed_by_info_hash():
+    async def main():
+        swarm, listener, task = await _start()
+        reader, writer = await asyncio.open_connection(
+            '127.0.0.1',
+            listener.port,
+        )
+        writer.write(messages.Handshake(
+            info_hash=swarm.torrent.info_hash,
+            peer_id=REMOTE_PEER_ID,
+        ).encode())
+        writer.write(messages.BitField(b'\xc0').encode())
+
+        handshake = await reader.readexactly(68)
+        interested = await reader.readexactly(5)
+
+        while not swarm.pieces_manager.peers:
+            await asyncio.sleep(0.01)
+
+        active = len(swarm.active)
+        writer.close()
+        await _stop(swarm, listener, task)
+
+        return swarm, handshake, interested, active
+
+    swarm, handshake, interested, active = asyncio.run(
+        asyncio.wait_for(main(), timeout=10),
+    )
+
+    assert handshake == messages.Handshake(
+        info_hash=swarm.torrent.info_hash,
+        peer_id=PEER_ID.encode(),
+    ).encode()
+    assert interested == messages.Interested().encode()
+    assert active == 1
+
+
+def test_unknown_torrent_is_refused():
+    async def main():
+        swarm, listener, task = await _start()
+        reader, writer = await asyncio.open_connection(
+            '127.0.0.1',
+            listener.port,
+        )
+        writer.write(messages.Handshake(
+            info_hash=b'\x00' * 20,
+            peer_id=REMOTE_PEER_ID,
+        ).encode())
+
+        data = await reader.read()
+        writer.close()
+        await _stop(swarm, listener, task)
+
+        return data, swarm
+
+    data, swarm = asyncio.run(asyncio.wait_for(main(), timeout=10))
+
+    assert data == b''
+    assert swarm.active == {}
+
+
+def test_half_open_connections_are_limited():
+    async def main():
+        swarm, listener, task = await _start(max_half_open=1)
+        _, first = await asyncio.open_connection('127.0.0.1', listener.port)
+
+        while not listener.half_open:
+            await asyncio.sleep(0.01)
+
+        reader, second = await asyncio.open_connection(
+            '127.0.0.1',
+            listener.port,
+        )
+        data = await reader.read()
+
+        first.close()
+        second.close()
+        await _stop(swarm, listener, task)
+
+        return data, listener
+
+    data, listener = asyncio.run(asyncio.wait_for(main(), timeout=10))
+
+    assert data == b''
+    assert listener.refused_count == 1
+    assert listener.half_open == set()
+
+
+def test_second_connection_of_connected_peer_is_refused():
+    async def main():
+        swarm, listener, task = await _start()
+        handshake = messages.Handshake(
+            info_hash=swarm.torrent.info_hash,
+            peer_id=REMOTE_PEER_ID,
+        ).encode()
+
+        first_reader, first = await asyncio.open_connection(
+            '127.0.0.1',
+            listener.port,
+        )
+        first.write(handshake)
+        await first_reader.readexactly(68)
+
+        while not swarm.active:
+            await asyncio.sleep(0.01)
+
+        reader, second = await asyncio.open_connection(
+            '127.0.0.1',
+            listener.port,
+        )
+        second.write(handshake)
+        data = await reader.read()
+
+        active = len(swarm.active)
+        first.close()
+        second.close()
+        await _stop(swarm, listener, task)
+
+        return data, active
+
+    data, active = asyncio.run(asyncio.wait_for(main(), timeout=10))
+
+    assert data == b''
+    assert active == 1
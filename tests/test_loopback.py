@@ -0,0 +1,33 @@
+from benchmarks.loopback import (
+    CHOKING,
+    CORRUPT,
+    SeederConfig,
+    run_download,
+)
+
+
+def test_download_from_loopback_seeders(tmp_path):
+    result = run_download(
+        [
+            SeederConfig(),
+            SeederConfig(latency=0.01),
+            SeederConfig(bandwidth=2**20),
+            SeederConfig(behaviour=CHOKING, choke_every=8),
+            SeederConfig(behaviour=CORRUPT, corrupt_every=2),
+        ],
+        length=2**20 + 1000,
+        piece_length=2**16,
+        files_count=3,
+        directory=tmp_path,
+        timeout=30,
+    )
+
+    assert result.complete
+    assert result.time_to_first_byte is not None
+    assert result.mb_per_second > 0
+    assert sum(seeder.sent_blocks for seeder in result.seeders) >= 65
+    assert all(
+        seeder.chokes
+        for seeder in result.seeders
+        if seeder.config.behaviour == CHOKING and seeder.sent_blocks >= 8
+    )
@@ -0,0 +1,98 @@
+import socket
+import ipaddress
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.outbound import OutboundQueue
+from pico_torrent.protocol.peers.connection import (
+    P2PConnection,
+    decode_peer_message,
+)
+
+
+class CountingSocket:
+    """Socket which counts its send syscalls."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.sendmsg_calls = 0
+
+    def sendmsg(self, buffers):
+        self.sendmsg_calls += 1
+        return self.sock.sendmsg(buffers)
+
+    def recv_into(self, buffer):
+        return self.sock.recv_into(buffer)
+
+
+def _received_messages(sock: socket.socket, count: int):
+    framer = MessageFramer()
+    received = []
+
+    while len(received) < count:
+        framer.feed(sock.recv(2**16))
+        received.extend(
+            decode_peer_message(raw) for raw in framer.messages()
+        )
+
+    return received
+
+
+def test_small_messages_are_coalesced_and_blocks_are_not_copied():
+    queue = OutboundQueue()
+    block = bytearray(b'x' * 2**14)
+
+    queue.push(messages.Interested())
+    queue.push(messages.Have(7))
+    queue.push(messages.Piece(1, 0, memoryview(block)))
+    queue.push(messages.Request(2, 0))
+
+    coalesced, payload, tail = queue.buffers()
+
+    assert bytes(coalesced) == (
+        messages.Interested().encode()
+        + messages.Have(7).encode()
+        + messages.Piece(1, 0, block).encode_header()
+    )
+    assert payload.obj is block
+    assert bytes(tail) == messages.Request(2, 0).encode()
+    assert queue.buffered == 5 + 9 + 13 + 2**14 + 17
+
+
+def test_partial_send_keeps_order_and_watermarks():
+    queue = OutboundQueue(high_watermark=100, low_watermark=30)
+    queue.push(messages.Piece(0, 0, b'a' * 2000))
+    assert queue.paused
+
+    queue.advance(1000)
+    assert queue.paused
+    queue.push(messages.Have(1))
+
+    queue.advance(1000)
+    assert not queue.paused
+    assert b''.join(bytes(buffer) for buffer in queue.buffers()) == (
+        b'a' * 13 + messages.Have(1).encode()
+    )
+
+
+def test_burst_of_requests_is_one_syscall():
+    local, remote = socket.socketpair()
+    conn = P2PConnection(TorrentPeer(ipaddress.IPv4Address('127.0.0.1'), 1))
+    conn.conn = CountingSocket(local)
+    block = bytes(range(256)) * 64
+
+    for begin in range(64):
+        conn.send(messages.Request(0, begin * 2**14))
+    conn.send(messages.Piece(0, 0, block))
+    conn.flush()
+
+    received = _received_messages(remote, 65)
+    local.close()
+    remote.close()
+
+    assert conn.conn.sendmsg_calls == 1
+    assert [request.begin for request in received[:64]] == [
+        begin * 2**14 for begin in range(64)
+    ]
+    assert received[64].block == block
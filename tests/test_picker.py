@@ -0,0 +1,95 @@
+import random
+
+from pico_torrent.protocol.pieces.picker import PiecePicker
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+
+def _check_order(picker: PiecePicker):
+    """Wanted pieces must be ordered by availability."""
+    availability = [
+        picker.availability(piece_index)
+        for piece_index in picker._order
+    ]
+    assert availability == sorted(availability)
+
+
+def test_picker_keeps_order_on_random_updates():
+    rng = random.Random(0)
+    picker = PiecePicker(200, rng=rng)
+    counts = [0] * 200
+
+    for _ in range(5000):
+        piece_index = rng.randrange(200)
+        action = rng.random()
+
+        if action < 0.5:
+            picker.increment(piece_index)
+            counts[piece_index] += 1
+        elif action < 0.8 and counts[piece_index]:
+            picker.decrement(piece_index)
+            counts[piece_index] -= 1
+        elif action < 0.9:
+            picker.remove(piece_index)
+        else:
+            picker.add(piece_index)
+
+    _check_order(picker)
+    assert all(
+        picker.availability(piece_index) == count
+        for piece_index, count in enumerate(counts)
+    )
+
+
+def test_picker_picks_rarest_piece_of_peer():
+    picker = PiecePicker(4, rng=random.Random(0))
+    picker.add_peer_pieces([0, 1, 2, 3])
+    picker.add_peer_pieces([0, 1, 2])
+    picker.add_peer_pieces([0, 1])
+
+    assert picker.pick(lambda piece_index: True) == 3
+    assert picker.pick(lambda piece_index: piece_index < 3) == 2
+    assert picker.pick(lambda piece_index: True, skip={3, 2}) in {0, 1}
+
+    picker.remove(3)
+    assert picker.pick(lambda piece_index: True, skip={2}) in {0, 1}
+    assert picker.pick(lambda piece_index: False) is None
+
+
+def test_picker_prefers_partial_pieces():
+    picker = PiecePicker(3, rng=random.Random(0))
+    picker.add_peer_pieces([0, 1, 2])
+    picker.add_peer_pieces([0, 1])
+
+    assert picker.pick(lambda piece_index: True, partial=[0, 1]) in {0, 1}
+    assert picker.pick(lambda piece_index: True, partial=[]) == 2
+
+
+def test_picker_counts_seeds_separately():
+    picker = PiecePicker(2, rng=random.Random(0))
+
+    assert picker.pick(lambda piece_index: True) is None
+
+    picker.add_seed()
+    picker.increment(1)
+
+    assert picker.availability(0) == 1
+    assert picker.pick(lambda piece_index: True) == 0
+
+
+def test_remove_many_keeps_order():
+    rng = random.Random(1)
+    picker = PiecePicker(100, rng=rng)
+    for _ in range(500):
+        picker.increment(rng.randrange(100))
+
+    removed = Bitfield(100)
+    for piece_index in range(0, 100, 3):
+        removed[piece_index] = True
+    picker.remove_many(removed)
+
+    _check_order(picker)
+    assert [picker.is_wanted(i) for i in range(100)] == [
+        i % 3 != 0 for i in range(100)
+    ]
+    assert picker.pick(lambda i: i == 1) == 1
+    assert picker.pick(lambda i: i == 3) is None
@@ -0,0 +1,68 @@
+import hashlib
+
+from pico_torrent.protocol.pieces.piece import (
+    Piece,
+    PieceBlock,
+    PieceBufferPool,
+)
+
+DATA = bytes(range(256)) * 4
+
+
+def _make_piece(pool=None) -> Piece:
+    return Piece(
+        index=0,
+        piece_hash=hashlib.sha1(DATA).digest(),
+        blocks=[
+            PieceBlock(piece_index=0, offset=offset, length=256)
+            for offset in range(0, len(DATA), 256)
+        ],
+        pool=pool,
+    )
+
+
+def test_blocks_are_assembled_and_hashed_incrementally():
+    piece = _make_piece()
+
+    for offset in (256, 0, 768):
+        piece.add_block(offset, memoryview(DATA)[offset:offset + 256])
+
+    assert piece.received_length == 512
+    assert not piece.is_complete()
+
+    # Duplicate and malformed blocks are ignored
+    piece.add_block(0, b'x' * 256)
+    piece.add_block(512, b'x' * 10)
+    assert piece.received_blocks == 3
+
+    piece.add_block(512, DATA[512:768])
+
+    assert piece.is_complete()
+    assert piece.is_hashed()
+    assert piece.is_hash_matching()
+    assert piece.content == DATA
+
+
+def test_reset_piece_is_hashed_again():
+    piece = _make_piece()
+
+    for offset in range(0, len(DATA), 256):
+        piece.add_block(offset, b'x' * 256)
+    assert not piece.is_hash_matching()
+
+    piece.reset()
+    for offset in range(0, len(DATA), 256):
+        piece.add_block(offset, DATA[offset:offset + 256])
+    assert piece.is_hash_matching()
+
+
+def test_buffers_are_reused():
+    pool = PieceBufferPool(max_bytes=len(DATA))
+
+    for _ in range(3):
+        piece = _make_piece(pool)
+        piece.add_block(0, DATA[:256])
+        piece.release()
+
+    assert pool.allocated == 1
+    assert pool.reused == 2
@@ -0,0 +1,36 @@
+from pico_torrent.protocol.peers.pipeline import RequestPipeline
+from pico_torrent.protocol.pieces.piece import PieceBlock
+
+BLOCK_SIZE = 2**14
+
+
+def _block(index: int) -> PieceBlock:
+    return PieceBlock(piece_index=index, offset=0, length=BLOCK_SIZE)
+
+
+def test_pipeline_tracks_in_flight_requests():
+    pipeline = RequestPipeline(initial_depth=2)
+    request = pipeline.add(_block(0), now=0.0)
+    pipeline.add(_block(1), now=0.0)
+
+    assert (request.index, request.begin) == (0, 0)
+    assert pipeline.free_slots() == 0
+    assert pipeline.complete(0, 0, BLOCK_SIZE, now=0.1).piece_index == 0
+    assert pipeline.complete(5, 0, BLOCK_SIZE, now=0.1) is None
+    assert [block.piece_index for block in pipeline.drain()] == [1]
+    assert pipeline.in_flight == {}
+
+
+def test_pipeline_depth_follows_bandwidth_delay_product():
+    pipeline = RequestPipeline(initial_depth=2)
+    now = 0.0
+
+    # One block per 10 ms with 60 ms round trip time is 6 blocks in flight
+    for index in range(200):
+        pipeline.add(_block(index), now=now)
+        now += 0.01
+        if index >= 5:
+            pipeline.complete(index - 5, 0, BLOCK_SIZE, now=now)
+
+    assert abs(pipeline.min_rtt - 0.06) < 1e-9
+    assert pipeline.depth == 13
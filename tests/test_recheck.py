@@ -0,0 +1,93 @@
+import os
+import hashlib
+
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.pieces import recheck
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.piece_hashes import PieceHashes
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+PIECE_LENGTH = 2**14
+DATA = os.urandom(5 * PIECE_LENGTH + 1000)
+FILES = (
+    (b'a.bin', 2 * PIECE_LENGTH + 500),
+    (b'b.bin', 3 * PIECE_LENGTH + 500),
+)
+HASHES = PieceHashes(b''.join(
+    hashlib.sha1(DATA[offset:offset + PIECE_LENGTH]).digest()
+    for offset in range(0, len(DATA), PIECE_LENGTH)
+))
+
+
+def _torrent() -> TorrentFile:
+    info = {
+        b'files': [
+            {b'length': length, b'path': [name]} for name, length in FILES
+        ],
+        b'name': b'test',
+        b'piece length': PIECE_LENGTH,
+        b'pieces': bytes(HASHES.view),
+    }
+    return TorrentFile.from_torrent_file(BencodeEncoder().encode({
+        b'announce': b'http://tracker/announce',
+        b'info': info,
+    }))
+
+
+def _write_files(tmp_path) -> TorrentStorage:
+    storage = TorrentStorage(_torrent(), tmp_path)
+    offset = 0
+    for path, (_, length) in zip(storage.paths, FILES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(DATA[offset:offset + length])
+        offset += length
+
+    return storage
+
+
+def test_recheck_complete_data(tmp_path):
+    storage = _write_files(tmp_path)
+    reports = []
+
+    result = recheck.recheck(
+        storage,
+        HASHES,
+        workers=3,
+        progress=reports.append,
+    )
+
+    assert result.have.is_full()
+    assert result.files_completion == [1.0, 1.0]
+    assert reports[-1].checked_pieces == storage.pieces_count
+    assert reports[-1].checked_bytes == len(DATA)
+    assert reports[-1].have_count == storage.pieces_count
+
+
+def test_recheck_damaged_and_missing_files(tmp_path):
+    storage = _write_files(tmp_path)
+    storage.paths[1].unlink()
+    with storage.paths[0].open('r+b') as f:
+        f.write(b'\x00' * 10)
+
+    result = recheck.recheck(storage, HASHES, workers=2)
+
+    # Piece 1 lies in the first file only, piece 2 spans both files
+    assert list(result.have.indices()) == [1]
+    assert result.files_completion == [
+        PIECE_LENGTH / FILES[0][1],
+        0.0,
+    ]
+
+
+def test_check_pieces_keeps_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(recheck, 'BATCH_SIZE', PIECE_LENGTH)
+    storage = _write_files(tmp_path)
+
+    checks = list(recheck.check_pieces(
+        storage,
+        HASHES,
+        [0, 2, 3, 5],
+        workers=4,
+    ))
+
+    assert checks == [(0, True), (2, True), (3, True), (5, True)]
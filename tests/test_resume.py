@@ -0,0 +1,111 @@
+import os
+import hashlib
+
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.resume import (
+    ResumeData,
+    collect_resume_data,
+    load_resume_data,
+    restore_download,
+    save_resume_data,
+)
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+PIECE_LENGTH = 2 * messages.REQUEST_SIZE
+DATA = os.urandom(70000)
+
+
+def _torrent() -> TorrentFile:
+    info = {
+        b'files': [
+            {b'length': 40000, b'path': [b'a.bin']},
+            {b'length': 30000, b'path': [b'b.bin']},
+        ],
+        b'name': b'test',
+        b'piece length': PIECE_LENGTH,
+        b'pieces': b''.join(
+            hashlib.sha1(DATA[offset:offset + PIECE_LENGTH]).digest()
+            for offset in range(0, len(DATA), PIECE_LENGTH)
+        ),
+    }
+    encoded = BencodeEncoder().encode({
+        b'announce': b'http://tracker/announce',
+        b'info': info,
+    })
+    return TorrentFile.from_torrent_file(encoded)
+
+
+def _add_block(manager, piece_index, offset):
+    begin = piece_index * PIECE_LENGTH + offset
+    manager.add_piece(messages.Piece(
+        piece_index,
+        offset,
+        DATA[begin:begin + messages.REQUEST_SIZE],
+    ))
+
+
+def _download_and_save(tmp_path) -> TorrentFile:
+    torrent = _torrent()
+    storage = TorrentStorage(torrent, tmp_path)
+    manager = PiecesManager(torrent, storage=storage)
+
+    with storage:
+        for piece_index in (0, 1):
+            manager.pieces[piece_index] = manager._create_piece(piece_index)
+        _add_block(manager, 0, 0)
+        _add_block(manager, 0, messages.REQUEST_SIZE)
+        _add_block(manager, 1, 0)
+
+        save_resume_data(tmp_path / 'resume', collect_resume_data(manager))
+
+    return torrent
+
+
+def _restore(tmp_path, torrent):
+    storage = TorrentStorage(torrent, tmp_path)
+    manager = PiecesManager(torrent, storage=storage)
+
+    with storage:
+        changed = restore_download(
+            manager,
+            load_resume_data(tmp_path / 'resume', torrent),
+        )
+
+    return manager, changed
+
+
+def test_resume_data_roundtrip(tmp_path):
+    torrent = _download_and_save(tmp_path)
+    raw = (tmp_path / 'resume').read_bytes()
+
+    data = ResumeData.decode(raw, 3)
+
+    assert data.info_hash == torrent.info_hash
+    assert list(data.have.indices()) == [0]
+    assert list(data.unfinished[1].indices()) == [0]
+    assert ResumeData.decode(data.encode(), 3) == data
+
+
+def test_unchanged_files_are_trusted(tmp_path):
+    torrent = _download_and_save(tmp_path)
+
+    manager, changed = _restore(tmp_path, torrent)
+
+    assert changed == set()
+    assert manager.have_count == 1
+    assert manager.pieces[1].received_blocks == 1
+    assert manager.pieces[1].missing_blocks == 1
+
+
+def test_changed_files_are_rechecked(tmp_path):
+    torrent = _download_and_save(tmp_path)
+    os.utime(tmp_path / 'test' / 'b.bin', ns=(0, 0))
+
+    manager, changed = _restore(tmp_path, torrent)
+
+    assert changed == {1}
+    assert list(manager.have.indices()) == [0]
+    assert 1 not in manager.pieces
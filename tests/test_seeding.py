@@ -0,0 +1,125 @@
+import io
+import struct
+import asyncio
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.uploads import UploadQueue
+from pico_torrent.protocol.peers.async_connection import (
+    AsyncTorrentPeerConnection,
+)
+from pico_torrent.protocol.peers.raw_message import PeerMessageId
+from pico_torrent.protocol.pieces.cache import PieceCache
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+from tests.test_async_connection import PEER_ID, _serve_peer
+from tests.test_verifier import DATA, VERIFIED_TORRENT
+
+
+def _seeding_manager(tmp_path, **kwargs) -> PiecesManager:
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+    storage = TorrentStorage(torrent, tmp_path)
+    storage.create_files()
+    storage.write(0, 0, DATA[:20])
+    storage.write(1, 0, DATA[20:])
+
+    manager = PiecesManager(torrent, storage=storage, **kwargs)
+    manager.restore_have(Bitfield.full(2))
+
+    return manager
+
+
+def test_cache_serves_blocks_from_memory(tmp_path):
+    manager = _seeding_manager(tmp_path)
+    cache = PieceCache(manager.storage, max_bytes=20)
+
+    assert bytes(cache.read_block(0, 0, 10)) == DATA[:10]
+    assert bytes(cache.read_block(0, 10, 10)) == DATA[10:20]
+    assert bytes(cache.read_block(1, 5, 10)) == DATA[25:35]
+    assert bytes(cache.read_block(0, 0, 5)) == DATA[:5]
+
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 2)
+    assert cache.hit_ratio() == 0.25
+    assert cache.cached_bytes == 20
+
+
+def test_manager_rejects_invalid_requests(tmp_path):
+    manager = _seeding_manager(tmp_path)
+    manager.have[1] = False
+
+    assert manager.read_block(messages.Request(0, 10, 10)) == DATA[10:20]
+    assert manager.read_block(messages.Request(1, 0, 10)) is None
+    assert manager.read_block(messages.Request(0, 15, 10)) is None
+    assert manager.read_block(messages.Request(2, 0, 10)) is None
+    # Bytes are counted by connection when block is sent
+    assert manager.uploaded_bytes == 0
+
+
+def test_upload_queue_honours_cancel():
+    uploads = UploadQueue(max_length=2)
+
+    assert uploads.add(messages.Request(0, 0, 10))
+    assert uploads.add(messages.Request(0, 0, 10))
+    assert uploads.add(messages.Request(0, 10, 10))
+    assert not uploads.add(messages.Request(1, 0, 10))
+    assert uploads.cancel(0, 0, 10)
+    assert not uploads.cancel(0, 0, 10)
+
+    request = uploads.pop()
+    assert (request.index, request.begin) == (0, 10)
+    assert uploads.pop() is None
+
+
+async def _read_message(reader):
+    length, = struct.unpack('>I', await reader.readexactly(4))
+    payload = await reader.readexactly(length)
+    return PeerMessageId(payload[0]), payload[1:]
+
+
+def test_connection_uploads_requested_blocks(tmp_path):
+    received = []
+
+    async def remote_peer(reader, writer):
+        writer.write(await reader.readexactly(68))
+
+        # Seeder is not interested, it sends only bit field of its pieces
+        received.append(await _read_message(reader))
+
+        writer.write(messages.Interested().encode())
+        received.append(await _read_message(reader))
+
+        writer.write(messages.Request(1, 10, 10).encode())
+        writer.write(messages.Request(5, 0, 10).encode())
+        writer.write(messages.Request(0, 0, 20).encode())
+        received.append(await _read_message(reader))
+        received.append(await _read_message(reader))
+
+        writer.close()
+
+    async def main():
+        server, peer = await _serve_peer(remote_peer)
+        manager = _seeding_manager(tmp_path)
+        conn = AsyncTorrentPeerConnection(
+            remote_peer=peer,
+            torrent=manager.torrent,
+            peer_id=PEER_ID,
+            pieces_manager=manager,
+        )
+
+        await asyncio.wait_for(conn.communicate(), timeout=5)
+        server.close()
+        await server.wait_closed()
+
+        return manager
+
+    manager = asyncio.run(main())
+
+    assert received == [
+        (PeerMessageId.BitField, b'\xc0'),
+        (PeerMessageId.Unchoke, b''),
+        (PeerMessageId.Piece, struct.pack('>II', 1, 10) + DATA[30:]),
+        (PeerMessageId.Piece, struct.pack('>II', 0, 0) + DATA[:20]),
+    ]
+    assert manager.uploaded_bytes == 30
@@ -0,0 +1,162 @@
+import os
+import socket
+import ipaddress
+
+import pytest
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.framer import MessageFramer
+from pico_torrent.protocol.peers.connection import (
+    BaseTorrentPeerConnection,
+    P2PConnection,
+    decode_peer_message,
+)
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.storage import TorrentStorage
+from pico_torrent.protocol.utils.bitfield import Bitfield
+
+from tests.test_storage import DATA, _torrent
+from tests.test_async_connection import PEER_ID
+
+
+def _storage(tmp_path, **kwargs) -> TorrentStorage:
+    storage = TorrentStorage(_torrent(), tmp_path, **kwargs)
+    storage.create_files()
+    for piece_index in range(3):
+        offset = piece_index * 16
+        storage.write_piece(
+            piece_index,
+            DATA[offset:offset + storage.piece_size(piece_index)],
+        )
+
+    return storage
+
+
+def _read_from_fd(file_range) -> bytes:
+    return os.pread(file_range.fd, file_range.length, file_range.offset)
+
+
+class PartialFileSender:
+    """Connection which sends only first bytes of block from files."""
+
+    def __init__(self, sent_from_files: int):
+        self.sent_from_files = sent_from_files
+        self.data = b''
+
+    def send(self, message):
+        self.data += message.encode()
+
+    def send_buffer(self, data):
+        self.data += bytes(data)
+
+    def send_file_block(self, header, ranges) -> int:
+        self.data += header
+        for file_range in ranges:
+            self.data += _read_from_fd(file_range)[:self.sent_from_files]
+            return self.sent_from_files
+
+
+def test_block_across_files_is_split_into_ranges(tmp_path):
+    storage = _storage(tmp_path, max_open_files=1)
+
+    ranges = storage.file_ranges(1, 2, 10)
+    # Every descriptor is used before the next file is opened
+    data = [
+        (_read_from_fd(file_range), file_range.length)
+        for file_range in ranges
+    ]
+    storage.close()
+
+    assert data == [(DATA[18:25], 7), (DATA[25:28], 3)]
+
+
+def test_blocking_connection_sends_block_from_files(tmp_path):
+    storage = _storage(tmp_path)
+    local, remote = socket.socketpair()
+    conn = P2PConnection(TorrentPeer(ipaddress.IPv4Address('127.0.0.1'), 1))
+    conn.conn.close()
+    conn.conn = local
+
+    conn.send(messages.Have(1))
+    sent = conn.send_file_block(
+        messages.Piece.header(1, 2, 10),
+        storage.file_ranges(1, 2, 10),
+    )
+    local.close()
+
+    framer = MessageFramer()
+    framer.feed(remote.recv(2**16))
+    have, piece = [decode_peer_message(raw) for raw in framer.messages()]
+    remote.close()
+    storage.close()
+
+    assert sent == 10
+    assert have.piece_index == 1
+    assert (piece.index, piece.begin, bytes(piece.block)) == (
+        1, 2, DATA[18:28],
+    )
+
+
+def test_rest_of_block_is_read_when_sendfile_stops(tmp_path):
+    storage = _storage(tmp_path)
+    manager = PiecesManager(_torrent(), storage=storage)
+    manager.restore_have(Bitfield.full(3))
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    conn = BaseTorrentPeerConnection(peer, _torrent(), PEER_ID, manager)
+    conn.sends_files = True
+    conn.connection = PartialFileSender(sent_from_files=4)
+
+    assert conn._serve_request(messages.Request(1, 2, 10))
+    assert not conn._serve_request(messages.Request(2, 0, 10))
+    storage.close()
+
+    assert conn.connection.data == messages.Piece(1, 2, DATA[18:28]).encode()
+    assert conn.uploaded_bytes == manager.uploaded_bytes == 10
+
+
+class FailingFileSender(PartialFileSender):
+    """Connection which fails to send blocks from files."""
+
+    def send_file_block(self, header, ranges) -> int:
+        raise OSError('connection reset')
+
+
+def _seeding_connection(storage, sender) -> BaseTorrentPeerConnection:
+    manager = PiecesManager(_torrent(), storage=storage)
+    manager.restore_have(Bitfield.full(3))
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    conn = BaseTorrentPeerConnection(peer, _torrent(), PEER_ID, manager)
+    conn.sends_files = True
+    conn.connection = sender
+
+    return conn
+
+
+def test_cached_block_is_sent_from_memory(tmp_path):
+    storage = _storage(tmp_path)
+    conn = _seeding_connection(storage, PartialFileSender(sent_from_files=0))
+    cache = conn.pieces_manager.cache
+    cache.put(1, DATA[16:32])
+
+    assert conn._serve_request(messages.Request(1, 2, 10))
+    assert conn._serve_request(messages.Request(2, 0, 4))
+    storage.close()
+
+    assert conn.connection.data == (
+        messages.Piece(1, 2, DATA[18:28]).encode()
+        + messages.Piece(2, 0, DATA[32:36]).encode()
+    )
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert conn.pieces_manager.uploaded_bytes == 14
+
+
+def test_block_which_is_not_sent_is_not_counted(tmp_path):
+    storage = _storage(tmp_path)
+    conn = _seeding_connection(storage, FailingFileSender(sent_from_files=0))
+
+    with pytest.raises(OSError):
+        conn._serve_request(messages.Request(1, 2, 10))
+    storage.close()
+
+    assert conn.uploaded_bytes == conn.pieces_manager.uploaded_bytes == 0
@@ -0,0 +1,107 @@
+import io
+import math
+import ipaddress
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.stats import TorrentStats, format_status
+from pico_torrent.protocol.peers.connection import BaseTorrentPeerConnection
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.trackers.tracker import TorrentTracker
+from pico_torrent.protocol.utils.stats import Histogram, RateMeter
+
+from tests.test_choker import Sender
+from tests.test_async_connection import PEER_ID
+from tests.test_verifier import DATA, VERIFIED_TORRENT
+
+
+def test_rate_meter_follows_steady_rate_and_decays():
+    meter = RateMeter(time_constant=5.0)
+
+    for tick in range(1, 1001):
+        meter.add(1000, now=tick * 0.1)
+
+    assert meter.total == 10**6
+    assert math.isclose(meter.rate(now=100.0), 10_000, rel_tol=0.02)
+    assert math.isclose(
+        meter.rate(now=105.0),
+        meter.rate(now=100.0) / math.e,
+    )
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    histogram = Histogram(bounds=[0.01, 0.1, 1.0])
+
+    assert histogram.percentile(0.5) is None
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.add(value)
+
+    assert histogram.buckets == [1, 2, 1, 1]
+    assert histogram.percentile(0.5) == 0.1
+    assert histogram.percentile(0.8) == 1.0
+    assert histogram.percentile(1.0) == math.inf
+    assert math.isclose(histogram.mean(), 5.605 / 5)
+
+
+def test_snapshot_reports_peer_transfers():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+    manager = PiecesManager(torrent)
+    stats = TorrentStats(manager)
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    conn = BaseTorrentPeerConnection(
+        peer, torrent, PEER_ID, manager, torrent_stats=stats,
+    )
+    conn.connection = Sender()
+    conn._handshaked()
+
+    conn._handle_message(messages.BitField(b'\xc0'))
+    conn._handle_message(messages.Unchoke())
+    requested = len(conn.pipeline.in_flight)
+    conn._handle_message(messages.Piece(0, 0, DATA[:20]))
+
+    snapshot = stats.snapshot()
+    peer_snapshot, = snapshot.peers
+
+    assert snapshot.have_count == 1
+    assert snapshot.left == len(DATA) - 20
+    assert snapshot.downloaded == peer_snapshot.downloaded == 20
+    assert snapshot.download_rate == peer_snapshot.download_rate > 0
+    assert peer_snapshot.in_flight == requested - 1
+    assert peer_snapshot.latency_p50 is not None
+    assert not peer_snapshot.choked and peer_snapshot.choking
+    assert '50.0% done' in format_status(snapshot)
+
+    stats.remove_connection(conn)
+    assert stats.snapshot().peers == []
+
+
+def test_hash_failures_are_counted():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+    manager = PiecesManager(torrent)
+    peer = TorrentPeer(ip=ipaddress.IPv4Address('10.0.0.1'), port=6881)
+    manager.update_peer_with_bitfield(peer, messages.BitField(b'\xc0'))
+
+    block = manager.next_request(peer)
+    manager.add_piece(messages.Piece(block.piece_index, 0, bytes(20)), peer)
+
+    assert manager.hash_failures == 1
+    assert manager.left_bytes() == len(DATA)
+
+
+def test_trackers_announce_transfer_stats():
+    tracker = TorrentTracker(
+        torrent_announce_url='http://tracker/announce',
+        torrent_info_hash=b'\x00' * 20,
+        full_torrent_bytes=100,
+        this_peer_listen_port=6881,
+        this_peer_id=PEER_ID,
+    )
+    trackers = TrackersManager([[tracker]])
+
+    trackers.update_transfer(uploaded=10, downloaded=30, left=70)
+    url = tracker._get_url_for_fetch_available_peers()
+    trackers.close()
+
+    assert 'uploaded=10&downloaded=30&left=70' in url
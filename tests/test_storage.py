@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+from pico_torrent.protocol.metainfo.files_to_pieces import map_files_to_pieces
+from pico_torrent.protocol.pieces.storage import StorageError, TorrentStorage
+
+# Files of 5, 20 and 15 bytes with pieces of 16 bytes
+MULTI_FILE_TORRENT = (
+    b'd8:announce23:http://tracker/announce4:infod'
+    b'5:filesl'
+    b'd6:lengthi5e4:pathl1:a5:x.binee'
+    b'd6:lengthi20e4:pathl1:b5:y.binee'
+    b'd6:lengthi15e4:pathl5:z.binee'
+    b'e4:name4:test12:piece lengthi16e'
+    b'6:pieces60:' + b'h' * 60 + b'ee'
+)
+DATA = bytes(range(40))
+
+
+def _torrent() -> TorrentFile:
+    return TorrentFile.from_torrent_file(io.BytesIO(MULTI_FILE_TORRENT))
+
+
+def test_files_are_mapped_to_piece_slices():
+    torrent = _torrent()
+    files = map_files_to_pieces(torrent.info.files, 3, 16)
+
+    assert [
+        [(s.piece_index, s.offset, s.length) for s in file.pieces]
+        for file in files
+    ] == [
+        [(0, 0, 5)],
+        [(0, 5, 11), (1, 0, 9)],
+        [(1, 9, 7), (2, 0, 8)],
+    ]
+
+
+def test_pieces_are_written_across_files(tmp_path):
+    torrent = _torrent()
+
+    with TorrentStorage(torrent, tmp_path) as storage:
+        assert storage.piece_size(2) == 8
+
+        for piece_index in (2, 0, 1):
+            offset = piece_index * 16
+            storage.write_piece(
+                piece_index,
+                DATA[offset:offset + storage.piece_size(piece_index)],
+            )
+
+        assert storage.read(1) == DATA[16:32]
+        assert storage.read(0, 3, 10) == DATA[3:13]
+
+    root = tmp_path / 'test'
+    assert (root / 'a' / 'x.bin').read_bytes() == DATA[:5]
+    assert (root / 'b' / 'y.bin').read_bytes() == DATA[5:25]
+    assert (root / 'z.bin').read_bytes() == DATA[25:]
+
+
+@pytest.mark.parametrize('name', [b'../../escap', b'/tmp/escap', b'..', b'.'])
+def test_unsafe_torrent_name_is_rejected(tmp_path, name):
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(
+        MULTI_FILE_TORRENT.replace(
+            b'4:name4:test',
+            b'4:name%d:%s' % (len(name), name),
+        ),
+    ))
+
+    with pytest.raises(StorageError):
+        TorrentStorage(torrent, tmp_path / 'download')
@@ -0,0 +1,79 @@
+import io
+import socket
+import asyncio
+import ipaddress
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.peers.swarm import Swarm
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+from tests.test_torrent import TORRENT
+from tests.test_async_connection import PEER_ID
+
+LOCALHOST = ipaddress.IPv4Address('127.0.0.1')
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _handler(reader, writer):
+    writer.write(await reader.readexactly(68))
+    writer.write(messages.BitField(b'\xc0').encode())
+    await writer.drain()
+    await reader.read()
+    writer.close()
+
+
+def test_swarm_replaces_failed_peers():
+    async def main():
+        servers = [
+            await asyncio.start_server(_handler, '127.0.0.1', 0)
+            for _ in range(2)
+        ]
+        alive = [
+            TorrentPeer(ip=LOCALHOST, port=s.sockets[0].getsockname()[1])
+            for s in servers
+        ]
+        dead = TorrentPeer(ip=LOCALHOST, port=_closed_port())
+        fetches = []
+
+        async def peers_source():
+            fetches.append(1)
+            return [dead, *alive]
+
+        torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+        manager = PiecesManager(torrent)
+        swarm = Swarm(
+            torrent=torrent,
+            peer_id=PEER_ID,
+            pieces_manager=manager,
+            peers_source=peers_source,
+            max_peers=2,
+        )
+        task = asyncio.create_task(swarm.run())
+
+        while len(manager.peers) < 2:
+            await asyncio.sleep(0.01)
+
+        connected = set(manager.peers)
+        swarm.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+        return connected, fetches, manager
+
+    connected, fetches, manager = asyncio.run(
+        asyncio.wait_for(main(), timeout=10),
+    )
+
+    assert len(connected) == 2
+    assert len(fetches) == 1
+    assert manager.peers == {}
@@ -0,0 +1,34 @@
+import io
+import hashlib
+
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+# Keys of info dictionary are not sorted, re-encoding would reorder them
+INFO = (
+    b'd4:name4:test6:lengthi40e12:piece lengthi20e'
+    b'6:pieces40:' + b'a' * 20 + b'b' * 20 + b'e'
+)
+TORRENT = (
+    b'd8:announce23:http://tracker/announce'
+    b'4:info' + INFO + b'e'
+)
+
+
+def test_info_hash_is_taken_over_original_bytes():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+
+    assert torrent.info_hash == hashlib.sha1(INFO).digest()
+    assert torrent.announce == 'http://tracker/announce'
+    assert torrent.info.name == 'test'
+
+
+def test_piece_hashes_table():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(TORRENT))
+    pieces = torrent.info.pieces
+
+    assert len(pieces) == 2
+    assert pieces.hash_for(0) == b'a' * 20
+    assert pieces[-1] == b'b' * 20
+    assert pieces[0:2] == [b'a' * 20, b'b' * 20]
+    assert pieces == [b'a' * 20, b'b' * 20]
+    assert list(pieces) == pieces.as_list()
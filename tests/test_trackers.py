@@ -0,0 +1,143 @@
+import io
+import time
+import socket
+import asyncio
+import threading
+import http.server
+
+from pico_torrent.protocol.bencode import BencodeEncoder
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+from tests.test_torrent import INFO
+
+
+def _compact(*ports) -> bytes:
+    return b''.join(
+        socket.inet_aton('10.0.0.1') + port.to_bytes(2, 'big')
+        for port in ports
+    )
+
+
+class _TrackerHandler(http.server.BaseHTTPRequestHandler):
+    # Path of announce url mapped to delay and peer ports
+    responses: dict = {}
+    # Path of announce url mapped to raw peers replacing compact ones
+    raw_peers: dict = {}
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        delay, ports = self.responses[path]
+        time.sleep(delay)
+        body = BencodeEncoder().encode({
+            b'interval': 60,
+            b'peers': self.raw_peers.get(path, _compact(*ports)),
+        }).getvalue()
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_tracker(responses, raw_peers=None):
+    _TrackerHandler.responses = responses
+    _TrackerHandler.raw_peers = raw_peers or {}
+    server = http.server.ThreadingHTTPServer(
+        ('127.0.0.1', 0),
+        _TrackerHandler,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def _closed_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{sock.getsockname()[1]}/announce'
+
+
+def _torrent(announce_list) -> TorrentFile:
+    tiers = b''.join(
+        b'l' + b''.join(b'%d:%s' % (len(url), url) for url in tier) + b'e'
+        for tier in announce_list
+    )
+    return TorrentFile.from_torrent_file(io.BytesIO(
+        b'd8:announce23:http://tracker/announce'
+        b'13:announce-listl' + tiers + b'e'
+        b'4:info' + INFO + b'e',
+    ))
+
+
+def test_announce_list_keeps_tiers():
+    torrent = _torrent([[b'http://a', b'http://b'], [b'http://c']])
+
+    assert torrent.announce_list == [['http://a', 'http://b'], ['http://c']]
+
+
+def test_tiers_fall_back_and_peers_are_merged():
+    server, url = _start_tracker({'/a': (0, [1, 2]), '/b': (0, [2, 3])})
+    dead = _closed_url()
+
+    torrent = _torrent([
+        [dead.encode(), f'{url}/a'.encode()],
+        [f'{url}/b'.encode()],
+    ])
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+
+    try:
+        peers = trackers.get_remote_peers()
+        # Tiers are not due until interval of tracker passes
+        repeated = trackers.get_remote_peers()
+    finally:
+        trackers.close()
+        server.shutdown()
+
+    assert sorted(peer.port for peer in peers) == [1, 2, 3]
+    assert repeated == []
+    assert trackers.tiers[0].trackers[0].announce_url == f'{url}/a'
+
+
+def test_slow_tier_does_not_delay_peers_of_other_tiers():
+    server, url = _start_tracker({'/fast': (0, [1]), '/slow': (0.5, [2])})
+    torrent = _torrent([[f'{url}/slow'.encode()], [f'{url}/fast'.encode()]])
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+    arrivals = []
+
+    async def main():
+        started = time.monotonic()
+
+        def on_peers(peers):
+            arrivals.append((peers[0].port, time.monotonic() - started))
+
+        return await trackers.announce(on_peers)
+
+    try:
+        peers = asyncio.run(main())
+    finally:
+        trackers.close()
+        server.shutdown()
+
+    assert sorted(peer.port for peer in peers) == [1, 2]
+    assert [port for port, _ in arrivals] == [1, 2]
+    assert arrivals[0][1] < 0.4
+
+
+def test_malformed_tier_does_not_lose_peers_of_other_tiers():
+    server, url = _start_tracker(
+        {'/bad': (0, []), '/good': (0, [1])},
+        raw_peers={'/bad': [{b'ip': b'10.0.0.1', b'port': 2}] * 6},
+    )
+    torrent = _torrent([[f'{url}/bad'.encode()], [f'{url}/good'.encode()]])
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+
+    try:
+        peers = asyncio.run(trackers.announce())
+    finally:
+        trackers.close()
+        server.shutdown()
+
+    assert [peer.port for peer in peers] == [1]
@@ -0,0 +1,200 @@
+import socket
+import struct
+import threading
+
+import pytest
+
+from pico_torrent.protocol.trackers import manager, udp_tracker
+from pico_torrent.protocol.trackers.tracker import BadTrackerResponse
+from pico_torrent.protocol.trackers.manager import TrackersManager
+from pico_torrent.protocol.trackers.udp_tracker import UdpTorrentTracker
+
+from tests.test_trackers import _compact, _torrent
+
+INFO_HASH = b'i' * 20
+CONNECTION_ID = 0x1122334455667788
+
+
+class _StandInTracker:
+    """UDP tracker answering from thread, first announces might be lost."""
+
+    def __init__(self, drop_announces=0, error=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.url = f'udp://127.0.0.1:{self.sock.getsockname()[1]}'
+        self.drop_announces = drop_announces
+        self.error = error
+        self.requests = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except OSError:
+                return
+
+            connection_id, action, transaction_id = struct.unpack_from(
+                '>QII',
+                data,
+            )
+            self.requests.append(action)
+
+            if self.error is not None:
+                response = struct.pack('>II', 3, transaction_id) + self.error
+            elif action == udp_tracker.ACTION_CONNECT:
+                assert connection_id == udp_tracker.PROTOCOL_ID
+                response = struct.pack(
+                    '>IIQ',
+                    0,
+                    transaction_id,
+                    CONNECTION_ID,
+                )
+            elif action == udp_tracker.ACTION_ANNOUNCE:
+                assert connection_id == CONNECTION_ID
+                if self.drop_announces:
+                    self.drop_announces -= 1
+                    continue
+                info_hash, _, _, _, _, event = struct.unpack_from(
+                    '>20s20sQQQI',
+                    data,
+                    16,
+                )
+                assert info_hash == INFO_HASH
+                response = struct.pack(
+                    '>IIIII',
+                    1,
+                    transaction_id,
+                    900,
+                    3,
+                    event,
+                ) + _compact(1, 2)
+            else:
+                response = struct.pack(
+                    '>IIIII',
+                    2,
+                    transaction_id,
+                    5,
+                    10,
+                    2,
+                )
+
+            self.sock.sendto(response, address)
+
+    def close(self):
+        self.sock.close()
+
+
+def _tracker(url, **kwargs) -> UdpTorrentTracker:
+    return UdpTorrentTracker(
+        torrent_announce_url=url,
+        torrent_info_hash=INFO_HASH,
+        full_torrent_bytes=100,
+        this_peer_listen_port=6889,
+        this_peer_id='x' * 20,
+        **kwargs,
+    )
+
+
+def test_announce_reuses_connection_id():
+    server = _StandInTracker()
+    tracker = _tracker(server.url)
+
+    try:
+        first = tracker.get_available_peers()
+        # Stand-in reports event of announce as count of seeders
+        first_event = tracker.seeders
+        tracker.get_available_peers()
+        scrape = tracker.scrape()
+    finally:
+        tracker.close()
+        server.close()
+
+    assert [peer.port for peer in first] == [1, 2]
+    assert first_event == udp_tracker.EVENT_STARTED
+    assert tracker.seeders == udp_tracker.EVENT_NONE
+    assert tracker.interval == 900
+    assert server.requests == [0, 1, 1, 2]
+    assert scrape == udp_tracker.ScrapeResult(5, 10, 2)
+
+
+def test_lost_requests_are_retransmitted():
+    server = _StandInTracker(drop_announces=2)
+    tracker = _tracker(server.url, timeout=0.05)
+
+    try:
+        peers = tracker.get_available_peers()
+    finally:
+        tracker.close()
+        server.close()
+
+    assert len(peers) == 2
+    assert server.requests == [0, 1, 1, 1]
+
+
+def test_tracker_error_and_silence():
+    server = _StandInTracker(error=b'unregistered torrent')
+    tracker = _tracker(server.url)
+
+    with pytest.raises(BadTrackerResponse, match='unregistered torrent'):
+        tracker.get_available_peers()
+
+    server.close()
+    tracker.close()
+
+    silent = _StandInTracker(drop_announces=10)
+    tracker = _tracker(silent.url, timeout=0.01, max_retransmits=2)
+
+    with pytest.raises(BadTrackerResponse):
+        tracker.get_available_peers()
+
+    silent.close()
+    tracker.close()
+    assert silent.requests == [0, 1, 1, 1]
+
+
+def test_tracker_is_chosen_by_url_scheme():
+    torrent = _torrent([[b'udp://127.0.0.1:1', b'http://127.0.0.1:1']])
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+    trackers.close()
+
+    assert sorted(
+        type(tracker).__name__ for tracker in trackers.tiers[0].trackers
+    ) == ['TorrentTracker', 'UdpTorrentTracker']
+
+
+def test_close_stops_request_waiting_in_other_thread():
+    silent = _StandInTracker(drop_announces=10)
+    tracker = _tracker(silent.url, timeout=60)
+    errors = []
+
+    def announce():
+        try:
+            tracker.get_available_peers()
+        except BadTrackerResponse as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=announce)
+    thread.start()
+
+    while udp_tracker.ACTION_ANNOUNCE not in silent.requests:
+        thread.join(0.01)
+
+    tracker.close()
+    thread.join(udp_tracker.CLOSE_POLL_INTERVAL * 4)
+    silent.close()
+
+    assert not thread.is_alive()
+    assert 'closed' in str(errors[0])
+    assert tracker._socket is None
+
+
+def test_manager_caps_retransmits_of_udp_trackers():
+    torrent = _torrent([[b'udp://127.0.0.1:1']])
+    trackers = TrackersManager.from_torrent(torrent, 'x' * 20, 6889)
+    trackers.close()
+
+    assert trackers.tiers[0].trackers[0].max_retransmits == (
+        manager.UDP_MAX_RETRANSMITS
+    )
@@ -0,0 +1,131 @@
+import io
+import errno
+import asyncio
+import hashlib
+import ipaddress
+import threading
+
+from pico_torrent.protocol.peers import messages
+from pico_torrent.protocol.peers.peer import TorrentPeer
+from pico_torrent.protocol.pieces.manager import PiecesManager
+from pico_torrent.protocol.pieces.verifier import PieceVerifier
+from pico_torrent.protocol.metainfo.torrent import TorrentFile
+
+DATA = b'x' * 20 + b'y' * 20
+VERIFIED_TORRENT = (
+    b'd8:announce23:http://tracker/announce4:info'
+    b'd4:name4:test6:lengthi40e12:piece lengthi20e6:pieces40:'
+    + hashlib.sha1(DATA[:20]).digest()
+    + hashlib.sha1(DATA[20:]).digest()
+    + b'ee'
+)
+PEER = TorrentPeer(ip=ipaddress.IPv4Address('127.0.0.1'), port=6881)
+
+
+def test_results_are_delivered_to_event_loop_thread():
+    results = []
+
+    def on_verified(piece_index, data, matching):
+        results.append((piece_index, matching, threading.get_ident()))
+
+    async def main():
+        with PieceVerifier(workers=2) as verifier:
+            verifier.submit(
+                0,
+                DATA[:20],
+                hashlib.sha1(DATA[:20]).digest(),
+                on_verified,
+            )
+            verifier.submit(1, DATA[20:], b'\x00' * 20, on_verified)
+            assert verifier.queue_depth == 2
+
+            while verifier.queue_depth:
+                await asyncio.sleep(0.01)
+
+            return verifier
+
+    verifier = asyncio.run(main())
+
+    loop_thread = threading.get_ident()
+    assert sorted(results) == [(0, True, loop_thread), (1, False, loop_thread)]
+    assert verifier.verified_count == 1
+    assert verifier.failed_count == 1
+    assert verifier.hashed_bytes == 40
+
+
+def test_manager_waits_for_verification():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+
+    async def main():
+        with PieceVerifier(workers=1) as verifier:
+            manager = PiecesManager(torrent, verifier=verifier)
+            manager.update_peer_with_bitfield(
+                PEER,
+                messages.BitField(b'\xc0'),
+            )
+
+            block = manager.next_request(PEER)
+            offset = block.piece_index * 20
+            manager.add_piece(messages.Piece(
+                block.piece_index,
+                0,
+                DATA[offset:offset + 20],
+            ))
+            assert block.piece_index in manager.verifying
+            assert not manager.have_count
+
+            while verifier.queue_depth:
+                await asyncio.sleep(0.01)
+
+            assert manager.have[block.piece_index]
+            assert not manager.verifying
+
+    asyncio.run(main())
+
+
+class FullDiskStorage:
+    def write_piece(self, piece_index, data):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+
+def test_piece_which_cannot_be_stored_is_downloaded_again():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+    manager = PiecesManager(torrent, storage=FullDiskStorage())
+    manager.update_peer_with_bitfield(PEER, messages.BitField(b'\xc0'))
+
+    block = manager.next_request(PEER)
+    offset = block.piece_index * 20
+    manager.add_piece(
+        messages.Piece(block.piece_index, 0, DATA[offset:offset + 20]),
+        PEER,
+    )
+
+    assert manager.storage_failures == 1
+    assert not manager.have_count
+    assert manager.next_request(PEER) == block
+
+
+class MemoryStorage:
+    def __init__(self):
+        self.pieces = {}
+
+    def write_piece(self, piece_index, data):
+        self.pieces[piece_index] = bytes(data)
+
+
+def test_stored_piece_is_cached_for_upload():
+    torrent = TorrentFile.from_torrent_file(io.BytesIO(VERIFIED_TORRENT))
+    manager = PiecesManager(torrent, storage=MemoryStorage())
+    manager.update_peer_with_bitfield(PEER, messages.BitField(b'\xc0'))
+
+    block = manager.next_request(PEER)
+    offset = block.piece_index * 20
+    manager.add_piece(
+        messages.Piece(block.piece_index, 0, DATA[offset:offset + 20]),
+        PEER,
+    )
+
+    assert manager.have[block.piece_index]
+    assert bytes(manager.cached_block(
+        messages.Request(block.piece_index, 5, 10),
+    )) == DATA[offset + 5:offset + 15]